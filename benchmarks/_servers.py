@@ -0,0 +1,78 @@
+"""
+Загрузка демо серверов как модулей для бенчмарков
+Имена файлов серверов содержат дефисы, поэтому обычный import не подходит
+"""
+
+import importlib.util
+import logging
+import random
+import sys
+from pathlib import Path
+from types import ModuleType
+
+ROOT = Path(__file__).resolve().parent.parent
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+_loaded: dict = {}
+
+
+def _load(filename: str, module_name: str) -> ModuleType:
+    if module_name in _loaded:
+        return _loaded[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, ROOT / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    _loaded[module_name] = module
+    return module
+
+
+def load_local_server(quiet: bool = True) -> ModuleType:
+    """local-mcp-server.py (SSE сервер на порту 8813)"""
+    module = _load('local-mcp-server.py', 'local_mcp_server')
+    if quiet:
+        logging.getLogger('demo-mcp-server').setLevel(logging.WARNING)
+    return module
+
+
+def load_demo_server(quiet: bool = True) -> ModuleType:
+    """demo-ui-generator-server.py (JSON сервер на порту 8000)"""
+    module = _load('demo-ui-generator-server.py', 'demo_ui_generator_server')
+    if quiet:
+        logging.getLogger('demo-ui-generator-server').setLevel(logging.WARNING)
+    return module
+
+
+def percentile(values, pct: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+DEPARTMENTS = ["Разработка", "Дизайн", "QA", "Аналитика", "DevOps"]
+POSITIONS = ["Junior", "Middle", "Senior", "Lead", "Manager"]
+
+
+def make_users(count: int, seed: int = 42) -> list:
+    """Синтетические пользователи в формате DemoMCPServer.users_data"""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"USER-{i + 1:07d}",
+            "name": f"Сотрудник {i + 1}",
+            "email": f"user{i + 1}@company.com",
+            "department": rng.choice(DEPARTMENTS),
+            "position": rng.choice(POSITIONS),
+            "salary": rng.randint(60, 200) * 1000,
+            "active": rng.random() < 0.75,
+            "joinDate": f"20{rng.randint(15, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "tasksCompleted": rng.randint(10, 150),
+            "efficiency": rng.randint(75, 98)
+        }
+        for i in range(count)
+    ]
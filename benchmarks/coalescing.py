@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк объединения одинаковых одновременных вызовов (SingleFlight)
+
+Всплеск из --clients одновременных вызовов show_users_table с одинаковыми
+аргументами при выключенном кэше: в local-mcp-server.py из пула потоков,
+в demo-ui-generator-server.py - пакетом JSON-RPC в одном цикле событий с
+пулом рендеринга. Без объединения каждый вызов рендерит таблицу заново.
+
+    python3 benchmarks/coalescing.py --rows 20000 --clients 16
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _servers import load_demo_server, load_local_server, make_users
+
+from mcp_server_common import SingleFlight
+
+CALL = ("show_users_table", {"sortBy": "salary"})
+
+
+def burst_local(server, clients: int) -> float:
+    with ThreadPoolExecutor(clients) as executor:
+        started = time.perf_counter()
+        list(executor.map(lambda _: server.call_tool(*CALL), range(clients)))
+        return time.perf_counter() - started
+
+
+def burst_demo(server, clients: int) -> float:
+    name, arguments = CALL
+    batch = [{"jsonrpc": "2.0", "id": index, "method": "tools/call",
+              "params": {"name": name, "arguments": arguments}} for index in range(clients)]
+    started = time.perf_counter()
+    asyncio.run(server.handle_jsonrpc(batch))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='строк в таблице пользователей')
+    parser.add_argument('--clients', type=int, default=16, help='одновременных вызовов')
+    parser.add_argument('--render-workers', type=int, default=2, help='пул рендеринга demo сервера')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    users = make_users(args.rows)
+    local = load_local_server().DemoMCPServer(cache_max_bytes=0)
+    local.users_data = users
+    demo = load_demo_server().UIGeneratorDemoServer(cache_max_bytes=0)
+    demo.users_data = users
+    demo.start_render_pool(args.render_workers, threshold=1).warm()
+
+    print(f"{'server':>6} {'coalescing':>10} {'burst':>10} {'renders':>8} {'coalesced':>9}")
+    try:
+        for label, server, burst in (("local", local, burst_local), ("demo", demo, burst_demo)):
+            for enabled in (False, True):
+                server.single_flight = SingleFlight(enabled=enabled)
+                # Первый всплеск прогревает индексы и копию датасета в процессах пула
+                burst(server, args.clients)
+                elapsed = min(burst(server, args.clients) for _ in range(args.rounds))
+                stats = server.single_flight.stats()
+                renders = stats["executed"] if enabled else (args.rounds + 1) * args.clients
+                print(f"{label:>6} {'on' if enabled else 'off':>10} {elapsed * 1000:>8.1f}ms "
+                      f"{renders / (args.rounds + 1):>8.1f} {stats['coalesced'] / (args.rounds + 1):>9.1f}")
+    finally:
+        demo.render_pool.close()
+
+
+if __name__ == '__main__':
+    main()
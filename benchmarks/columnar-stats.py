@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк колоночного хранения: память и время агрегаций
+
+Сравнивает список словарей (как users_data в серверах) с ColumnarTable из
+mcp_columnar: занимаемую память, суммы по отделам, гистограмму зарплат и
+сортировку по зарплате. С установленным NumPy колонки - массивы NumPy, без него -
+array.array.
+
+    python3 benchmarks/columnar-stats.py --rows 1000000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from _servers import make_users
+
+from mcp_columnar import HAS_NUMPY, ColumnarTable
+
+NUMERIC = ("salary", "tasksCompleted", "efficiency")
+CATEGORICAL = ("department", "position", "active")
+
+
+def traced(build):
+    """(результат, прирост памяти в байтах)"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def best_of(repeat: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def dict_group_totals(users):
+    totals = {}
+    for user in users:
+        bucket = totals.get(user["department"])
+        if bucket is None:
+            bucket = totals[user["department"]] = {"count": 0, "salary": 0, "efficiency": 0}
+        bucket["count"] += 1
+        bucket["salary"] += user["salary"]
+        bucket["efficiency"] += user["efficiency"]
+    return totals
+
+
+def dict_histogram(users, bins: int = 20):
+    salaries = [user["salary"] for user in users]
+    low, high = min(salaries), max(salaries)
+    width = (high - low) / bins or 1
+    counts = [0] * bins
+    for value in salaries:
+        counts[min(int((value - low) / width), bins - 1)] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    users, dict_bytes = traced(lambda: make_users(args.rows))
+    table, column_bytes = traced(lambda: ColumnarTable.from_records(users, NUMERIC, CATEGORICAL))
+    # Текстовые колонки ссылаются на те же строки, что и словари; сами строки не копируются
+    assert table.group_totals("department", ("salary", "efficiency")) == dict_group_totals(users)
+
+    print(f"rows: {args.rows}, backend: {'numpy' if HAS_NUMPY else 'array'}")
+    print(f"{'':>18} {'list of dicts':>14} {'columnar':>12}")
+    print(f"{'memory':>18} {dict_bytes / 1024 / 1024:>12.1f}MB {column_bytes / 1024 / 1024:>10.1f}MB "
+          f"(числовые и категориальные колонки: {table.nbytes() / 1024 / 1024:.1f}MB)")
+    rows = [
+        ("group totals", lambda: dict_group_totals(users),
+         lambda: table.group_totals("department", ("salary", "efficiency"))),
+        ("salary histogram", lambda: dict_histogram(users), lambda: table.histogram("salary", 20)),
+        ("sort by salary", lambda: sorted(users, key=lambda user: user["salary"]),
+         lambda: table.argsort("salary")),
+    ]
+    for name, dict_version, column_version in rows:
+        dict_time = best_of(args.repeat, dict_version)
+        column_time = best_of(args.repeat, column_version)
+        print(f"{name:>18} {dict_time * 1000:>12.1f}ms {column_time * 1000:>10.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
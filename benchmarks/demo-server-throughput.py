@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк HTTP обвязки demo-ui-generator-server.py: запросов в секунду
+
+Сравнивает однопоточный http.server с asyncio.run на каждый запрос (режим
+--server threaded) и AsyncDemoHTTPServer с одним циклом событий (режим asyncio).
+Клиенты в потоках шлют tools/call по кругу из нескольких инструментов.
+
+    python3 benchmarks/demo-server-throughput.py --clients 32 --requests 2000
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import threading
+import time
+from http.server import HTTPServer
+
+from _servers import load_demo_server, percentile
+
+TOOLS = [
+    ("show_user_profile", {"userId": 2}),
+    ("show_users_table", {"page": 1, "pageSize": 20}),
+    ("show_project_dashboard", {}),
+    ("show_notifications_demo", {}),
+]
+
+
+def start_threaded(module, server):
+    class QuietHandler(module.DemoRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    QuietHandler.server_instance = server
+    httpd = HTTPServer(('127.0.0.1', 0), QuietHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def stop():
+        httpd.shutdown()
+        httpd.server_close()
+    return httpd.server_address[1], stop
+
+
+def start_asyncio(module, server):
+    loop = asyncio.new_event_loop()
+    http_server = module.AsyncDemoHTTPServer(server, '127.0.0.1', 0)
+    loop.run_until_complete(http_server.start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(http_server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+    return http_server.port, stop
+
+
+def run_clients(port: int, clients: int, total: int):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        nonlocal errors
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            name, arguments = TOOLS[index % len(TOOLS)]
+            body = json.dumps({"method": "tools/call", "params": {"name": name, "arguments": arguments}})
+            start = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                conn.request('POST', '/', body=body, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                ok = response.status == 200
+            except OSError:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--cache-mb', type=float, default=0,
+                        help='Кэш рендера (по умолчанию выключен, чтобы мерить и рендер)')
+    args = parser.parse_args()
+
+    module = load_demo_server()
+    print(f"{'mode':>9} {'req/s':>9} {'p50':>9} {'p99':>9} {'errors':>7}")
+    for mode, start in (('threaded', start_threaded), ('asyncio', start_asyncio)):
+        server = module.UIGeneratorDemoServer(cache_max_bytes=int(args.cache_mb * 1024 * 1024))
+        port, stop = start(module, server)
+        elapsed, latencies, errors = run_clients(port, args.clients, args.requests)
+        stop()
+        print(f"{mode:>9} {len(latencies) / elapsed:>9.0f} {percentile(latencies, 50) * 1000:>7.1f}ms "
+              f"{percentile(latencies, 99) * 1000:>7.1f}ms {errors:>7}")
+
+
+if __name__ == '__main__':
+    main()
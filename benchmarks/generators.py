@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк генераторов UI обоих серверов
+
+Замеряет каждый генератор HTML (local-mcp-server.py: table, card, dashboard;
+demo-ui-generator-server.py: table, card, dashboard, chart, list, form,
+notification, text) на наборах от 10 до 1 000 000 записей: время по
+perf_counter_ns после прогревочных запусков (p50/p95/p99), пиковую память
+генерации через tracemalloc (отдельным запуском, чтобы трассировка не искажала
+время) и размер HTML в байтах.
+
+Размер набора означает число записей таблицы и списка, полей карточки и формы,
+метрик или участников команды дашборда, значений графика, уведомлений и записей
+в тексте (JSON).
+
+    python3 benchmarks/generators.py --output results.json
+    python3 benchmarks/generators.py --sizes 10,1000,100000,1000000 --only table
+    python3 benchmarks/generators.py --baseline results.json --threshold 0.1
+
+С --baseline результаты сравниваются с сохранённым JSON: рост p50 времени или
+пиковой памяти больше порога отмечается как регрессия, и скрипт завершается с
+кодом 1.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from _servers import load_demo_server, load_local_server, make_users, percentile
+
+from mcp_columnar import HAS_NUMPY
+
+NOTIFICATION_TYPES = ["success", "warning", "error", "info"]
+
+
+def make_card(count: int) -> dict:
+    return {f"field{i}": i if i % 3 else f"Значение {i}" for i in range(count)}
+
+
+def make_local_metrics(count: int) -> list:
+    return [{"title": f"Метрика {i}", "value": i * 10, "change": i % 7 - 3,
+             "changeType": "increase" if i % 2 else "decrease"} for i in range(count)]
+
+
+def make_project(count: int) -> dict:
+    return {
+        "info": {"name": "Проект", "status": "В работе", "progress": 50},
+        "team": [{"name": f"Участник {i}", "role": "Developer", "load": i % 100, "efficiency": 80}
+                 for i in range(count)],
+        "metrics": {"totalTasks": count, "completedTasks": count // 2, "inProgressTasks": count // 4,
+                    "blockedTasks": 0, "efficiency": 87, "velocity": 15.3, "quality": 94}
+    }
+
+
+def make_form(count: int) -> list:
+    kinds = ["text", "email", "number", "select", "textarea"]
+    return [{"name": f"field{i}", "label": f"Поле {i}", "type": kinds[i % len(kinds)],
+             "required": i % 2 == 0, "options": ["A", "B", "C"]} for i in range(count)]
+
+
+def make_notifications(count: int) -> list:
+    return [{"type": NOTIFICATION_TYPES[i % 4], "title": f"Уведомление {i}", "message": "Текст уведомления"}
+            for i in range(count)]
+
+
+def cases(local, demo):
+    """(сервер, генератор, построитель входных данных, функция генерации)"""
+    return [
+        ("local", "table", make_users, lambda data: local.generate_table(data, "Таблица")),
+        ("local", "card", make_card, lambda data: local.generate_card(data, "Карточка")),
+        ("local", "dashboard", make_local_metrics, lambda data: local.generate_dashboard(data, "Дашборд")),
+        ("demo", "table", make_users, lambda data: demo.generate_table(data, "Таблица")),
+        ("demo", "card", make_card, lambda data: demo.generate_card(data, "Карточка")),
+        ("demo", "dashboard", make_project, lambda data: demo.generate_dashboard(data, "Дашборд")),
+        ("demo", "chart", lambda count: list(range(1, count + 1)), lambda data: demo.generate_chart(data, "График")),
+        ("demo", "list", make_users, lambda data: demo.generate_list(data, "Список")),
+        ("demo", "form", make_form, lambda data: demo.generate_form(data, "Форма")),
+        ("demo", "notification", make_notifications,
+         lambda data: demo.generate_notification(data, "Уведомления")),
+        ("demo", "text", make_users, lambda data: demo.generate_text(data, "Текст")),
+    ]
+
+
+def measure(render, data, warmup: int, repeat: int, max_seconds: float) -> dict:
+    """Время запусков, пиковая память и размер результата одного генератора"""
+    for _ in range(warmup):
+        render(data)
+
+    gc.collect()
+    timings = []
+    deadline = time.perf_counter_ns() + int(max_seconds * 1e9)
+    while len(timings) < repeat:
+        start = time.perf_counter_ns()
+        html = render(data)
+        end = time.perf_counter_ns()
+        timings.append(end - start)
+        # Большие наборы не прогоняем repeat раз, но не меньше трёх запусков
+        if end > deadline and len(timings) >= 3:
+            break
+    output_bytes = len(html.encode('utf-8'))
+    del html
+
+    gc.collect()
+    tracemalloc.start()
+    render(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ms = [value / 1e6 for value in timings]
+    return {
+        "runs": len(ms),
+        "min_ms": min(ms),
+        "mean_ms": sum(ms) / len(ms),
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": max(ms),
+        "peak_bytes": peak,
+        "output_bytes": output_bytes
+    }
+
+
+def case_key(result: dict) -> tuple:
+    return result["server"], result["generator"], result["size"]
+
+
+def compare(results: list, baseline: dict, threshold: float, min_delta_ms: float) -> list:
+    """Регрессии относительно baseline: (результат, метрика, было, стало)"""
+    previous = {case_key(result): result for result in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old = previous.get(case_key(result))
+        if old is None:
+            continue
+        result["baseline"] = {"p50_ms": old["p50_ms"], "peak_bytes": old["peak_bytes"],
+                              "output_bytes": old["output_bytes"]}
+        if result["p50_ms"] > old["p50_ms"] * (1 + threshold) and \
+                result["p50_ms"] - old["p50_ms"] >= min_delta_ms:
+            regressions.append((result, "p50_ms", old["p50_ms"], result["p50_ms"]))
+        if result["peak_bytes"] > old["peak_bytes"] * (1 + threshold):
+            regressions.append((result, "peak_bytes", old["peak_bytes"], result["peak_bytes"]))
+    return regressions
+
+
+def format_change(result: dict, field: str) -> str:
+    old = result.get("baseline", {}).get(field)
+    if not old:
+        return ""
+    return f" ({(result[field] / old - 1) * 100:+.0f}%)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,1000,100000',
+                        help='размеры наборов через запятую (до 1000000)')
+    parser.add_argument('--only', default='', help='генераторы через запятую (table,card,...)')
+    parser.add_argument('--servers', default='local,demo', help='local, demo или оба через запятую')
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--max-seconds', type=float, default=5.0,
+                        help='бюджет времени на замер одного случая после прогрева')
+    parser.add_argument('--output', help='сохранить результаты в JSON')
+    parser.add_argument('--baseline', help='JSON предыдущего запуска для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='допустимый рост p50 и пиковой памяти (доля, 0.10 = 10%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                        help='рост p50 меньше этого значения не считается регрессией')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    only = {name for name in args.only.split(',') if name}
+    servers = {name for name in args.servers.split(',') if name}
+
+    local = load_local_server().UIGenerator()
+    demo = load_demo_server().UIGeneratorDemoServer(cache_max_bytes=0)
+    selected = [case for case in cases(local, demo)
+                if case[0] in servers and (not only or case[1] in only)]
+
+    results = []
+    print(f"{'server':>6} {'generator':>12} {'size':>8} {'runs':>5} {'p50 ms':>10} {'p95 ms':>10} "
+          f"{'p99 ms':>10} {'peak KB':>10} {'HTML KB':>10}")
+    for size in sizes:
+        # Входные данные строятся один раз на размер и общий построитель
+        inputs = {}
+        for server, generator, build, render in selected:
+            if build not in inputs:
+                inputs[build] = build(size)
+            stats = measure(render, inputs[build], args.warmup, args.repeat, args.max_seconds)
+            result = dict({"server": server, "generator": generator, "size": size}, **stats)
+            results.append(result)
+            print(f"{server:>6} {generator:>12} {size:>8} {stats['runs']:>5} {stats['p50_ms']:>10.3f} "
+                  f"{stats['p95_ms']:>10.3f} {stats['p99_ms']:>10.3f} {stats['peak_bytes'] / 1024:>10.1f} "
+                  f"{stats['output_bytes'] / 1024:>10.1f}")
+        del inputs
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        print(f"\nсравнение с {args.baseline} (порог {args.threshold * 100:.0f}%):")
+        for result in results:
+            if "baseline" in result:
+                print(f"{result['server']:>6} {result['generator']:>12} {result['size']:>8} "
+                      f"p50{format_change(result, 'p50_ms'):>8} peak{format_change(result, 'peak_bytes'):>8} "
+                      f"html{format_change(result, 'output_bytes'):>8}")
+        for result, metric, old, new in regressions:
+            print(f"РЕГРЕССИЯ {result['server']} {result['generator']} {result['size']}: "
+                  f"{metric} {old:.3f} -> {new:.3f}")
+        if not regressions:
+            print("регрессий нет")
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec='seconds'),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "columnarBackend": "numpy" if HAS_NUMPY else "array",
+                "warmup": args.warmup,
+                "repeat": args.repeat
+            },
+            "results": results
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nрезультаты сохранены в {args.output}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
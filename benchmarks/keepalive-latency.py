@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк keep-alive: задержка последовательных вызовов инструментов
+
+Для local-mcp-server.py (GET /tool/<name>) и demo-ui-generator-server.py
+(POST tools/call) делает N последовательных вызовов по одному переиспользуемому
+соединению и столько же с новым соединением на каждый вызов.
+
+    python3 benchmarks/keepalive-latency.py --calls 10000
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import threading
+import time
+
+from _servers import load_demo_server, load_local_server, percentile
+
+
+def start_local():
+    module = load_local_server()
+    httpd = module.create_http_server('127.0.0.1', 0, max_keepalive_requests=1_000_000)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def stop():
+        httpd.shutdown()
+        httpd.server_close()
+    return httpd.server_address[1], ('GET', '/tool/show_user_profile?userId=USER-002', None), stop
+
+
+def start_demo():
+    module = load_demo_server()
+    loop = asyncio.new_event_loop()
+    http_server = module.AsyncDemoHTTPServer(module.UIGeneratorDemoServer(), '127.0.0.1', 0,
+                                             max_keepalive_requests=1_000_000)
+    loop.run_until_complete(http_server.start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(http_server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+    body = json.dumps({"method": "tools/call", "params": {"name": "show_user_profile", "arguments": {"userId": 2}}})
+    return http_server.port, ('POST', '/', body), stop
+
+
+def run(port: int, request, calls: int, reuse: bool):
+    method, path, body = request
+    latencies = []
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30) if reuse else None
+    for _ in range(calls):
+        start = time.perf_counter()
+        if not reuse:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.request(method, path, body=body)
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+        if not reuse:
+            conn.close()
+        latencies.append(time.perf_counter() - start)
+    if reuse:
+        conn.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'server':>7} {'connection':>11} {'total':>9} {'mean':>9} {'p50':>9} {'p99':>9}")
+    for name, start in (('local', start_local), ('demo', start_demo)):
+        port, request, stop = start()
+        for mode, reuse in (('new', False), ('keep-alive', True)):
+            latencies = run(port, request, args.calls, reuse)
+            total = sum(latencies)
+            print(f"{name:>7} {mode:>11} {total:>8.2f}s {total / len(latencies) * 1e6:>7.0f}us "
+                  f"{percentile(latencies, 50) * 1e6:>7.0f}us {percentile(latencies, 99) * 1e6:>7.0f}us")
+        stop()
+
+
+if __name__ == '__main__':
+    main()
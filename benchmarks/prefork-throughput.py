@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк режима --processes: запросов в секунду в зависимости от числа процессов
+
+Запускает сервер отдельным процессом с --processes N на общем порту (SO_REUSEPORT)
+и нагружает его клиентами в отдельных процессах, чтобы клиенты не упирались в
+GIL одного интерпретатора. Каждый клиент держит keep-alive соединение и шлёт
+tools/call по кругу. Рост req/s с числом процессов ограничен числом ядер.
+
+    python3 benchmarks/prefork-throughput.py --processes 1,2,4 --clients 16
+    python3 benchmarks/prefork-throughput.py --servers demo --seconds 5
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from _servers import ROOT, percentile
+
+SERVERS = {
+    # имя: (файл, путь JSON-RPC, дополнительные аргументы)
+    "local": ("local-mcp-server.py", "/rpc", ["--log-file", "", "--log-sample-rate", "0", "--cache-mb", "0"]),
+    "demo": ("demo-ui-generator-server.py", "/", []),
+}
+TOOLS = [
+    ("show_user_profile", {}),
+    ("show_users_table", {"page": 1, "pageSize": 20}),
+    ("show_project_dashboard", {}),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Сервер не открыл порт {port}")
+
+
+def client(port: int, path: str, seconds: float, results):
+    """Вызовы по кругу до истечения seconds; в results уходят задержки (сек) и число ошибок"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    index = 0
+    while time.perf_counter() < deadline:
+        name, arguments = TOOLS[index % len(TOOLS)]
+        index += 1
+        body = json.dumps({"jsonrpc": "2.0", "id": index, "method": "tools/call",
+                           "params": {"name": name, "arguments": arguments}})
+        started = time.perf_counter()
+        try:
+            conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    results.put((latencies, errors))
+
+
+def run(server: str, processes: int, clients: int, seconds: float):
+    filename, path, extra = SERVERS[server]
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, str(ROOT / filename), '--port', str(port), '--host', '127.0.0.1',
+                             '--processes', str(processes), *extra],
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        # Все процессы успевают открыть сокет до начала замера
+        time.sleep(0.5 + 0.1 * processes)
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=client, args=(port, path, seconds, results))
+                   for _ in range(clients)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        collected = [results.get() for _ in workers]
+        elapsed = time.perf_counter() - started
+        for worker in workers:
+            worker.join()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    latencies = [value for part, _ in collected for value in part]
+    errors = sum(count for _, count in collected)
+    return len(latencies) / elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', default=f'1,2,{max(os.cpu_count() or 1, 4)}',
+                        help='числа процессов сервера через запятую')
+    parser.add_argument('--servers', default='local,demo', help='local, demo или оба через запятую')
+    parser.add_argument('--clients', type=int, default=16, help='клиентских процессов')
+    parser.add_argument('--seconds', type=float, default=5.0, help='длительность замера')
+    args = parser.parse_args()
+
+    print(f"ядер: {os.cpu_count()}")
+    print(f"{'server':>6} {'procs':>5} {'req/s':>9} {'p50':>9} {'p99':>9} {'errors':>7}")
+    for server in [name for name in args.servers.split(',') if name]:
+        for processes in [int(value) for value in args.processes.split(',') if value]:
+            rate, latencies, errors = run(server, processes, args.clients, args.seconds)
+            print(f"{server:>6} {processes:>5} {rate:>9.0f} {percentile(latencies, 50) * 1000:>7.2f}ms "
+                  f"{percentile(latencies, 99) * 1000:>7.2f}ms {errors:>7}")
+
+
+if __name__ == '__main__':
+    main()
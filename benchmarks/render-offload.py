@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк смешанной нагрузки demo-ui-generator-server.py: малые вызовы на фоне больших рендеров
+
+Один клиент последовательно вызывает show_user_profile и меряет задержку, пока
+--big-clients клиентов по кругу запрашивают всю таблицу пользователей
+(--rows строк). Режимы:
+
+    idle    - только малые вызовы, без больших рендеров
+    inline  - большие рендеры в цикле событий сервера
+    pool    - большие рендеры в пуле процессов (--render-workers)
+
+    python3 benchmarks/render-offload.py --rows 50000 --seconds 10
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import threading
+import time
+
+from _servers import load_demo_server, make_users, percentile
+
+SMALL_CALL = ("show_user_profile", {"userId": 2})
+BIG_CALL = ("show_users_table", {})
+
+
+def start_asyncio(module, server):
+    loop = asyncio.new_event_loop()
+    http_server = module.AsyncDemoHTTPServer(server, '127.0.0.1', 0)
+    loop.run_until_complete(http_server.start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(http_server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+    return http_server.port, stop
+
+
+def call(conn: http.client.HTTPConnection, name: str, arguments: dict) -> int:
+    body = json.dumps({"method": "tools/call", "params": {"name": name, "arguments": arguments}})
+    conn.request('POST', '/', body=body, headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    data = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"{name}: HTTP {response.status}")
+    return len(data)
+
+
+def run(port: int, big_clients: int, seconds: float):
+    """(задержки малых вызовов в секундах, число больших рендеров)"""
+    stop = threading.Event()
+    big_done = [0]
+
+    def big_worker():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        while not stop.is_set():
+            call(conn, *BIG_CALL)
+            big_done[0] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=big_worker, daemon=True) for _ in range(big_clients)]
+    for thread in threads:
+        thread.start()
+    # Большие рендеры успевают начаться до первого замера
+    time.sleep(0.2 if big_clients else 0)
+
+    latencies = []
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        call(conn, *SMALL_CALL)
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.002)
+    conn.close()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, big_done[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000, help='строк в таблице пользователей')
+    parser.add_argument('--big-clients', type=int, default=2)
+    parser.add_argument('--render-workers', type=int, default=2)
+    parser.add_argument('--threshold', type=int, default=5000, help='порог рендера в пуле (записей)')
+    parser.add_argument('--seconds', type=float, default=10.0, help='длительность каждого режима')
+    args = parser.parse_args()
+
+    module = load_demo_server()
+    users = make_users(args.rows)
+    print(f"{'mode':>7} {'calls':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'big':>5}")
+    for mode in ('idle', 'inline', 'pool'):
+        # Кэш выключен, чтобы каждый большой вызов рендерил таблицу заново
+        server = module.UIGeneratorDemoServer(cache_max_bytes=0)
+        server.users_data = users
+        if mode == 'pool':
+            server.start_render_pool(args.render_workers, args.threshold)
+        port, stop = start_asyncio(module, server)
+        latencies, big = run(port, 0 if mode == 'idle' else args.big_clients, args.seconds)
+        stop()
+        if server.render_pool is not None:
+            server.render_pool.close()
+        ms = [value * 1000 for value in latencies]
+        print(f"{mode:>7} {len(ms):>7} {percentile(ms, 50):>7.2f}ms {percentile(ms, 95):>7.2f}ms "
+              f"{percentile(ms, 99):>7.2f}ms {max(ms):>7.2f}ms {big:>5}")
+
+
+if __name__ == '__main__':
+    main()
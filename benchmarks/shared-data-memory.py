@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк памяти local-mcp-server.py в режиме нескольких процессов
+
+Мастер создаёт DemoMCPServer с --rows пользователями и запускает N процессов
+через fork; каждый строит индекс сортировки и рендерит таблицу, то есть
+проходит по всем записям. Режимы:
+
+    copy    - записи-словари в каждом процессе (после обхода страницы
+              копируются при записи счётчиков ссылок)
+    shared  - записи в общем колоночном сегменте (SharedDatasets)
+
+Суммарная PSS (/proc/<pid>/smaps_rollup, только Linux) мастера и процессов
+показывает, растёт ли память с числом процессов.
+
+    python3 benchmarks/shared-data-memory.py --rows 200000 --processes 1,2,4,8
+"""
+
+import argparse
+import gc
+import os
+
+from _servers import load_local_server, make_users
+
+from mcp_columnar import SharedDatasets
+
+TOUCH_CALLS = [
+    ("show_users_table", {"sortBy": "salary", "page": 1, "pageSize": 50}),
+    ("show_users_table", {"filter": {"department": "QA"}, "page": 1, "pageSize": 50}),
+    ("show_team_statistics", {}),
+]
+
+
+def pss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    return 0
+
+
+def run(module, rows: int, processes: int, shared: bool) -> int:
+    """Суммарная PSS мастера и процессов (КБ) после обхода данных в каждом процессе"""
+    server = module.DemoMCPServer(cache_max_bytes=0)
+    server.users_data = make_users(rows)
+    segment = None
+    if shared:
+        segment = SharedDatasets()
+        server.use_shared_data(segment)
+    # Как PreforkSupervisor: объекты мастера не трогаются сборщиком мусора в процессах
+    gc.collect()
+    gc.freeze()
+
+    children = []
+    for _ in range(processes):
+        ready_r, ready_w = os.pipe()
+        done_r, done_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            os.close(done_w)
+            for name, arguments in TOUCH_CALLS:
+                server.call_tool(name, arguments)
+            gc.collect()
+            os.write(ready_w, b"1")
+            os.read(done_r, 1)
+            os._exit(0)
+        os.close(ready_w)
+        os.close(done_r)
+        children.append((pid, ready_r, done_w))
+
+    for _, ready_r, _ in children:
+        os.read(ready_r, 1)
+    total = pss_kb(os.getpid()) + sum(pss_kb(pid) for pid, _, _ in children)
+    for pid, ready_r, done_w in children:
+        os.write(done_w, b"1")
+        os.waitpid(pid, 0)
+        os.close(ready_r)
+        os.close(done_w)
+    gc.unfreeze()
+    if segment is not None:
+        segment.unlink()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000, help='пользователей в датасете')
+    parser.add_argument('--processes', default='1,2,4,8', help='числа процессов через запятую')
+    args = parser.parse_args()
+
+    module = load_local_server()
+    counts = [int(value) for value in args.processes.split(',') if value]
+    print(f"{'mode':>7} {'procs':>5} {'PSS MB':>9} {'на процесс':>11}")
+    for shared in (False, True):
+        for processes in counts:
+            total = run(module, args.rows, processes, shared)
+            print(f"{'shared' if shared else 'copy':>7} {processes:>5} {total / 1024:>9.1f} "
+                  f"{total / 1024 / processes:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
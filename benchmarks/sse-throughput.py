@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пропускной способности вызовов инструментов при подключённых SSE клиентах
+
+Запускает local-mcp-server.py на случайном порту, держит N клиентов на /sse
+и параллельно вызывает /tool/<name>, измеряя запросы/сек и задержки.
+
+    python3 benchmarks/sse-throughput.py --mode single   # socketserver.TCPServer
+    python3 benchmarks/sse-throughput.py --mode pooled   # PooledHTTPServer
+"""
+
+import argparse
+import http.client
+import socketserver
+import threading
+import time
+
+from _servers import load_local_server, percentile
+
+
+def start_server(module, mode: str, workers: int, max_connections: int):
+    if mode == 'single':
+        # Однопоточный сервер не знает о переданных в hub сокетах и закрывает их,
+        # поэтому SSE клиенты здесь постоянно переподключаются
+        module.MCPSSEHandler.server_instance = module.DemoMCPServer()
+        module.MCPSSEHandler.sse_hub = module.SSESessionHub()
+        module.MCPSSEHandler.sse_hub.start()
+        httpd = socketserver.TCPServer(('127.0.0.1', 0), module.MCPSSEHandler)
+    else:
+        httpd = module.create_http_server('127.0.0.1', 0, max_workers=workers, max_connections=max_connections)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd
+
+
+def sse_client(port: int, stop: threading.Event):
+    """SSE клиент, который держит поток открытым и переподключается после разрыва"""
+    while not stop.is_set():
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.request('GET', '/sse', headers={'Accept': 'text/event-stream'})
+            response = conn.getresponse()
+            while not stop.is_set() and response.readline():
+                pass
+            conn.close()
+        except OSError:
+            time.sleep(0.05)
+
+
+def tool_caller(port: int, tool: str, stop: threading.Event, latencies: list, errors: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.request('GET', f'/tool/{tool}')
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(response.status)
+        except OSError as e:
+            errors.append(str(e))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['single', 'pooled'], default='pooled')
+    parser.add_argument('--sse-clients', type=int, default=50)
+    parser.add_argument('--callers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--tool', default='show_users_table')
+    parser.add_argument('--workers', type=int, default=96)
+    parser.add_argument('--max-connections', type=int, default=256)
+    args = parser.parse_args()
+
+    module = load_local_server()
+    httpd = start_server(module, args.mode, args.workers, args.max_connections)
+    port = httpd.server_address[1]
+
+    stop = threading.Event()
+    latencies: list = []
+    errors: list = []
+    threads = [
+        threading.Thread(target=sse_client, args=(port, stop), daemon=True)
+        for _ in range(args.sse_clients)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(1.0)  # даём SSE клиентам подключиться
+
+    callers = [
+        threading.Thread(target=tool_caller, args=(port, args.tool, stop, latencies, errors), daemon=True)
+        for _ in range(args.callers)
+    ]
+    started = time.perf_counter()
+    for thread in callers:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    elapsed = time.perf_counter() - started
+    for thread in callers:
+        thread.join(timeout=5)
+    httpd.shutdown()
+    httpd.server_close()
+
+    print(f"mode={args.mode} sse_clients={args.sse_clients} callers={args.callers} tool={args.tool}")
+    print(f"  calls:       {len(latencies)} ({len(latencies) / elapsed:.1f} req/s)")
+    print(f"  errors:      {len(errors)}")
+    if latencies:
+        print(f"  latency p50: {percentile(latencies, 50) * 1000:.1f} ms")
+        print(f"  latency p99: {percentile(latencies, 99) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
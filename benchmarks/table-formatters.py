@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк форматирования ячеек таблицы в demo-ui-generator-server.py
+
+Сравнивает прежний разбор ячеек (цепочка if/elif по имени колонки на каждую
+ячейку, повторный разбор ISO дат) с форматтерами, скомпилированными один раз на
+колонку (iter_table). Печатает стоимость одной строки и проверяет, что HTML совпадает.
+
+    python3 benchmarks/table-formatters.py --rows 100000
+"""
+
+import argparse
+import random
+import time
+
+from _servers import load_demo_server
+
+STATUSES = ["Новая", "В работе", "На ревью", "Завершена"]
+SKILLS = ["Python", "React", "SQL", "Docker", "Figma", "Selenium"]
+
+
+def make_rows(count: int, seed: int = 42) -> list:
+    """Строки в формате users_data/tasks_data демо сервера: ISO даты, статусы, списки"""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i + 1,
+            "name": f"Сотрудник {i + 1}",
+            "salary": rng.randint(60, 200) * 1000,
+            "active": rng.random() < 0.75,
+            "status": rng.choice(STATUSES),
+            "created": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T09:00:00Z",
+            "skills": rng.sample(SKILLS, rng.randint(1, 5)),
+            "efficiency": rng.randint(75, 98),
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_format_cell_value(value, header):
+    """Форматирование ячейки до компиляции форматтеров (для сравнения)"""
+    if value is None:
+        return ""
+    if header in ['salary']:
+        return f"{value:,} ₽"
+    elif header in ['efficiency', 'progress']:
+        return f"{value}%"
+    elif header == 'active':
+        return f"<span class='status-badge status-{'active' if value else 'inactive'}'>{'Да' if value else 'Нет'}</span>"
+    elif header == 'status':
+        status_map = {'В работе': 'work', 'Завершена': 'done', 'Новая': 'new'}
+        return f"<span class='status-badge status-{status_map.get(value, 'new')}'>{value}</span>"
+    elif header in ['joinDate', 'created', 'updated', 'dueDate']:
+        if isinstance(value, str) and 'T' in value:
+            try:
+                from datetime import datetime
+                return datetime.fromisoformat(value.replace('Z', '+00:00')).strftime('%d.%m.%Y')
+            except ValueError:
+                return value
+        return value
+    elif isinstance(value, list):
+        return ", ".join(str(item) for item in value[:3]) + ("..." if len(value) > 3 else "")
+    return str(value)
+
+
+def legacy_rows(rows) -> str:
+    headers = list(rows[0].keys())
+    out = []
+    for item in rows:
+        cells = [f"<td>{legacy_format_cell_value(item.get(header, ''), header)}</td>" for header in headers]
+        out.append(f"<tr>{''.join(cells)}</tr>")
+    return "".join(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    module = load_demo_server()
+    server = module.UIGeneratorDemoServer(cache_max_bytes=0)
+    rows = make_rows(args.rows)
+
+    def compiled() -> str:
+        fragments = list(server.iter_table(rows, ""))
+        # Без шапки и хвоста таблицы, только строки
+        return "".join(fragments[1:-1])
+
+    assert compiled() == legacy_rows(rows), "HTML строк отличается"
+
+    print(f"rows: {args.rows}")
+    results = {}
+    for name, render in (('per-cell', lambda: legacy_rows(rows)), ('compiled', compiled)):
+        timings = []
+        for _ in range(args.repeat):
+            module.format_iso_date.cache_clear()
+            start = time.perf_counter()
+            render()
+            timings.append(time.perf_counter() - start)
+        results[name] = min(timings)
+        print(f"{name:>9} {results[name]:>7.3f}s {results[name] / args.rows * 1e6:>7.2f}us/row")
+    print(f"speedup: {results['per-cell'] / results['compiled']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
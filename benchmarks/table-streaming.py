@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк потоковой отдачи таблиц: время до первого байта и пиковая память
+
+Для каждого размера датасета вызывает /tool/show_users_table обычным ответом и
+с ?stream=1 (Transfer-Encoding: chunked), затем сравнивает пиковую память
+рендера generate_table и итерации iter_table через tracemalloc.
+
+    python3 benchmarks/table-streaming.py --sizes 100 1000 10000 100000
+"""
+
+import argparse
+import http.client
+import threading
+import time
+import tracemalloc
+
+from _servers import load_local_server, make_users, percentile
+
+
+def timed_call(port: int, path: str):
+    """(время до первого байта тела, полное время, размер тела)"""
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=300)
+    conn.request('GET', path)
+    response = conn.getresponse()
+    first = response.read1(65536) if hasattr(response, 'read1') else response.read(1)
+    ttfb = time.perf_counter() - start
+    size = len(first)
+    while True:
+        chunk = response.read(65536)
+        if not chunk:
+            break
+        size += len(chunk)
+    total = time.perf_counter() - start
+    conn.close()
+    return ttfb, total, size
+
+
+def peak_memory(render) -> int:
+    tracemalloc.start()
+    render()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    module = load_local_server()
+    # Кэш отключён, иначе повторные вызовы не рендерят таблицу заново
+    module.MCPSSEHandler.server_instance = module.DemoMCPServer(cache_max_bytes=0)
+    server = module.MCPSSEHandler.server_instance
+    httpd = module.create_http_server('127.0.0.1', 0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    port = httpd.server_address[1]
+
+    print(f"{'rows':>8} {'mode':>9} {'ttfb p50':>10} {'total p50':>10} {'bytes':>12} {'peak mem':>10}")
+    for size in args.sizes:
+        server.users_data = make_users(size)
+        server.data_version += 1
+        for mode, path in (('buffered', '/tool/show_users_table'), ('stream', '/tool/show_users_table?stream=1')):
+            samples = [timed_call(port, path) for _ in range(args.repeat)]
+            ttfb = percentile([s[0] for s in samples], 50)
+            total = percentile([s[1] for s in samples], 50)
+            if mode == 'buffered':
+                peak = peak_memory(lambda: server.call_tool('show_users_table'))
+            else:
+                peak = peak_memory(lambda: sum(len(c) for c in server.stream_tool_result('show_users_table')))
+            print(f"{size:>8} {mode:>9} {ttfb * 1000:>8.1f}ms {total * 1000:>8.1f}ms "
+                  f"{samples[0][2]:>12} {peak / 1024 / 1024:>8.1f}MB")
+
+    httpd.shutdown()
+    httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
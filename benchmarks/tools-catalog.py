@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк каталога инструментов: сборка ответа tools/list и SSE рукопожатия
+
+Сравнивает прежнюю сборку на каждый запрос (список инструментов, словарь для
+рукопожатия, json.dumps и сжатие) с готовыми буферами ToolCatalog для обоих
+серверов. Время на один ответ, микросекунды.
+
+    python3 benchmarks/tools-catalog.py --iterations 20000
+"""
+
+import argparse
+import json
+import time
+
+from _servers import load_demo_server, load_local_server
+
+
+def per_call_us(func, iterations: int) -> float:
+    func()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def rebuild_handshake(server):
+    tools = {tool["name"]: {key: tool[key] for key in ("description", "inputSchema") if key in tool}
+             for tool in server.get_tools_list()}
+    return json.dumps({"jsonrpc": "2.0", "result": {"tools": tools}}, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    local = load_local_server().DemoMCPServer(cache_max_bytes=0)
+    demo = load_demo_server().UIGeneratorDemoServer(cache_max_bytes=0)
+    cases = [
+        ("local", "sse", lambda: rebuild_handshake(local).encode('utf-8'),
+         lambda: local.tool_catalog.handshake.encode('utf-8')),
+        ("local", "tools/list gzip",
+         lambda: local.compression.compress(
+             json.dumps({"tools": local.get_tools_list()}, ensure_ascii=False).encode('utf-8'), "gzip", "bench"),
+         lambda: local.tool_catalog.body("gzip")),
+        ("demo", "tools/list",
+         lambda: json.dumps({"tools": demo.get_available_tools()}, ensure_ascii=False).encode('utf-8'),
+         lambda: demo.tool_catalog.rpc_response({"method": "tools/list"})),
+        ("demo", "tools/list gzip",
+         lambda: demo.compression.compress(
+             json.dumps({"tools": demo.get_available_tools()}, ensure_ascii=False).encode('utf-8'), "gzip", "bench"),
+         lambda: demo.tool_catalog.body("gzip")),
+    ]
+    print(f"{'server':>6} {'response':>16} {'rebuild':>10} {'catalog':>10}")
+    for server, name, rebuild, cached in cases:
+        print(f"{server:>6} {name:>16} {per_call_us(rebuild, args.iterations):>8.1f}us "
+              f"{per_call_us(cached, args.iterations):>8.1f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,7 @@ import {
   Circle,
 } from 'lucide-react';
 import { cn } from '@/lib/utils';
+import { inlineSharedStyles, isStyleResource, rememberStyle } from '@/lib/ui-style-cache';
 import { HtmlResource, UiActionResult } from '@mcp-ui/client';
 import type { UseChatHelpers, Message as TMessage } from '@ai-sdk/react';
 import { nanoid } from 'nanoid';
@@ -106,13 +107,23 @@ export const ToolInvocation = memo(function ToolInvocation({
 
     if (processedContainer) {
       try {
-        const newHtmlResources = processedContainer.content
+        const uiResources = processedContainer.content
           .filter(
             (item): item is ContentItemWithHtmlResource =>
               item.type === 'resource' && item.resource && item.resource.uri.startsWith('ui://')
           )
           .map((item) => item.resource);
 
+        // Shared stylesheets are not rendered themselves, components link to them
+        uiResources.filter(isStyleResource).forEach(rememberStyle);
+        const newHtmlResources = uiResources
+          .filter((resource) => !isStyleResource(resource))
+          .map((resource) =>
+            typeof resource.text === 'string'
+              ? { ...resource, text: inlineSharedStyles(resource.text) }
+              : resource
+          );
+
         setHtmlResourceContents((prevContents) => {
           const newUris = newHtmlResources.map((r) => r.uri).sort();
           const currentUris = prevContents.map((r) => r.uri).sort();
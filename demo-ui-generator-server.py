@@ -4,23 +4,756 @@
 Создаёт интерактивные интерфейсы для различных типов данных
 """
 
+import argparse
 import asyncio
+import functools
+import itertools
 import json
 import logging
-from typing import Any, Dict, List
+import os
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 from datetime import datetime, timedelta
 import random
 
+from mcp_columnar import HAS_NUMPY, ColumnarTable, synthetic_users
+from mcp_server_common import (
+    JSONRPC_INVALID_PARAMS,
+    JSONRPC_INVALID_REQUEST,
+    JSONRPC_METHOD_NOT_FOUND,
+    PROMETHEUS_CONTENT_TYPE,
+    JsonRpcError,
+    PagedTable,
+    PreforkSupervisor,
+    ProfileStore,
+    RecordStore,
+    RenderCache,
+    RenderPool,
+    ResponseCompressor,
+    SingleFlight,
+    StyleRegistry,
+    TableQuery,
+    ToolCatalog,
+    ToolMetrics,
+    ToolRegistry,
+    dispatch_jsonrpc_async,
+    enable_reuse_port,
+    is_jsonrpc,
+    iter_tool_result_json,
+    jsonrpc_response,
+    page_description,
+    parse_jsonrpc,
+    prefork_supported,
+    rpc_label,
+    send_chunked,
+    table_query_schema,
+    timed_chunks
+)
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("demo-ui-generator-server")
 
+# Стили компонентов: встраиваются в HTML или публикуются как ui://styles/<hash>
+TABLE_STYLES = """
+            .ui-container {
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+                margin: 20px 0;
+            }
+            .ui-title {
+                font-size: 18px;
+                font-weight: 600;
+                margin-bottom: 16px;
+                color: #333;
+            }
+            .ui-table {
+                width: 100%;
+                border-collapse: collapse;
+                background: white;
+                border-radius: 8px;
+                overflow: hidden;
+                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+            }
+            .ui-table th {
+                background: #f8f9fa;
+                padding: 12px;
+                text-align: left;
+                font-weight: 600;
+                color: #495057;
+                border-bottom: 2px solid #dee2e6;
+            }
+            .ui-table td {
+                padding: 12px;
+                border-bottom: 1px solid #dee2e6;
+                color: #212529;
+            }
+            .ui-table tr:hover {
+                background: #f8f9fa;
+            }
+            .status-badge {
+                padding: 4px 8px;
+                border-radius: 12px;
+                font-size: 12px;
+                font-weight: 500;
+            }
+            .status-active { background: #d4edda; color: #155724; }
+            .status-inactive { background: #f8d7da; color: #721c24; }
+            .status-work { background: #fff3cd; color: #856404; }
+            .status-done { background: #d1ecf1; color: #0c5460; }
+            .status-new { background: #e2e3e5; color: #495057; }
+        """
+
+CARD_STYLES = """
+            .ui-container {
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+                margin: 20px 0;
+            }
+            .ui-title {
+                font-size: 18px;
+                font-weight: 600;
+                margin-bottom: 16px;
+                color: #333;
+            }
+            .ui-card {
+                background: white;
+                border: 1px solid #dee2e6;
+                border-radius: 8px;
+                padding: 20px;
+                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+                max-width: 500px;
+            }
+            .ui-field {
+                display: flex;
+                justify-content: space-between;
+                align-items: center;
+                margin: 12px 0;
+                padding: 8px 0;
+                border-bottom: 1px solid #f1f3f4;
+            }
+            .ui-field:last-child {
+                border-bottom: none;
+            }
+            .ui-field-label {
+                font-weight: 600;
+                color: #495057;
+                min-width: 120px;
+            }
+            .ui-field-value {
+                color: #212529;
+                text-align: right;
+            }
+        """
+
+DASHBOARD_STYLES = """
+            .ui-container {
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+                margin: 20px 0;
+            }
+            .ui-title {
+                font-size: 20px;
+                font-weight: 600;
+                margin-bottom: 20px;
+                color: #333;
+            }
+            .metrics-grid {
+                display: grid;
+                grid-template-columns: repeat(auto-fit, minmax(150px, 1fr));
+                gap: 16px;
+                margin-bottom: 24px;
+            }
+            .metric-card {
+                background: white;
+                border: 1px solid #dee2e6;
+                border-radius: 8px;
+                padding: 16px;
+                text-align: center;
+                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+            }
+            .metric-label {
+                font-size: 12px;
+                color: #6c757d;
+                margin-bottom: 8px;
+                text-transform: uppercase;
+                letter-spacing: 0.5px;
+            }
+            .metric-value {
+                font-size: 24px;
+                font-weight: 700;
+                color: #333;
+            }
+            .metric-primary { border-left: 4px solid #007bff; }
+            .metric-success { border-left: 4px solid #28a745; }
+            .metric-warning { border-left: 4px solid #ffc107; }
+            .metric-danger { border-left: 4px solid #dc3545; }
+            .metric-info { border-left: 4px solid #17a2b8; }
+            .metric-secondary { border-left: 4px solid #6c757d; }
+            .team-grid {
+                display: grid;
+                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+                gap: 16px;
+            }
+            .team-card {
+                background: white;
+                border: 1px solid #dee2e6;
+                border-radius: 8px;
+                padding: 16px;
+                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+            }
+            .team-name {
+                font-weight: 600;
+                color: #333;
+                margin-bottom: 4px;
+            }
+            .team-role {
+                color: #6c757d;
+                font-size: 14px;
+                margin-bottom: 8px;
+            }
+            .team-stats {
+                display: flex;
+                flex-direction: column;
+                gap: 4px;
+            }
+            .team-stats span {
+                font-size: 12px;
+                color: #495057;
+            }
+        """
+
+CHART_STYLES = """
+            .ui-container {
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+                margin: 20px 0;
+            }
+            .ui-title {
+                font-size: 18px;
+                font-weight: 600;
+                margin-bottom: 16px;
+                color: #333;
+            }
+            .chart-container {
+                background: white;
+                border: 1px solid #dee2e6;
+                border-radius: 8px;
+                padding: 20px;
+                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+            }
+            .chart {
+                display: flex;
+                align-items: flex-end;
+                height: 200px;
+                gap: 8px;
+                margin: 20px 0;
+            }
+            .chart-bar {
+                flex: 1;
+                display: flex;
+                flex-direction: column;
+                align-items: center;
+                height: 100%;
+                position: relative;
+            }
+            .chart-bar-fill {
+                width: 100%;
+                background: linear-gradient(to top, #007bff, #0056b3);
+                border-radius: 4px 4px 0 0;
+                min-height: 4px;
+                transition: all 0.3s ease;
+            }
+            .chart-bar:hover .chart-bar-fill {
+                background: linear-gradient(to top, #0056b3, #004085);
+            }
+            .chart-bar-label {
+                position: absolute;
+                top: -20px;
+                font-size: 12px;
+                font-weight: 600;
+                color: #495057;
+            }
+            .chart-bar-index {
+                margin-top: 8px;
+                font-size: 12px;
+                color: #6c757d;
+            }
+        """
+
+LIST_STYLES = """
+            .ui-container {
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+                margin: 20px 0;
+            }
+            .ui-title {
+                font-size: 18px;
+                font-weight: 600;
+                margin-bottom: 16px;
+                color: #333;
+            }
+            .list-container {
+                display: flex;
+                flex-direction: column;
+                gap: 12px;
+            }
+            .list-item {
+                background: white;
+                border: 1px solid #dee2e6;
+                border-radius: 8px;
+                padding: 16px;
+                box-shadow: 0 2px 4px rgba(0,0,0,0.05);
+                transition: all 0.2s ease;
+            }
+            .list-item:hover {
+                box-shadow: 0 4px 8px rgba(0,0,0,0.1);
+                transform: translateY(-1px);
+            }
+            .list-item.simple {
+                padding: 12px 16px;
+                color: #495057;
+            }
+            .item-header {
+                font-weight: 600;
+                color: #333;
+                margin-bottom: 8px;
+                font-size: 16px;
+            }
+            .item-content {
+                color: #6c757d;
+                font-size: 14px;
+                line-height: 1.5;
+            }
+            .item-field {
+                display: inline-block;
+                margin-right: 16px;
+            }
+        """
+
+FORM_STYLES = """
+            .ui-container {
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+                margin: 20px 0;
+            }
+            .ui-title {
+                font-size: 18px;
+                font-weight: 600;
+                margin-bottom: 16px;
+                color: #333;
+            }
+            .form-container {
+                background: white;
+                border: 1px solid #dee2e6;
+                border-radius: 8px;
+                padding: 24px;
+                max-width: 500px;
+                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+            }
+            .form-field {
+                margin-bottom: 20px;
+            }
+            .form-field label {
+                display: block;
+                margin-bottom: 6px;
+                font-weight: 500;
+                color: #495057;
+            }
+            .form-field input,
+            .form-field select,
+            .form-field textarea {
+                width: 100%;
+                padding: 10px 12px;
+                border: 1px solid #ced4da;
+                border-radius: 4px;
+                font-size: 14px;
+                box-sizing: border-box;
+                transition: border-color 0.15s ease-in-out;
+            }
+            .form-field input:focus,
+            .form-field select:focus,
+            .form-field textarea:focus {
+                outline: none;
+                border-color: #007bff;
+                box-shadow: 0 0 0 2px rgba(0,123,255,0.25);
+            }
+            .form-submit {
+                background: #007bff;
+                color: white;
+                padding: 12px 24px;
+                border: none;
+                border-radius: 4px;
+                font-size: 16px;
+                font-weight: 500;
+                cursor: pointer;
+                transition: background-color 0.15s ease-in-out;
+            }
+            .form-submit:hover {
+                background: #0056b3;
+            }
+        """
+
+NOTIFICATION_STYLES = """
+            .ui-container {
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+                margin: 20px 0;
+            }
+            .ui-title {
+                font-size: 18px;
+                font-weight: 600;
+                margin-bottom: 16px;
+                color: #333;
+            }
+            .notifications-container {
+                display: flex;
+                flex-direction: column;
+                gap: 12px;
+            }
+            .notification {
+                padding: 16px;
+                border-radius: 8px;
+                border-left: 4px solid;
+            }
+            .notif-success {
+                background: #d4edda;
+                border-color: #28a745;
+                color: #155724;
+            }
+            .notif-warning {
+                background: #fff3cd;
+                border-color: #ffc107;
+                color: #856404;
+            }
+            .notif-error {
+                background: #f8d7da;
+                border-color: #dc3545;
+                color: #721c24;
+            }
+            .notif-info {
+                background: #d1ecf1;
+                border-color: #17a2b8;
+                color: #0c5460;
+            }
+            .notif-title {
+                font-weight: 600;
+                margin-bottom: 6px;
+            }
+            .notif-message {
+                line-height: 1.4;
+            }
+        """
+
+TEXT_STYLES = """
+            .ui-container {
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+                margin: 20px 0;
+            }
+            .ui-title {
+                font-size: 18px;
+                font-weight: 600;
+                margin-bottom: 16px;
+                color: #333;
+            }
+            .text-container {
+                background: white;
+                border: 1px solid #dee2e6;
+                border-radius: 8px;
+                padding: 20px;
+                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+            }
+            .text-json {
+                background: #f8f9fa;
+                padding: 16px;
+                border-radius: 4px;
+                font-family: 'Monaco', 'Menlo', 'Ubuntu Mono', monospace;
+                font-size: 14px;
+                white-space: pre-wrap;
+                overflow-x: auto;
+                color: #495057;
+            }
+            .text-simple {
+                color: #212529;
+                line-height: 1.6;
+            }
+        """
+
+# Подписи колонок
+HEADER_TRANSLATIONS = {
+    'id': 'ID',
+    'name': 'Имя',
+    'email': 'Email',
+    'department': 'Отдел',
+    'position': 'Должность',
+    'salary': 'Зарплата',
+    'active': 'Активен',
+    'joinDate': 'Дата найма',
+    'skills': 'Навыки',
+    'tasksCompleted': 'Задач выполнено',
+    'efficiency': 'Эффективность',
+    'title': 'Название',
+    'description': 'Описание',
+    'status': 'Статус',
+    'priority': 'Приоритет',
+    'assignee': 'Исполнитель',
+    'reporter': 'Автор',
+    'created': 'Создана',
+    'updated': 'Обновлена',
+    'dueDate': 'Срок',
+    'progress': 'Прогресс',
+    'estimatedHours': 'Часов оценка',
+    'loggedHours': 'Часов потрачено',
+    'tags': 'Теги',
+    'comments': 'Комментарии'
+}
+
+STATUS_CLASSES = {
+    'В работе': 'work',
+    'Завершена': 'done',
+    'Новая': 'new'
+}
+
+DATE_COLUMNS = {'joinDate', 'created', 'updated', 'dueDate'}
+PERCENT_COLUMNS = {'efficiency', 'progress'}
+
+ACTIVE_BADGES = {
+    True: "<span class='status-badge status-active'>Да</span>",
+    False: "<span class='status-badge status-inactive'>Нет</span>"
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def format_iso_date(value: str) -> str:
+    """Дата ISO 8601 в виде ДД.ММ.ГГГГ; даты в датасетах повторяются, поэтому кэшируется"""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).strftime('%d.%m.%Y')
+    except ValueError:
+        return value
+
+
+def _format_generic(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value[:3]) + ("..." if len(value) > 3 else "")
+    return str(value)
+
+
+def compile_cell_formatter(header: str, sample: Any = None) -> Callable[[Any], str]:
+    """Функция форматирования ячеек колонки
+    
+    Выбор по имени колонки делается один раз на таблицу, а не на каждую ячейку.
+    Для остальных колонок тип выводится по значению sample из первой строки:
+    строки и числа идут по короткому пути без проверок на список.
+    """
+    if header == 'salary':
+        return lambda value: "" if value is None else f"{value:,} ₽"
+    if header in PERCENT_COLUMNS:
+        return lambda value: "" if value is None else f"{value}%"
+    if header == 'active':
+        return lambda value: "" if value is None else ACTIVE_BADGES[bool(value)]
+    if header == 'status':
+        badges: Dict[Any, str] = {}
+        
+        def format_status(value: Any) -> str:
+            if value is None:
+                return ""
+            badge = badges.get(value)
+            if badge is None:
+                badge = badges[value] = \
+                    f"<span class='status-badge status-{STATUS_CLASSES.get(value, 'new')}'>{value}</span>"
+            return badge
+        return format_status
+    if header in DATE_COLUMNS:
+        def format_date(value: Any) -> str:
+            if value is None:
+                return ""
+            if isinstance(value, str):
+                return format_iso_date(value) if 'T' in value else value
+            return str(value)
+        return format_date
+    if isinstance(sample, str):
+        return lambda value: value if value.__class__ is str else _format_generic(value)
+    if isinstance(sample, int) and not isinstance(sample, bool):
+        return lambda value: str(value) if value.__class__ is int else _format_generic(value)
+    return _format_generic
+
+
+SCHEMA_SAMPLE_SIZE = 64
+# Колонки, которые есть меньше чем в половине записей, в таблицу не попадают
+MIN_COLUMN_PRESENCE = 0.5
+# Доля таких колонок среди всех, ниже которой записи считаются разнородными
+MIN_STABLE_SHARE = 0.5
+MAX_LIST_FIELDS = 5
+
+
+def _value_kind(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "date" if len(value) >= 10 and value[4:5] == '-' and value[7:8] == '-' else "string"
+    if isinstance(value, (list, tuple)):
+        return "list"
+    if isinstance(value, dict):
+        return "dict"
+    return "other"
+
+
+def sample_rows(data: Sequence, size: int = SCHEMA_SAMPLE_SIZE) -> List:
+    """Равномерная выборка строк, первая строка всегда в выборке"""
+    if len(data) <= size:
+        return list(data)
+    step = len(data) / size
+    return [data[int(i * step)] for i in range(size)]
+
+
+class ColumnSchema:
+    """Колонка выведенной схемы: тип значений, число различных значений и доля записей с полем"""
+
+    def __init__(self, name: str, kind: str, cardinality: Optional[int], presence: float, sample: Any = None):
+        self.name = name
+        self.kind = kind
+        self.cardinality = cardinality
+        self.presence = presence
+        self.sample = sample
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "kind": self.kind, "cardinality": self.cardinality,
+                "presence": round(self.presence, 3)}
+
+
+class DataSchema:
+    """Схема данных по выборке строк и выбранный по ней компонент
+
+    Форматтеры ячеек компилируются при первом обращении и живут вместе со схемой.
+    """
+
+    def __init__(self, shape: str, component: str, columns: Sequence[ColumnSchema] = (),
+                 rows: int = 0, sampled: int = 0):
+        self.shape = shape
+        self.component = component
+        self.columns = tuple(columns)
+        self.rows = rows
+        self.sampled = sampled
+        self._formatters: Optional[List[Tuple[str, Callable[[Any], str]]]] = None
+
+    def column_samples(self) -> List[Tuple[str, Any]]:
+        """(колонка, пример значения) для колонок таблицы"""
+        return [(column.name, column.sample) for column in self.columns if column.presence >= MIN_COLUMN_PRESENCE]
+
+    def formatters(self) -> List[Tuple[str, Callable[[Any], str]]]:
+        """(колонка, форматтер) для колонок таблицы"""
+        if self._formatters is None:
+            self._formatters = [(name, compile_cell_formatter(name, sample)) for name, sample in self.column_samples()]
+        return self._formatters
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"shape": self.shape, "component": self.component, "rows": self.rows,
+                "sampled": self.sampled, "columns": [column.to_dict() for column in self.columns]}
+
+
+def _record_columns(records: List[Dict]) -> List[ColumnSchema]:
+    """Колонки по выборке записей в порядке первого появления"""
+    seen: Dict[str, List] = {}
+    for record in records:
+        for name, value in record.items():
+            values = seen.get(name)
+            if values is None:
+                values = seen[name] = []
+            values.append(value)
+    columns = []
+    for name, values in seen.items():
+        kinds = {_value_kind(value) for value in values} - {"null"}
+        kind = kinds.pop() if len(kinds) == 1 else ("mixed" if kinds else "null")
+        try:
+            cardinality: Optional[int] = len(set(values))
+        except TypeError:
+            # Списки и словари не хэшируются, число различных значений не считаем
+            cardinality = None
+        sample = next((value for value in values if value is not None), None)
+        columns.append(ColumnSchema(name, kind, cardinality, len(values) / len(records), sample))
+    return columns
+
+
+def infer_schema(data: Any, sample_size: int = SCHEMA_SAMPLE_SIZE) -> DataSchema:
+    """Вывести схему данных и выбрать компонент для component_type="auto"
+
+    Смотрит на выборку строк, а не только на первую: записи с общим набором из
+    более чем MAX_LIST_FIELDS полей - таблица, разнородные или короткие записи -
+    список, числа - график, словарь - карточка.
+    """
+    if isinstance(data, dict):
+        return DataSchema("object", "card", _record_columns([data]), rows=1, sampled=1)
+    if not isinstance(data, (list, tuple)) or not data:
+        return DataSchema("scalar" if not isinstance(data, (list, tuple)) else "empty", "text")
+
+    rows = sample_rows(data, sample_size)
+    kinds = {_value_kind(row) for row in rows}
+    if kinds == {"dict"}:
+        columns = _record_columns(rows)
+        stable = sum(1 for column in columns if column.presence >= MIN_COLUMN_PRESENCE)
+        if columns and stable / len(columns) < MIN_STABLE_SHARE:
+            component = "list"
+        else:
+            component = "table" if stable > MAX_LIST_FIELDS else "list"
+        return DataSchema("records", component, columns, len(data), len(rows))
+    if kinds == {"number"}:
+        return DataSchema("numbers", "chart", rows=len(data), sampled=len(rows))
+    return DataSchema("values", "list", rows=len(data), sampled=len(rows))
+
+
+# Инструменты (@TOOLS.tool) и компоненты (@TOOLS.component) UIGeneratorDemoServer
+TOOLS = ToolRegistry()
+
+
 class UIGeneratorDemoServer:
-    """Демо сервер с примерами UI Generator"""
+    """Демо сервер с примерами UI Generator
+
+    Инструменты без случайных данных кэшируются: их результат определяется
+    аргументами и версией данных. Таблицы, списки и графики (компоненты с
+    offload_styles) могут рендериться в пуле процессов.
+    """
     
-    def __init__(self):
+    USER_FIELDS = ("id", "name", "email", "department", "position", "salary", "active",
+                   "joinDate", "skills", "tasksCompleted", "efficiency")
+    # Вторичные индексы датасетов, поддерживаются при каждом изменении
+    INDEXED_FIELDS = {
+        "users": ("department", "active"),
+        "tasks": ("status", "assignee", "priority")
+    }
+    # Колонки для колоночного представления (гистограммы, агрегаты)
+    NUMERIC_FIELDS = {
+        "users": ("id", "salary", "tasksCompleted", "efficiency"),
+        "tasks": ("estimatedHours", "loggedHours", "progress", "comments")
+    }
+    CATEGORICAL_FIELDS = {
+        "users": ("department", "position", "active"),
+        "tasks": ("status", "priority", "assignee")
+    }
+    MAX_PERFORMANCE_RECORDS = 1_000_000
+    
+    def __init__(self, cache_max_bytes: int = 32 * 1024 * 1024, shared_styles: bool = False,
+                 compression_level: int = 6, compression_min_size: int = 1024, profiling: bool = False):
         self.name = "UI Generator Demo Server"
         self.version = "1.0.0"
+        self.styles = StyleRegistry(shared=shared_styles)
+        # Версия данных увеличивается при любом изменении датасетов
+        self.data_version = 0
+        self.render_cache = RenderCache(max_bytes=cache_max_bytes)
+        # Одинаковые одновременные вызовы выполняются один раз
+        self.single_flight = SingleFlight()
+        self.compression = ResponseCompressor(level=compression_level, min_size=compression_min_size)
+        self.metrics = ToolMetrics()
+        self.profiles = ProfileStore(enabled=profiling)
+        self._cell_formatters: Dict[str, Callable[[Any], str]] = {}
+        self._tables: Dict[str, PagedTable] = {}
+        self._stores: Dict[str, RecordStore] = {}
+        self._columnar_tables: Dict[str, Tuple[int, ColumnarTable]] = {}
+        # Схемы датасетов для component_type="auto": имя -> ((id данных, версия), схема)
+        self._schemas: Dict[str, Tuple[Tuple[int, int], DataSchema]] = {}
+        self.schema_stats = {"hits": 0, "misses": 0}
+        # Пул процессов для больших рендеров, включается start_render_pool
+        self.render_pool: Optional[RenderPool] = None
         
         # Тестовые данные
         self.users_data = [
@@ -160,105 +893,199 @@ class UIGeneratorDemoServer:
                 "quality": 94
             }
         }
+        self.refresh_tool_catalog()
+
+    @property
+    def users_data(self) -> List[Dict]:
+        return self._stores["users"].records
+
+    @users_data.setter
+    def users_data(self, records: List[Dict]):
+        self._replace_dataset("users", records)
+
+    @property
+    def tasks_data(self) -> List[Dict]:
+        return self._stores["tasks"].records
+
+    @tasks_data.setter
+    def tasks_data(self, records: List[Dict]):
+        self._replace_dataset("tasks", records)
+
+    def start_render_pool(self, workers: int = 2, threshold: int = 5000) -> RenderPool:
+        """Рендерить таблицы, списки и графики от threshold записей в пуле из workers процессов"""
+        self.render_pool = RenderPool(os.path.abspath(__file__), type(self).__name__,
+                                      {"cache_max_bytes": 0, "shared_styles": self.styles.shared},
+                                      workers=workers, threshold=threshold)
+        self.render_pool.warm()
+        return self.render_pool
+
+    def _store(self, name: str) -> RecordStore:
+        if name not in self._stores:
+            raise ValueError(f"Неизвестный датасет: {name}")
+        return self._stores[name]
+
+    def _dataset(self, name: str) -> List[Dict]:
+        return self._store(name).records
+
+    def _replace_dataset(self, name: str, records: List[Dict]):
+        """Заменить датасет целиком с перестройкой индексов"""
+        self._stores[name] = RecordStore(records, self.INDEXED_FIELDS[name])
+        self.data_version += 1
+
+    def _paged_table(self, dataset: str) -> PagedTable:
+        """Индексированное представление датасета для текущей версии данных"""
+        table = self._tables.get(dataset)
+        if table is None or table.version != self.data_version:
+            table = PagedTable(self._dataset(dataset), self.data_version,
+                               lambda column: self._columnar_argsort(dataset, column))
+            self._tables[dataset] = table
+        return table
+
+    def _columnar_argsort(self, dataset: str, column: str) -> Optional[Sequence[int]]:
+        """Порядок сортировки числовой или категориальной колонки по колоночному снимку"""
+        if column not in self.NUMERIC_FIELDS[dataset] and column not in self.CATEGORICAL_FIELDS[dataset]:
+            return None
+        return self._columnar(dataset).argsort(column)
+
+    def _columnar(self, dataset: str) -> ColumnarTable:
+        """Колоночный снимок датасета для текущей версии данных"""
+        cached = self._columnar_tables.get(dataset)
+        if cached is None or cached[0] != self.data_version:
+            table = ColumnarTable.from_records(self._dataset(dataset), self.NUMERIC_FIELDS[dataset],
+                                               self.CATEGORICAL_FIELDS[dataset])
+            cached = self._columnar_tables[dataset] = (self.data_version, table)
+        return cached[1]
+
+    def schema_for(self, data: Any, dataset: Optional[str] = None) -> DataSchema:
+        """Схема данных; для именованного датасета кэшируется до изменения данных"""
+        if dataset is None:
+            return infer_schema(data)
+        identity = (id(data), self.data_version)
+        cached = self._schemas.get(dataset)
+        if cached is not None and cached[0] == identity:
+            self.schema_stats["hits"] += 1
+            return cached[1]
+        self.schema_stats["misses"] += 1
+        schema = infer_schema(data)
+        self._schemas[dataset] = (identity, schema)
+        return schema
+
+    def add_record(self, dataset: str, record: Dict) -> Dict:
+        """Добавить запись в датасет"""
+        self._store(dataset).add(record)
+        self.data_version += 1
+        return record
+
+    def update_record(self, dataset: str, record_id: Any, changes: Dict) -> Optional[Dict]:
+        """Обновить поля записи по ID"""
+        record = self._store(dataset).update(record_id, changes)
+        if record is None:
+            return None
+        self.data_version += 1
+        return record
+
+    def delete_record(self, dataset: str, record_id: Any) -> bool:
+        """Удалить запись по ID"""
+        if not self._store(dataset).delete(record_id):
+            return False
+        self.data_version += 1
+        return True
+
+    def update_project(self, section: str, changes: Any):
+        """Обновить раздел данных проекта (info, team, metrics)"""
+        if isinstance(changes, dict) and isinstance(self.project_data.get(section), dict):
+            self.project_data[section].update(changes)
+        else:
+            self.project_data[section] = changes
+        self.data_version += 1
+
+    def stream_tool_result(self, tool_name: str, arguments: Dict[str, Any],
+                           known_styles: Optional[Set[str]] = None) -> Optional[Iterator[bytes]]:
+        """Потоковый JSON результат инструментов с потоковой отдачей (stream в реестре)
+        
+        Возвращает None, если инструмент не поддерживает потоковую отдачу или его
+        результат уже в кэше.
+        """
+        spec = TOOLS.get(tool_name)
+        if spec is None or spec.stream is None:
+            return None
+        uri, fragments = spec.stream
+        try:
+            arguments = spec.validate(arguments)
+            if spec.cacheable(arguments) and \
+                    RenderCache.make_key(tool_name, arguments, self.data_version) in self.render_cache:
+                return None
+            fragments = fragments(self, arguments)
+        except (TypeError, ValueError):
+            # Ошибку в аргументах вернёт обычный tools/call
+            return None
+        return iter_tool_result_json(f"{uri}-{datetime.now().timestamp()}", fragments,
+                                     self.styles, known_styles)
+
+    def refresh_tool_catalog(self):
+        """Пересобрать каталог инструментов (tools/list, GET /tools); нужно при изменении набора"""
+        self.tool_catalog = ToolCatalog(self.get_available_tools(), self.compression)
 
     def get_available_tools(self) -> List[Dict[str, Any]]:
         """Получить список доступных инструментов"""
-        return [
-            {
-                "name": "show_users_table",
-                "description": "Показать таблицу пользователей (демо UI Generator - Table)"
-            },
-            {
-                "name": "show_user_profile",
-                "description": "Показать профиль пользователя (демо UI Generator - Card)",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "userId": {
-                            "type": "integer",
-                            "description": "ID пользователя (1-4)"
-                        }
-                    }
-                }
-            },
-            {
-                "name": "show_tasks_list",
-                "description": "Показать список задач (демо UI Generator - List)"
-            },
-            {
-                "name": "show_project_dashboard",
-                "description": "Показать дашборд проекта (демо UI Generator - Dashboard)"
-            },
-            {
-                "name": "show_statistics_chart",
-                "description": "Показать график статистики (демо UI Generator - Chart)"
-            },
-            {
-                "name": "create_user_form",
-                "description": "Показать форму создания пользователя (демо UI Generator - Form)"
-            },
-            {
-                "name": "show_notifications_demo",
-                "description": "Показать различные уведомления (демо UI Generator - Notifications)"
-            },
-            {
-                "name": "auto_generate_interface",
-                "description": "Автоматическая генерация интерфейса для любых данных",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "dataType": {
-                            "type": "string",
-                            "enum": ["users", "tasks", "project", "random"],
-                            "description": "Тип данных для генерации"
-                        }
-                    }
-                }
-            },
-            {
-                "name": "performance_test",
-                "description": "Тест производительности UI Generator"
-            }
-        ]
+        return TOOLS.catalog()
 
-    def create_ui_response(self, data: Any, title: str = "", component_type: str = "auto") -> Dict[str, Any]:
-        """Создать ответ с UI используя встроенный генератор"""
+    def create_ui_response(self, data: Any, title: str = "", component_type: str = "auto",
+                           dataset: Optional[str] = None) -> Dict[str, Any]:
+        """Создать ответ с UI используя встроенный генератор
         
-        # Определяем тип компонента автоматически если не указан
-        if component_type == "auto":
-            if isinstance(data, list) and len(data) > 0:
-                if isinstance(data[0], dict):
-                    # Массив объектов
-                    fields_count = len(data[0].keys()) if data[0] else 0
-                    component_type = "table" if fields_count > 5 else "list"
-                elif isinstance(data[0], (int, float)):
-                    # Массив чисел
-                    component_type = "chart"
-                else:
-                    component_type = "list"
-            elif isinstance(data, dict):
-                component_type = "card"
-            else:
-                component_type = "text"
-
-        # Генерируем HTML в зависимости от типа компонента
-        if component_type == "table":
-            html = self.generate_table(data, title)
-        elif component_type == "card":
-            html = self.generate_card(data, title)
-        elif component_type == "list":
-            html = self.generate_list(data, title)
-        elif component_type == "chart":
-            html = self.generate_chart(data, title)
-        elif component_type == "dashboard":
-            html = self.generate_dashboard(data, title)
-        elif component_type == "form":
-            html = self.generate_form(data, title)
-        elif component_type == "notification":
-            html = self.generate_notification(data, title)
-        else:
-            html = self.generate_text(data, title)
+        dataset - имя датасета, по которому кэшируется схема для component_type="auto".
+        """
+        component_type, schema = self._resolve_component(data, component_type, dataset)
+        return self._ui_response(component_type, self._render_component(data, title, component_type, schema))
+
+    async def create_ui_response_async(self, data: Any, title: str = "", component_type: str = "auto",
+                                       dataset: Optional[str] = None) -> Dict[str, Any]:
+        """create_ui_response для инструментов: большие таблицы, списки и графики
+        рендерятся в пуле процессов (render_pool), не занимая цикл событий
+        
+        dataset - имя датасета, если data - весь датасет: тогда процесс пула
+        берёт свою копию данных вместо передачи их в каждом вызове.
+        """
+        component_type, schema = self._resolve_component(data, component_type, dataset)
+        pool = self.render_pool
+        component = TOOLS.components.get(component_type)
+        if pool is None or component is None or component.offload_styles is None or \
+                not isinstance(data, list) or not pool.should_offload(len(data)):
+            return self._ui_response(component_type, self._render_component(data, title, component_type, schema))
+
+        args: Tuple = (title,)
+        if component_type == "table" and schema is not None:
+            args = (title, schema.column_samples())
+        reference = None
+        if dataset is not None and dataset in self._stores and data is self._dataset(dataset):
+            reference = (dataset, self.data_version)
+        # В режиме shared_styles CSS должен быть известен этому процессу, чтобы приложить его к ответу
+        self.styles.render(component.offload_styles)
+        try:
+            html = await pool.render(f"generate_{component_type}", data, args, reference)
+        except BrokenProcessPool:
+            logger.warning("Процесс пула рендеринга завершился, рендер выполняется на месте")
+            html = self._render_component(data, title, component_type, schema)
+        return self._ui_response(component_type, html)
 
+    def _resolve_component(self, data: Any, component_type: str,
+                           dataset: Optional[str]) -> Tuple[str, Optional[DataSchema]]:
+        """Тип компонента и схема данных (только для component_type="auto")"""
+        if component_type != "auto":
+            return component_type, None
+        # Определяем тип компонента по схеме данных
+        schema = self.schema_for(data, dataset)
+        return schema.component, schema
+
+    def _render_component(self, data: Any, title: str, component_type: str,
+                          schema: Optional[DataSchema] = None) -> str:
+        """HTML компонента в текущем процессе; неизвестный тип выводится текстом"""
+        component = TOOLS.components.get(component_type) or TOOLS.components["text"]
+        return component.render(self, data, title, schema)
+
+    @staticmethod
+    def _ui_response(component_type: str, html: str) -> Dict[str, Any]:
         return {
             "content": [
                 {
@@ -272,80 +1099,65 @@ class UIGeneratorDemoServer:
             ]
         }
 
-    def generate_table(self, data: List[Dict], title: str) -> str:
-        """Генерация таблицы"""
-        if not data:
-            return f"<div class='no-data'>Нет данных для отображения</div>"
+    @TOOLS.component("table", offload_styles=TABLE_STYLES, uses_schema=True)
+    def render_table(self, data: Iterable[Dict], title: str, schema: Optional[DataSchema] = None) -> str:
+        """Таблица с форматтерами колонок из схемы данных (кэшируются вместе со схемой)"""
+        return "".join(self.iter_table(data, title, columns=schema.formatters() if schema else None))
+
+    def generate_table(self, data: Iterable[Dict], title: str,
+                       column_samples: Optional[Sequence[Tuple[str, Any]]] = None) -> str:
+        """Генерация таблицы
         
-        headers = list(data[0].keys())
-        header_row = "".join([f"<th>{self.format_header(h)}</th>" for h in headers])
+        column_samples - (колонка, пример значения) из схемы данных; без них
+        колонки берутся из первой строки.
+        """
+        columns = None
+        if column_samples is not None:
+            columns = [(name, compile_cell_formatter(name, sample)) for name, sample in column_samples]
+        return "".join(self.iter_table(data, title, columns=columns))
+
+    def iter_table(self, data: Iterable[Dict], title: str, batch_size: int = 256,
+                   columns: Optional[List[Tuple[str, Callable[[Any], str]]]] = None) -> Iterator[str]:
+        """Потоковая генерация таблицы фрагментами по batch_size строк
         
-        rows = []
-        for item in data:
-            cells = []
-            for header in headers:
-                value = item.get(header, "")
-                formatted_value = self.format_cell_value(value, header)
-                cells.append(f"<td>{formatted_value}</td>")
-            rows.append(f"<tr>{''.join(cells)}</tr>")
+        columns - готовые (колонка, форматтер) из схемы данных; без них колонки
+        берутся из первой строки.
+        """
+        rows = iter(data)
+        first = next(rows, None)
+        if first is None:
+            yield f"<div class='no-data'>Нет данных для отображения</div>"
+            return
         
-        return f"""
-        <style>
-            .ui-container {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 20px 0;
-            }}
-            .ui-title {{
-                font-size: 18px;
-                font-weight: 600;
-                margin-bottom: 16px;
-                color: #333;
-            }}
-            .ui-table {{
-                width: 100%;
-                border-collapse: collapse;
-                background: white;
-                border-radius: 8px;
-                overflow: hidden;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            }}
-            .ui-table th {{
-                background: #f8f9fa;
-                padding: 12px;
-                text-align: left;
-                font-weight: 600;
-                color: #495057;
-                border-bottom: 2px solid #dee2e6;
-            }}
-            .ui-table td {{
-                padding: 12px;
-                border-bottom: 1px solid #dee2e6;
-                color: #212529;
-            }}
-            .ui-table tr:hover {{
-                background: #f8f9fa;
-            }}
-            .status-badge {{
-                padding: 4px 8px;
-                border-radius: 12px;
-                font-size: 12px;
-                font-weight: 500;
-            }}
-            .status-active {{ background: #d4edda; color: #155724; }}
-            .status-inactive {{ background: #f8d7da; color: #721c24; }}
-            .status-work {{ background: #fff3cd; color: #856404; }}
-            .status-done {{ background: #d1ecf1; color: #0c5460; }}
-            .status-new {{ background: #e2e3e5; color: #495057; }}
-        </style>
+        if columns is None:
+            # Форматтеры выбираются один раз на таблицу
+            columns = [(header, compile_cell_formatter(header, value)) for header, value in first.items()]
+        header_row = "".join([f"<th>{self.format_header(header)}</th>" for header, _ in columns])
+        
+        yield f"""
+        {self.styles.render(TABLE_STYLES)}
         <div class="ui-container">
             {f'<h2 class="ui-title">{title}</h2>' if title else ''}
             <table class="ui-table">
                 <thead><tr>{header_row}</tr></thead>
-                <tbody>{''.join(rows)}</tbody>
+                <tbody>"""
+        
+        batch = []
+        for item in itertools.chain((first,), rows):
+            cells = "".join(["<td>" + formatter(item.get(header)) + "</td>" for header, formatter in columns])
+            batch.append(f"<tr>{cells}</tr>")
+            if len(batch) >= batch_size:
+                yield "".join(batch)
+                batch = []
+        if batch:
+            yield "".join(batch)
+        
+        yield """</tbody>
             </table>
         </div>
         """
 
+    @TOOLS.component("card")
     def generate_card(self, data: Dict, title: str) -> str:
         """Генерация карточки"""
         fields = []
@@ -360,46 +1172,7 @@ class UIGeneratorDemoServer:
             """)
         
         return f"""
-        <style>
-            .ui-container {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 20px 0;
-            }}
-            .ui-title {{
-                font-size: 18px;
-                font-weight: 600;
-                margin-bottom: 16px;
-                color: #333;
-            }}
-            .ui-card {{
-                background: white;
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                padding: 20px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                max-width: 500px;
-            }}
-            .ui-field {{
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                margin: 12px 0;
-                padding: 8px 0;
-                border-bottom: 1px solid #f1f3f4;
-            }}
-            .ui-field:last-child {{
-                border-bottom: none;
-            }}
-            .ui-field-label {{
-                font-weight: 600;
-                color: #495057;
-                min-width: 120px;
-            }}
-            .ui-field-value {{
-                color: #212529;
-                text-align: right;
-            }}
-        </style>
+        {self.styles.render(CARD_STYLES)}
         <div class="ui-container">
             {f'<h2 class="ui-title">{title}</h2>' if title else ''}
             <div class="ui-card">
@@ -408,6 +1181,7 @@ class UIGeneratorDemoServer:
         </div>
         """
 
+    @TOOLS.component("dashboard")
     def generate_dashboard(self, data: Dict, title: str) -> str:
         """Генерация дашборда"""
         metrics = data.get('metrics', {})
@@ -447,81 +1221,7 @@ class UIGeneratorDemoServer:
             """)
         
         return f"""
-        <style>
-            .ui-container {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 20px 0;
-            }}
-            .ui-title {{
-                font-size: 20px;
-                font-weight: 600;
-                margin-bottom: 20px;
-                color: #333;
-            }}
-            .metrics-grid {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(150px, 1fr));
-                gap: 16px;
-                margin-bottom: 24px;
-            }}
-            .metric-card {{
-                background: white;
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                padding: 16px;
-                text-align: center;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            }}
-            .metric-label {{
-                font-size: 12px;
-                color: #6c757d;
-                margin-bottom: 8px;
-                text-transform: uppercase;
-                letter-spacing: 0.5px;
-            }}
-            .metric-value {{
-                font-size: 24px;
-                font-weight: 700;
-                color: #333;
-            }}
-            .metric-primary {{ border-left: 4px solid #007bff; }}
-            .metric-success {{ border-left: 4px solid #28a745; }}
-            .metric-warning {{ border-left: 4px solid #ffc107; }}
-            .metric-danger {{ border-left: 4px solid #dc3545; }}
-            .metric-info {{ border-left: 4px solid #17a2b8; }}
-            .metric-secondary {{ border-left: 4px solid #6c757d; }}
-            .team-grid {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                gap: 16px;
-            }}
-            .team-card {{
-                background: white;
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                padding: 16px;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            }}
-            .team-name {{
-                font-weight: 600;
-                color: #333;
-                margin-bottom: 4px;
-            }}
-            .team-role {{
-                color: #6c757d;
-                font-size: 14px;
-                margin-bottom: 8px;
-            }}
-            .team-stats {{
-                display: flex;
-                flex-direction: column;
-                gap: 4px;
-            }}
-            .team-stats span {{
-                font-size: 12px;
-                color: #495057;
-            }}
-        </style>
+        {self.styles.render(DASHBOARD_STYLES)}
         <div class="ui-container">
             {f'<h2 class="ui-title">{title}</h2>' if title else ''}
             <div class="metrics-grid">
@@ -531,6 +1231,7 @@ class UIGeneratorDemoServer:
         </div>
         """
 
+    @TOOLS.component("chart", offload_styles=CHART_STYLES)
     def generate_chart(self, data: List, title: str) -> str:
         """Генерация графика"""
         if not data or not all(isinstance(x, (int, float)) for x in data):
@@ -550,62 +1251,7 @@ class UIGeneratorDemoServer:
             """)
         
         return f"""
-        <style>
-            .ui-container {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 20px 0;
-            }}
-            .ui-title {{
-                font-size: 18px;
-                font-weight: 600;
-                margin-bottom: 16px;
-                color: #333;
-            }}
-            .chart-container {{
-                background: white;
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                padding: 20px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            }}
-            .chart {{
-                display: flex;
-                align-items: flex-end;
-                height: 200px;
-                gap: 8px;
-                margin: 20px 0;
-            }}
-            .chart-bar {{
-                flex: 1;
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                height: 100%;
-                position: relative;
-            }}
-            .chart-bar-fill {{
-                width: 100%;
-                background: linear-gradient(to top, #007bff, #0056b3);
-                border-radius: 4px 4px 0 0;
-                min-height: 4px;
-                transition: all 0.3s ease;
-            }}
-            .chart-bar:hover .chart-bar-fill {{
-                background: linear-gradient(to top, #0056b3, #004085);
-            }}
-            .chart-bar-label {{
-                position: absolute;
-                top: -20px;
-                font-size: 12px;
-                font-weight: 600;
-                color: #495057;
-            }}
-            .chart-bar-index {{
-                margin-top: 8px;
-                font-size: 12px;
-                color: #6c757d;
-            }}
-        </style>
+        {self.styles.render(CHART_STYLES)}
         <div class="ui-container">
             {f'<h2 class="ui-title">{title}</h2>' if title else ''}
             <div class="chart-container">
@@ -616,6 +1262,7 @@ class UIGeneratorDemoServer:
         </div>
         """
 
+    @TOOLS.component("list", offload_styles=LIST_STYLES)
     def generate_list(self, data: List, title: str) -> str:
         """Генерация списка"""
         items = []
@@ -630,7 +1277,7 @@ class UIGeneratorDemoServer:
                 
                 items.append(f"""
                     <div class="list-item">
-                        <div class="item-header">{item.get('title', item.get('name', f'Элемент {item.get("id", "")}')))}</div>
+                        <div class="item-header">{item.get('title', item.get('name', f'Элемент {item.get("id", "")}'))}</div>
                         <div class="item-content">{'<br>'.join(fields)}</div>
                     </div>
                 """)
@@ -639,54 +1286,7 @@ class UIGeneratorDemoServer:
                 items.append(f'<div class="list-item simple">{item}</div>')
         
         return f"""
-        <style>
-            .ui-container {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 20px 0;
-            }}
-            .ui-title {{
-                font-size: 18px;
-                font-weight: 600;
-                margin-bottom: 16px;
-                color: #333;
-            }}
-            .list-container {{
-                display: flex;
-                flex-direction: column;
-                gap: 12px;
-            }}
-            .list-item {{
-                background: white;
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                padding: 16px;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-                transition: all 0.2s ease;
-            }}
-            .list-item:hover {{
-                box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-                transform: translateY(-1px);
-            }}
-            .list-item.simple {{
-                padding: 12px 16px;
-                color: #495057;
-            }}
-            .item-header {{
-                font-weight: 600;
-                color: #333;
-                margin-bottom: 8px;
-                font-size: 16px;
-            }}
-            .item-content {{
-                color: #6c757d;
-                font-size: 14px;
-                line-height: 1.5;
-            }}
-            .item-field {{
-                display: inline-block;
-                margin-right: 16px;
-            }}
-        </style>
+        {self.styles.render(LIST_STYLES)}
         <div class="ui-container">
             {f'<h2 class="ui-title">{title}</h2>' if title else ''}
             <div class="list-container">
@@ -695,6 +1295,7 @@ class UIGeneratorDemoServer:
         </div>
         """
 
+    @TOOLS.component("form")
     def generate_form(self, fields: List[Dict], title: str) -> str:
         """Генерация формы"""
         form_fields = []
@@ -721,67 +1322,7 @@ class UIGeneratorDemoServer:
             """)
         
         return f"""
-        <style>
-            .ui-container {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 20px 0;
-            }}
-            .ui-title {{
-                font-size: 18px;
-                font-weight: 600;
-                margin-bottom: 16px;
-                color: #333;
-            }}
-            .form-container {{
-                background: white;
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                padding: 24px;
-                max-width: 500px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            }}
-            .form-field {{
-                margin-bottom: 20px;
-            }}
-            .form-field label {{
-                display: block;
-                margin-bottom: 6px;
-                font-weight: 500;
-                color: #495057;
-            }}
-            .form-field input,
-            .form-field select,
-            .form-field textarea {{
-                width: 100%;
-                padding: 10px 12px;
-                border: 1px solid #ced4da;
-                border-radius: 4px;
-                font-size: 14px;
-                box-sizing: border-box;
-                transition: border-color 0.15s ease-in-out;
-            }}
-            .form-field input:focus,
-            .form-field select:focus,
-            .form-field textarea:focus {{
-                outline: none;
-                border-color: #007bff;
-                box-shadow: 0 0 0 2px rgba(0,123,255,0.25);
-            }}
-            .form-submit {{
-                background: #007bff;
-                color: white;
-                padding: 12px 24px;
-                border: none;
-                border-radius: 4px;
-                font-size: 16px;
-                font-weight: 500;
-                cursor: pointer;
-                transition: background-color 0.15s ease-in-out;
-            }}
-            .form-submit:hover {{
-                background: #0056b3;
-            }}
-        </style>
+        {self.styles.render(FORM_STYLES)}
         <div class="ui-container">
             {f'<h2 class="ui-title">{title}</h2>' if title else ''}
             <div class="form-container">
@@ -793,6 +1334,7 @@ class UIGeneratorDemoServer:
         </div>
         """
 
+    @TOOLS.component("notification")
     def generate_notification(self, notifications: List[Dict], title: str) -> str:
         """Генерация уведомлений"""
         notification_items = []
@@ -816,55 +1358,7 @@ class UIGeneratorDemoServer:
             """)
         
         return f"""
-        <style>
-            .ui-container {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 20px 0;
-            }}
-            .ui-title {{
-                font-size: 18px;
-                font-weight: 600;
-                margin-bottom: 16px;
-                color: #333;
-            }}
-            .notifications-container {{
-                display: flex;
-                flex-direction: column;
-                gap: 12px;
-            }}
-            .notification {{
-                padding: 16px;
-                border-radius: 8px;
-                border-left: 4px solid;
-            }}
-            .notif-success {{
-                background: #d4edda;
-                border-color: #28a745;
-                color: #155724;
-            }}
-            .notif-warning {{
-                background: #fff3cd;
-                border-color: #ffc107;
-                color: #856404;
-            }}
-            .notif-error {{
-                background: #f8d7da;
-                border-color: #dc3545;
-                color: #721c24;
-            }}
-            .notif-info {{
-                background: #d1ecf1;
-                border-color: #17a2b8;
-                color: #0c5460;
-            }}
-            .notif-title {{
-                font-weight: 600;
-                margin-bottom: 6px;
-            }}
-            .notif-message {{
-                line-height: 1.4;
-            }}
-        </style>
+        {self.styles.render(NOTIFICATION_STYLES)}
         <div class="ui-container">
             {f'<h2 class="ui-title">{title}</h2>' if title else ''}
             <div class="notifications-container">
@@ -873,6 +1367,7 @@ class UIGeneratorDemoServer:
         </div>
         """
 
+    @TOOLS.component("text")
     def generate_text(self, data: Any, title: str) -> str:
         """Генерация текста"""
         if isinstance(data, (dict, list)):
@@ -883,39 +1378,7 @@ class UIGeneratorDemoServer:
             content_class = "text-simple"
         
         return f"""
-        <style>
-            .ui-container {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 20px 0;
-            }}
-            .ui-title {{
-                font-size: 18px;
-                font-weight: 600;
-                margin-bottom: 16px;
-                color: #333;
-            }}
-            .text-container {{
-                background: white;
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                padding: 20px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            }}
-            .text-json {{
-                background: #f8f9fa;
-                padding: 16px;
-                border-radius: 4px;
-                font-family: 'Monaco', 'Menlo', 'Ubuntu Mono', monospace;
-                font-size: 14px;
-                white-space: pre-wrap;
-                overflow-x: auto;
-                color: #495057;
-            }}
-            .text-simple {{
-                color: #212529;
-                line-height: 1.6;
-            }}
-        </style>
+        {self.styles.render(TEXT_STYLES)}
         <div class="ui-container">
             {f'<h2 class="ui-title">{title}</h2>' if title else ''}
             <div class="text-container">
@@ -926,95 +1389,84 @@ class UIGeneratorDemoServer:
 
     def format_header(self, header: str) -> str:
         """Форматирование заголовков"""
-        translations = {
-            'id': 'ID',
-            'name': 'Имя',
-            'email': 'Email',
-            'department': 'Отдел',
-            'position': 'Должность',
-            'salary': 'Зарплата',
-            'active': 'Активен',
-            'joinDate': 'Дата найма',
-            'skills': 'Навыки',
-            'tasksCompleted': 'Задач выполнено',
-            'efficiency': 'Эффективность',
-            'title': 'Название',
-            'description': 'Описание',
-            'status': 'Статус',
-            'priority': 'Приоритет',
-            'assignee': 'Исполнитель',
-            'reporter': 'Автор',
-            'created': 'Создана',
-            'updated': 'Обновлена',
-            'dueDate': 'Срок',
-            'progress': 'Прогресс',
-            'estimatedHours': 'Часов оценка',
-            'loggedHours': 'Часов потрачено',
-            'tags': 'Теги',
-            'comments': 'Комментарии'
-        }
-        return translations.get(header, header)
+        return HEADER_TRANSLATIONS.get(header, header)
 
     def format_cell_value(self, value: Any, header: str) -> str:
         """Форматирование значений ячеек"""
-        if value is None:
-            return ""
-        
-        if header in ['salary']:
-            return f"{value:,} ₽"
-        elif header in ['efficiency', 'progress']:
-            return f"{value}%"
-        elif header == 'active':
-            return f"<span class='status-badge status-{'active' if value else 'inactive'}'>{'Да' if value else 'Нет'}</span>"
-        elif header == 'status':
-            status_map = {
-                'В работе': 'work',
-                'Завершена': 'done',
-                'Новая': 'new'
-            }
-            status_class = status_map.get(value, 'new')
-            return f"<span class='status-badge status-{status_class}'>{value}</span>"
-        elif header in ['joinDate', 'created', 'updated', 'dueDate']:
-            if isinstance(value, str) and 'T' in value:
-                # ISO формат
-                try:
-                    from datetime import datetime
-                    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                    return dt.strftime('%d.%m.%Y')
-                except:
-                    return value
-            return value
-        elif isinstance(value, list):
-            return ", ".join(str(item) for item in value[:3]) + ("..." if len(value) > 3 else "")
-        
-        return str(value)
+        formatter = self._cell_formatters.get(header)
+        if formatter is None:
+            formatter = self._cell_formatters[header] = compile_cell_formatter(header)
+        return formatter(value)
 
     # Методы инструментов
+    def _users_page(self, arguments: Dict[str, Any]):
+        """Страница пользователей по аргументам page/pageSize/sortBy/sortOrder/filter и заголовок"""
+        query = TableQuery.from_arguments(arguments, self.USER_FIELDS)
+        if query.paged or query.filters or query.sort_by:
+            users, total = self._paged_table("users").query(query)
+        else:
+            # Весь датасет без копии: пул рендеринга получает его по ссылке на копию в процессе
+            users = self._dataset("users")
+            total = len(users)
+        return users, page_description("Список сотрудников компании", query, len(users), total)
+
+    def _users_table_fragments(self, arguments: Dict[str, Any]) -> Iterator[str]:
+        """HTML фрагменты таблицы пользователей для потоковой отдачи"""
+        users, title = self._users_page(arguments)
+        return self.iter_table(users, title)
+
+    @TOOLS.tool(
+        "show_users_table",
+        "Показать таблицу пользователей (демо UI Generator - Table)",
+        {"type": "object", "properties": table_query_schema(USER_FIELDS)},
+        cacheable=True,
+        stream=("ui://demo-table", _users_table_fragments)
+    )
     async def show_users_table(self, **kwargs) -> Dict[str, Any]:
         """Показать таблицу пользователей"""
-        return self.create_ui_response(
-            self.users_data,
-            "Список сотрудников компании",
-            "table"
+        users, title = self._users_page(kwargs)
+        return await self.create_ui_response_async(
+            users,
+            title,
+            "table",
+            "users"
         )
 
+    @TOOLS.tool(
+        "show_user_profile",
+        "Показать профиль пользователя (демо UI Generator - Card)",
+        {
+            "type": "object",
+            "properties": {
+                "userId": {
+                    "type": "integer",
+                    "description": "ID пользователя (1-4)"
+                }
+            }
+        },
+        cacheable=True
+    )
     async def show_user_profile(self, userId: int = 1, **kwargs) -> Dict[str, Any]:
         """Показать профиль пользователя"""
-        user = next((u for u in self.users_data if u['id'] == userId), self.users_data[0])
+        user = self._stores["users"].get(userId) or self.users_data[0]
         return self.create_ui_response(
             user,
             f"Профиль: {user['name']}",
             "card"
         )
 
+    @TOOLS.tool("show_tasks_list", "Показать список задач (демо UI Generator - List)", cacheable=True)
     async def show_tasks_list(self, **kwargs) -> Dict[str, Any]:
         """Показать список задач"""
-        return self.create_ui_response(
+        return await self.create_ui_response_async(
             self.tasks_data,
             "Активные задачи проекта",
-            "list"
+            "list",
+            "tasks"
         )
 
+    @TOOLS.tool("show_project_dashboard", "Показать дашборд проекта (демо UI Generator - Dashboard)",
+                cacheable=True)
     async def show_project_dashboard(self, **kwargs) -> Dict[str, Any]:
         """Показать дашборд проекта"""
         return self.create_ui_response(
@@ -1023,8 +1475,39 @@ class UIGeneratorDemoServer:
             "dashboard"
         )
 
-    async def show_statistics_chart(self, **kwargs) -> Dict[str, Any]:
+    @TOOLS.tool(
+        "show_statistics_chart",
+        "Показать график статистики (демо UI Generator - Chart)",
+        {
+            "type": "object",
+            "properties": {
+                "column": {
+                    "type": "string",
+                    "enum": list(NUMERIC_FIELDS["users"]),
+                    "description": "Числовая колонка пользователей для гистограммы"
+                },
+                "bins": {
+                    "type": "integer",
+                    "description": "Число интервалов гистограммы (по умолчанию 10)"
+                }
+            }
+        },
+        # Гистограмма по колонке детерминирована, случайная статистика - нет
+        cacheable=lambda arguments: "column" in arguments
+    )
+    async def show_statistics_chart(self, column: Optional[str] = None, bins: int = 10, **kwargs) -> Dict[str, Any]:
         """Показать график статистики"""
+        if column:
+            table = self._columnar("users")
+            if column not in table.numeric:
+                raise ValueError(f"Колонка {column} не числовая")
+            histogram = table.histogram(column, min(max(int(bins), 1), 50))
+            return self.create_ui_response(
+                [bucket["count"] for bucket in histogram],
+                f"Распределение {column}: {histogram[0]['from']:,.0f} – {histogram[-1]['to']:,.0f}" if histogram
+                else f"Распределение {column}",
+                "chart"
+            )
         # Генерируем случайную статистику
         stats = [random.randint(10, 50) for _ in range(12)]
         return self.create_ui_response(
@@ -1033,6 +1516,8 @@ class UIGeneratorDemoServer:
             "chart"
         )
 
+    @TOOLS.tool("create_user_form", "Показать форму создания пользователя (демо UI Generator - Form)",
+                cacheable=True)
     async def create_user_form(self, **kwargs) -> Dict[str, Any]:
         """Показать форму создания пользователя"""
         form_fields = [
@@ -1049,6 +1534,8 @@ class UIGeneratorDemoServer:
             "form"
         )
 
+    @TOOLS.tool("show_notifications_demo", "Показать различные уведомления (демо UI Generator - Notifications)",
+                cacheable=True)
     async def show_notifications_demo(self, **kwargs) -> Dict[str, Any]:
         """Показать различные уведомления"""
         notifications = [
@@ -1079,50 +1566,88 @@ class UIGeneratorDemoServer:
             "notification"
         )
 
+    @TOOLS.tool(
+        "auto_generate_interface",
+        "Автоматическая генерация интерфейса для любых данных",
+        {
+            "type": "object",
+            "properties": {
+                "dataType": {
+                    "type": "string",
+                    "enum": ["users", "tasks", "project", "random"],
+                    "description": "Тип данных для генерации"
+                }
+            }
+        },
+        cacheable=lambda arguments: arguments.get("dataType", "users") != "random"
+    )
     async def auto_generate_interface(self, dataType: str = "users", **kwargs) -> Dict[str, Any]:
         """Автоматическая генерация интерфейса"""
-        data_map = {
-            "users": self.users_data,
-            "tasks": self.tasks_data,
-            "project": self.project_data,
-            "random": [random.randint(1, 100) for _ in range(10)]
+        datasets = {
+            "users": lambda: self.users_data,
+            "tasks": lambda: self.tasks_data,
+            "project": lambda: self.project_data
         }
         
-        data = data_map.get(dataType, self.users_data)
-        return self.create_ui_response(
+        if dataType == "random":
+            data, dataset = [random.randint(1, 100) for _ in range(10)], None
+        else:
+            dataset = dataType if dataType in datasets else "users"
+            data = datasets[dataset]()
+        return await self.create_ui_response_async(
             data,
             f"Автоматически сгенерированный интерфейс для: {dataType}",
-            "auto"
+            "auto",
+            dataset
         )
 
-    async def performance_test(self, **kwargs) -> Dict[str, Any]:
-        """Тест производительности"""
-        import time
+    @TOOLS.tool(
+        "performance_test",
+        "Тест производительности UI Generator",
+        {
+            "type": "object",
+            "properties": {
+                "records": {
+                    "type": "integer",
+                    "description": "Размер синтетического датасета (по умолчанию 100)"
+                }
+            }
+        }
+    )
+    async def performance_test(self, records: int = 100, **kwargs) -> Dict[str, Any]:
+        """Тест производительности
         
-        start_time = time.time()
+        Один замер для демонстрации; полный набор генераторов и размеров с прогревом
+        и перцентилями - benchmarks/generators.py.
+        """
+        records = min(max(int(records), 1), self.MAX_PERFORMANCE_RECORDS)
+        start_time = time.perf_counter_ns()
         
-        # Генерируем большой набор данных
-        large_dataset = []
-        for i in range(100):
-            large_dataset.append({
-                "id": i + 1,
-                "name": f"Пользователь {i + 1}",
-                "email": f"user{i + 1}@test.com",
-                "department": random.choice(["IT", "HR", "Sales", "Marketing"]),
-                "salary": random.randint(50000, 200000),
-                "active": random.choice([True, False])
-            })
+        # Генерируем большой набор данных сразу в колоночном виде
+        large_dataset = synthetic_users(records, seed=random.randrange(2 ** 32))
         
-        # Измеряем время генерации
-        gen_start = time.time()
-        response = self.create_ui_response(large_dataset, "Тест производительности (100 записей)", "table")
-        gen_time = time.time() - gen_start
+        # Агрегация по отделам считается по колонкам целиком
+        agg_start = time.perf_counter_ns()
+        departments = large_dataset.group_totals("department", ("salary",))
+        agg_time = (time.perf_counter_ns() - agg_start) / 1e9
         
-        total_time = time.time() - start_time
+        # Измеряем время генерации; в таблицу попадают первые 100 записей
+        gen_start = time.perf_counter_ns()
+        response = self.create_ui_response(
+            list(large_dataset.rows(range(min(records, 100)))),
+            f"Тест производительности ({records} записей)",
+            "table"
+        )
+        gen_time = (time.perf_counter_ns() - gen_start) / 1e9
+        
+        total_time = (time.perf_counter_ns() - start_time) / 1e9
         
         # Добавляем информацию о производительности
         perf_info = {
-            "records": len(large_dataset),
+            "records": records,
+            "backend": "numpy" if HAS_NUMPY else "array",
+            "aggregation_time": f"{agg_time:.3f}",
+            "departments": ", ".join(f"{name}: {stats['count']}" for name, stats in departments.items()),
             "generation_time": f"{gen_time:.3f}",
             "total_time": f"{total_time:.3f}",
             "html_size": len(response["content"][0]["resource"]["text"]),
@@ -1136,79 +1661,589 @@ class UIGeneratorDemoServer:
         
         return combined_response
 
-    async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Обработка запросов к серверу"""
-        method = request.get("method", "")
-        params = request.get("params", {})
+    async def handle_request(self, request: Dict[str, Any], profile: bool = False) -> Dict[str, Any]:
+        """Обработка запросов к серверу в старом формате {method, params}"""
+        try:
+            return await self.call_method(request.get("method", ""), request.get("params", {}), profile)
+        except JsonRpcError as e:
+            return {"error": e.message}
+
+    async def handle_jsonrpc(self, payload: Any, profile: bool = False) -> Any:
+        """Обработка запроса JSON-RPC 2.0 или пакета запросов (выполняются конкурентно)"""
+        return await dispatch_jsonrpc_async(payload, lambda method, params: self.call_method(method, params, profile))
+
+    async def call_method(self, method: str, params: Any, profile: bool = False) -> Any:
+        """Выполнить метод сервера; ошибки протокола - JsonRpcError
+        
+        profile (или аргумент _profile у tools/call) - снять профиль вызова инструмента
+        мимо кэша, если сервер запущен с профилированием; id профиля возвращается в _meta.
+        """
+        if not isinstance(params, dict):
+            raise JsonRpcError(JSONRPC_INVALID_PARAMS, "Invalid params", "ожидается объект params")
         
         if method == "tools/list":
             return {
-                "tools": self.get_available_tools()
+                "tools": list(self.tool_catalog.tools)
             }
         elif method == "tools/call":
             tool_name = params.get("name", "")
-            arguments = params.get("arguments", {})
+            arguments = params.get("arguments") or {}
+            if not isinstance(arguments, dict):
+                raise JsonRpcError(JSONRPC_INVALID_PARAMS, "Invalid params", "arguments должен быть объектом")
+            arguments = dict(arguments)
+            profile = ProfileStore.requested(arguments) or profile
+            # Хэши общих стилей, которые клиент уже получил (режим shared_styles)
+            known_styles = StyleRegistry.parse_known(params.get("knownStyles"))
             
-            # Маппинг инструментов
-            tool_methods = {
-                "show_users_table": self.show_users_table,
-                "show_user_profile": self.show_user_profile,
-                "show_tasks_list": self.show_tasks_list,
-                "show_project_dashboard": self.show_project_dashboard,
-                "show_statistics_chart": self.show_statistics_chart,
-                "create_user_form": self.create_user_form,
-                "show_notifications_demo": self.show_notifications_demo,
-                "auto_generate_interface": self.auto_generate_interface,
-                "performance_test": self.performance_test
-            }
+            spec = TOOLS.get(tool_name)
             
-            if tool_name in tool_methods:
+            started = time.perf_counter()
+            if spec is not None:
                 try:
-                    result = await tool_methods[tool_name](**arguments)
+                    arguments = spec.validate(arguments)
+                    entry = None
+                    if profile and self.profiles.enabled:
+                        result, entry = await self.profiles.run_async(
+                            tool_name, lambda: spec.handler(self, **arguments)
+                        )
+                    elif spec.cacheable(arguments):
+                        key = RenderCache.make_key(tool_name, arguments, self.data_version)
+                        result, coalesced = await self.single_flight.do_async(
+                            key, lambda: self.render_cache.get_or_render_async(
+                                key, lambda: spec.handler(self, **arguments)
+                            )
+                        )
+                        if coalesced:
+                            self.metrics.coalesced(tool_name)
+                    else:
+                        result = await spec.handler(self, **arguments)
+                    self.styles.attach(result, known_styles)
+                    self.metrics.call(tool_name, time.perf_counter() - started)
+                    if entry is not None:
+                        return {"content": result["content"], "_meta": {"profile": entry}}
                     return {"content": result["content"]}
                 except Exception as e:
                     logger.error(f"Error executing tool {tool_name}: {e}")
+                    self.metrics.call(tool_name, time.perf_counter() - started, error=True)
                     return {"content": [{"type": "text", "text": f"Ошибка выполнения инструмента: {str(e)}"}]}
             else:
+                self.metrics.call(TOOLS.metric_label(tool_name), time.perf_counter() - started, error=True)
                 return {"content": [{"type": "text", "text": f"Неизвестный инструмент: {tool_name}"}]}
         
-        return {"error": "Неподдерживаемый метод"}
+        elif method == "resources/list":
+            return {"resources": [
+                {"uri": resource["uri"], "mimeType": resource["mimeType"]}
+                for resource in self.styles.resources()
+            ]}
+        elif method == "resources/read":
+            uri = params.get("uri", "")
+            resource = self.styles.resource(uri.rsplit('/', 1)[-1]) if uri.startswith("ui://styles/") else None
+            if resource is None:
+                raise JsonRpcError(JSONRPC_INVALID_PARAMS, f"Ресурс не найден: {uri}")
+            return {"contents": [resource]}
+        elif method == "cache/stats":
+            return dict(self.render_cache.stats(), singleFlight=self.single_flight.stats())
+        elif method == "compression/stats":
+            return self.compression.stats()
+        elif method == "profiles/list" and self.profiles.enabled:
+            return {"profiles": self.profiles.list()}
+        elif method == "profiles/get" and self.profiles.enabled:
+            try:
+                report = self.profiles.report(str(params.get("id", "")), params.get("sort", "cumulative"),
+                                              params.get("limit"))
+            except ValueError as e:
+                raise JsonRpcError(JSONRPC_INVALID_PARAMS, str(e))
+            if report is None:
+                raise JsonRpcError(JSONRPC_INVALID_PARAMS, f"Профиль не найден: {params.get('id')}")
+            return {"id": params.get("id"), "report": report}
+        elif method == "schema/stats":
+            return dict(self.schema_stats, datasets={
+                name: schema.to_dict() for name, (_, schema) in self._schemas.items()
+            })
+        elif method == "render/stats":
+            return self.render_pool.to_dict() if self.render_pool else {"workers": 0}
+        
+        raise JsonRpcError(JSONRPC_METHOD_NOT_FOUND, "Неподдерживаемый метод", method)
 
-if __name__ == "__main__":
-    # Простой HTTP сервер для демонстрации
-    import json
-    from http.server import HTTPServer, BaseHTTPRequestHandler
+async def handle_http_post(server: UIGeneratorDemoServer, body: bytes,
+                           profile: bool = False) -> Tuple[int, Any, Optional[Iterator[bytes]], Optional[str]]:
+    """Обработка тела POST запроса: (статус, JSON ответ, части потокового ответа, метка)
+
+    Общая для асинхронного и потокового HTTP серверов. Если третий элемент не None,
+    ответ отдаётся по частям, а JSON ответа нет. JSON ответ типа bytes уже
+    сериализован (tools/list из каталога). Статус 204 - ответ без тела.
+    Метка (имя инструмента или метод) нужна для статистики сжатия.
+    profile - запрошен ли профиль заголовком X-MCP-Profile.
+    """
+    try:
+        request = parse_jsonrpc(body)
+    except JsonRpcError as e:
+        return 200, jsonrpc_response(None, error=e), None, None
+    label = rpc_label(request)
     
-    server = UIGeneratorDemoServer()
+    catalog_body = server.tool_catalog.rpc_response(request)
+    if catalog_body is not None:
+        return 200, catalog_body, None, label
     
-    class RequestHandler(BaseHTTPRequestHandler):
-        def do_POST(self):
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            try:
-                request = json.loads(post_data.decode('utf-8'))
-                response = asyncio.run(server.handle_request(request))
-                
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
+    if is_jsonrpc(request):
+        # JSON-RPC 2.0: пакет запросов выполняется за один HTTP запрос
+        response = await server.handle_jsonrpc(request, profile)
+        return (204, None, None, label) if response is None else (200, response, None, label)
+    
+    # Старый формат {method, params}: тело - объект, params - объект
+    if not isinstance(request, dict):
+        return 200, jsonrpc_response(None, error=JsonRpcError(
+            JSONRPC_INVALID_REQUEST, "Invalid Request", "ожидается объект запроса")), None, label
+    params = request.get("params", {})
+    if not isinstance(params, dict):
+        return 200, jsonrpc_response(None, error=JsonRpcError(
+            JSONRPC_INVALID_PARAMS, "Invalid params", "ожидается объект params")), None, label
+    # Профиль снимается с обычного вызова, поток в этом случае не используется
+    if request.get("method") == "tools/call" and params.get("stream") and not profile and \
+            not (isinstance(params.get("arguments"), dict) and ProfileStore.ARGUMENT in params["arguments"]):
+        chunks = server.stream_tool_result(
+            params.get("name", ""),
+            params.get("arguments") or {},
+            StyleRegistry.parse_known(params.get("knownStyles"))
+        )
+        if chunks is not None:
+            return 200, None, chunks, label
+    
+    return 200, await server.handle_request(request, profile), None, label
+
+
+def tools_response(server: UIGeneratorDemoServer, if_none_match: Optional[str],
+                   accept_encoding: Optional[str]) -> Tuple[int, List[Tuple[str, str]], bytes]:
+    """GET /tools: (статус, заголовки, тело) из готового каталога; с совпавшим If-None-Match - 304"""
+    catalog = server.tool_catalog
+    if catalog.matches(if_none_match):
+        return 304, [('ETag', catalog.etag)], b''
+    body, encoding = catalog.body(accept_encoding)
+    headers = [('Content-Type', 'application/json'), ('ETag', catalog.etag),
+               ('Cache-Control', 'no-cache'), ('Vary', 'Accept-Encoding')]
+    if encoding:
+        headers.append(('Content-Encoding', encoding))
+    headers.append(('Content-Length', str(len(body))))
+    return 200, headers, body
+
+
+def json_response(server: UIGeneratorDemoServer, payload: Any, accept_encoding: Optional[str],
+                  label: Optional[str]) -> Tuple[List[Tuple[str, str]], bytes]:
+    """Заголовки и тело JSON ответа POST, общие для асинхронного и потокового серверов
+
+    Ответ с меткой сжимается по Accept-Encoding (и всегда получает Vary:
+    Accept-Encoding), а время его сериализации записывается в метрики.
+    """
+    started = time.perf_counter()
+    body = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    headers = [('Content-Type', 'application/json')]
+    if label is not None:
+        compression = server.compression
+        encoding = compression.choose(accept_encoding, len(body))
+        body = compression.compress(body, encoding, label)
+        headers.append(('Vary', 'Accept-Encoding'))
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        server.metrics.phase(label, "serialize", time.perf_counter() - started)
+    headers.append(('Content-Length', str(len(body))))
+    return headers, body
+
+
+def request_content_length(value: Optional[str], required: bool) -> int:
+    """Длина тела запроса по Content-Length; без заголовка POST получает 411, с некорректным - 400"""
+    if value is None:
+        if required:
+            raise _BadRequest(411, "Не указан Content-Length")
+        return 0
+    try:
+        length = int(value)
+    except ValueError:
+        raise _BadRequest(400, "Некорректный Content-Length")
+    if length < 0:
+        raise _BadRequest(400, "Некорректный Content-Length")
+    return length
+
+
+class AsyncDemoHTTPServer:
+    """HTTP сервер на asyncio.start_server с одним долгоживущим циклом событий
+    
+    Каждое соединение обслуживается своей корутиной, поэтому асинхронные
+    инструменты разных запросов выполняются конкурентно в одном цикле.
+    Соединения HTTP/1.1 переиспользуются (keep-alive) до keepalive_timeout
+    секунд простоя или max_keepalive_requests запросов.
+    С reuse_port сокет открывается с SO_REUSEPORT для режима --processes.
+    """
+    
+    MAX_HEADER_LINES = 100
+    MAX_BODY_BYTES = 16 * 1024 * 1024
+    STATUS_TEXT = {
+        200: "OK", 204: "No Content", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 411: "Length Required",
+        413: "Payload Too Large",
+        500: "Internal Server Error", 501: "Not Implemented"
+    }
+    
+    def __init__(self, server: UIGeneratorDemoServer, host: str = 'localhost', port: int = 8000,
+                 keepalive_timeout: float = 5.0, max_keepalive_requests: int = 100, reuse_port: bool = False):
+        self.server = server
+        self.host = host
+        self.port = port
+        self.reuse_port = reuse_port
+        self.keepalive_timeout = keepalive_timeout
+        self.max_keepalive_requests = max_keepalive_requests
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    async def start(self) -> asyncio.AbstractServer:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  reuse_port=self.reuse_port or None)
+        # Порт 0 означает свободный порт, выбранный системой
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+    
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+    
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            for served in range(1, self.max_keepalive_requests + 1):
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.keepalive_timeout)
+                except asyncio.TimeoutError:
+                    return
+                if request is None:
+                    return
+                method, path, version, headers, body = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = served < self.max_keepalive_requests and (
+                    connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+                )
+                if method == 'GET' and path == '/tools':
+                    status, response_headers, body = tools_response(self.server, headers.get('if-none-match'),
+                                                                    headers.get('accept-encoding'))
+                    writer.write(self._head(status, response_headers, keep_alive) + body)
+                    await writer.drain()
+                    if not keep_alive:
+                        return
+                    continue
+                if method == 'GET':
+                    response = self._get(path)
+                    if response is None:
+                        await self._send_json(writer, 404, {"error": f"Не найдено: {path}"}, keep_alive)
+                    else:
+                        status, content_type, body = response
+                        writer.write(self._head(status, [('Content-Type', content_type),
+                                                         ('Content-Length', str(len(body)))], keep_alive) + body)
+                        await writer.drain()
+                    if not keep_alive:
+                        return
+                    continue
+                if method != 'POST':
+                    await self._send_json(writer, 501, {"error": f"Неподдерживаемый метод {method}"}, False)
+                    return
+                with self.server.metrics.in_flight():
+                    keep_alive = await self._handle_post(writer, version, headers, body, keep_alive)
+                if not keep_alive:
+                    return
+        except _BadRequest as e:
+            await self._send_json(writer, e.status, {"error": str(e)}, False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            # Заголовки потокового ответа уже ушли, остаётся оборвать поток
+            logger.error(f"Error while streaming response: {e}")
+        finally:
+            writer.close()
+    
+    def _get(self, path: str) -> Optional[Tuple[int, str, bytes]]:
+        """GET /metrics и /profiles: (статус, Content-Type, тело) или None"""
+        if path == '/metrics':
+            return 200, PROMETHEUS_CONTENT_TYPE, self.server.metrics.render().encode('utf-8')
+        return self.server.profiles.http_get(path)
+    
+    async def _handle_post(self, writer: asyncio.StreamWriter, version: str, headers: Dict[str, str],
+                           body: bytes, keep_alive: bool) -> bool:
+        """Ответ на POST запрос; возвращает, можно ли переиспользовать соединение"""
+        accept_encoding = headers.get('accept-encoding')
+        profile = ProfileStore.requested(None, headers.get(ProfileStore.HEADER.lower()))
+        try:
+            status, payload, chunks, label = await handle_http_post(self.server, body, profile)
+        except Exception as e:
+            logger.error(f"Error handling request: {e}")
+            await self._send_json(writer, 500, {"error": str(e)}, keep_alive)
+            return keep_alive
+        if chunks is not None:
+            # Поток без chunked кодирования заканчивается закрытием соединения
+            keep_alive = keep_alive and version == 'HTTP/1.1'
+            await self._send_chunks(writer, chunks, version == 'HTTP/1.1', keep_alive,
+                                    accept_encoding, label)
+        else:
+            await self._send_json(writer, status, payload, keep_alive, accept_encoding, label)
+        return keep_alive
+    
+    async def _read_request(self, reader: asyncio.StreamReader
+                            ) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+        """(метод, путь, версия HTTP, заголовки, тело) или None, если клиент закрыл соединение"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3:
+            raise _BadRequest(400, "Некорректная строка запроса")
+        method, path, version = parts
+        
+        headers = {}
+        for _ in range(self.MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise _BadRequest(400, "Слишком много заголовков")
+        
+        length = request_content_length(headers.get('content-length'), method == 'POST')
+        if length > self.MAX_BODY_BYTES:
+            raise _BadRequest(413, "Слишком большое тело запроса")
+        body = await reader.readexactly(length) if length > 0 else b''
+        return method, path, version, headers, body
+    
+    def _head(self, status: int, headers: List[Tuple[str, str]], keep_alive: bool) -> bytes:
+        lines = [f"HTTP/1.1 {status} {self.STATUS_TEXT.get(status, '')}"]
+        lines.extend(f"{name}: {value}" for name, value in headers)
+        lines.append('Access-Control-Allow-Origin: *')
+        if keep_alive:
+            lines.append('Connection: keep-alive')
+            lines.append(f'Keep-Alive: timeout={int(self.keepalive_timeout)}')
+        else:
+            lines.append('Connection: close')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+    
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool,
+                         accept_encoding: Optional[str] = None, label: Optional[str] = None):
+        """JSON ответ; ответы с меткой сжимаются по Accept-Encoding и попадают в метрики"""
+        if status == 204:
+            writer.write(self._head(status, [], keep_alive))
+        else:
+            headers, body = json_response(self.server, payload, accept_encoding, label)
+            serialized = time.perf_counter()
+            writer.write(self._head(status, headers, keep_alive) + body)
+            await writer.drain()
+            if label is not None:
+                self.server.metrics.phase(label, "write", time.perf_counter() - serialized)
+                self.server.metrics.response(label, len(body))
+            return
+        await writer.drain()
+    
+    async def _send_chunks(self, writer: asyncio.StreamWriter, chunks: Iterable[bytes], chunked: bool,
+                           keep_alive: bool, accept_encoding: Optional[str] = None, label: Optional[str] = None):
+        compression = self.server.compression
+        encoding = compression.choose(accept_encoding)
+        chunks = timed_chunks(compression.stream(chunks, encoding, label or ""), self.server.metrics, label or "")
+        headers = [('Content-Type', 'application/json'), ('Vary', 'Accept-Encoding')]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        if chunked:
+            headers.append(('Transfer-Encoding', 'chunked'))
+        writer.write(self._head(200, headers, keep_alive))
+        for chunk in chunks:
+            if not chunk:
+                continue
+            writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+            # drain отдаёт управление циклу, пока клиент не заберёт данные
+            await writer.drain()
+        if chunked:
+            writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+
+class DemoHTTPServer(HTTPServer):
+    """http.server для режима threaded; с reuse_port сокет открывается с SO_REUSEPORT"""
+
+    def __init__(self, server_address, handler_class, reuse_port: bool = False):
+        self.reuse_port = reuse_port
+        super().__init__(server_address, handler_class)
+
+    def server_bind(self):
+        if self.reuse_port:
+            enable_reuse_port(self.socket)
+        super().server_bind()
+
+
+class _BadRequest(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class DemoRequestHandler(BaseHTTPRequestHandler):
+    """Обработчик для однопоточного http.server (режим --server threaded)
+    
+    Каждый запрос выполняется в новом цикле событий через asyncio.run.
+    """
+    
+    server_instance: Optional[UIGeneratorDemoServer] = None
+    response_started = False
+    
+    def do_GET(self):
+        if self.path == '/tools':
+            status, headers, body = tools_response(self.server_instance, self.headers.get('If-None-Match'),
+                                                   self.headers.get('Accept-Encoding'))
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path == '/metrics':
+            response = 200, PROMETHEUS_CONTENT_TYPE, self.server_instance.metrics.render().encode('utf-8')
+        else:
+            response = self.server_instance.profiles.http_get(self.path)
+        if response is None:
+            self.send_error(404)
+            return
+        status, content_type, body = response
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_POST(self):
+        with self.server_instance.metrics.in_flight():
+            self.handle_post()
+    
+    def handle_post(self):
+        try:
+            content_length = request_content_length(self.headers.get('Content-Length'), True)
+        except _BadRequest as e:
+            self.close_connection = True
+            self.send_json_error(e.status, str(e))
+            return
+        post_data = self.rfile.read(content_length)
+        
+        try:
+            profile = ProfileStore.requested(None, self.headers.get(ProfileStore.HEADER))
+            status, payload, chunks, label = asyncio.run(handle_http_post(self.server_instance, post_data, profile))
+            compression = self.server_instance.compression
+            if chunks is not None:
+                send_chunked(self, chunks, compressor=compression, label=label or "",
+                             metrics=self.server_instance.metrics)
+                return
+            if status == 204:
+                self.send_response(204)
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.end_headers()
-                
-                self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
-                
-            except Exception as e:
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                
-                error_response = {"error": str(e)}
-                self.wfile.write(json.dumps(error_response).encode('utf-8'))
+                return
+            
+            headers, body = json_response(self.server_instance, payload, self.headers.get('Accept-Encoding'), label)
+            serialized = time.perf_counter()
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            
+            self.wfile.write(body)
+            if label is not None:
+                metrics = self.server_instance.metrics
+                metrics.phase(label, "write", time.perf_counter() - serialized)
+                metrics.response(label, len(body))
+            
+        except Exception as e:
+            if self.response_started:
+                # Заголовки потокового ответа уже ушли, остаётся оборвать поток
+                logger.error(f"Error while streaming response: {e}")
+                return
+            self.send_json_error(500, str(e))
+    
+    def send_json_error(self, status: int, message: str):
+        body = json.dumps({"error": message}, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(description='Демо сервер UI Generator')
+    parser.add_argument('--host', default='localhost', help='Адрес для прослушивания')
+    parser.add_argument('--port', type=int, default=8000, help='Порт HTTP сервера')
+    parser.add_argument('--server', choices=('asyncio', 'threaded'), default='asyncio',
+                        help='asyncio - один цикл событий на все запросы, '
+                             'threaded - http.server и asyncio.run на каждый запрос')
+    parser.add_argument('--keepalive-timeout', type=float, default=5.0,
+                        help='Сколько держать простаивающее keep-alive соединение (сек, режим asyncio)')
+    parser.add_argument('--max-keepalive-requests', type=int, default=100,
+                        help='Максимум запросов на одном соединении (режим asyncio)')
+    parser.add_argument('--compression-level', type=int, default=6,
+                        help='Уровень сжатия ответов gzip/deflate/br (0 отключает)')
+    parser.add_argument('--compression-min-size', type=int, default=1024,
+                        help='Ответы меньше этого размера (байт) не сжимаются')
+    parser.add_argument('--profiling', action='store_true',
+                        help='Разрешить профилирование вызовов (X-MCP-Profile, _profile) и /profiles')
+    parser.add_argument('--render-workers', type=int, default=0,
+                        help='Процессов для рендера больших таблиц, списков и графиков (0 - рендер на месте)')
+    parser.add_argument('--render-offload-rows', type=int, default=5000,
+                        help='С какого числа записей рендер уходит в пул процессов')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Число процессов на одном порту (SO_REUSEPORT, перезапуск упавших); 1 - без prefork')
+    return parser.parse_args(argv)
+
+
+def run_server(server: UIGeneratorDemoServer, args: argparse.Namespace, reuse_port: bool = False):
+    """Запуск HTTP сервера в режиме --server; пул рендеринга живёт в том же процессе"""
+    if args.render_workers > 0:
+        server.start_render_pool(args.render_workers, args.render_offload_rows)
+    try:
+        if args.server == 'asyncio':
+            try:
+                asyncio.run(AsyncDemoHTTPServer(
+                    server, args.host, args.port,
+                    keepalive_timeout=args.keepalive_timeout,
+                    max_keepalive_requests=args.max_keepalive_requests,
+                    reuse_port=reuse_port
+                ).serve_forever())
+            except KeyboardInterrupt:
+                pass
+        else:
+            DemoRequestHandler.server_instance = server
+            httpd = DemoHTTPServer((args.host, args.port), DemoRequestHandler, reuse_port)
+            httpd.serve_forever()
+    finally:
+        if server.render_pool is not None:
+            server.render_pool.close()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = UIGeneratorDemoServer(
+        compression_level=args.compression_level,
+        compression_min_size=args.compression_min_size,
+        profiling=args.profiling
+    )
     
-    print("Запуск демо сервера UI Generator на порту 8000...")
+    print(f"Запуск демо сервера UI Generator на порту {args.port} ({args.server})...")
     print("Доступные инструменты:")
-    for tool in server.get_available_tools():
+    for tool in server.tool_catalog.tools:
         print(f"  - {tool['name']}: {tool['description']}")
     
-    httpd = HTTPServer(('localhost', 8000), RequestHandler)
-    httpd.serve_forever()
\ No newline at end of file
+    if args.processes > 1:
+        if not prefork_supported():
+            raise SystemExit("--processes требует fork и SO_REUSEPORT (Linux, BSD, macOS)")
+        # Сервер с данными создан до fork, поэтому все процессы отдают одни и те же данные
+        print(f"Процессов: {args.processes}")
+        raise SystemExit(PreforkSupervisor(args.processes,
+                                           lambda slot: run_server(server, args, reuse_port=True)).run())
+    else:
+        run_server(server, args)
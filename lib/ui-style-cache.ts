@@ -0,0 +1,37 @@
+// Shared component stylesheets published by the demo MCP servers as ui://styles/<hash>.
+// A server in shared-styles mode sends each stylesheet once per session and later
+// components only reference it with <link rel="stylesheet" href="ui://styles/<hash>">.
+
+export const STYLE_URI_PREFIX = 'ui://styles/';
+
+const STYLE_LINK_RE = /<link rel="stylesheet" href="(ui:\/\/styles\/[0-9a-f]+)">/g;
+
+const styleCache = new Map<string, string>();
+
+interface StyleResource {
+  uri: string;
+  mimeType?: string;
+  text?: string;
+}
+
+export function isStyleResource(resource: StyleResource): boolean {
+  return resource.uri.startsWith(STYLE_URI_PREFIX);
+}
+
+export function rememberStyle(resource: StyleResource): void {
+  if (typeof resource.text === 'string') {
+    styleCache.set(resource.uri, resource.text);
+  }
+}
+
+/**
+ * Replace links to shared stylesheets with inline <style> blocks so the HTML
+ * renders inside the sandboxed iframe. Unknown links are left untouched.
+ */
+export function inlineSharedStyles(html: string): string {
+  if (!html.includes(STYLE_URI_PREFIX)) return html;
+  return html.replace(STYLE_LINK_RE, (link, uri: string) => {
+    const css = styleCache.get(uri);
+    return css === undefined ? link : `<style>${css}</style>`;
+  });
+}
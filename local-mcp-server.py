@@ -4,168 +4,337 @@
 Демонстрирует возможности UI Generator для различных типов данных
 """
 
+import argparse
 import json
-import sys
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import random
-from typing import Any, Dict, List, Optional
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import http.server
-import socketserver
+import itertools
+import socket
 import threading
 import time
 import urllib.parse
+import uuid
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('mcp-server.log'),
-        logging.StreamHandler(sys.stderr)
-    ]
+from mcp_columnar import SharedDatasets
+from mcp_server_common import (
+    JSONRPC_INVALID_PARAMS,
+    JSONRPC_METHOD_NOT_FOUND,
+    LOG_FORMAT,
+    PROMETHEUS_CONTENT_TYPE,
+    JsonRpcError,
+    KeepAliveHandlerMixin,
+    LogValue,
+    PagedTable,
+    PreforkSupervisor,
+    ProfileStore,
+    RecordStore,
+    RenderCache,
+    ResponseCompressor,
+    SamplingFilter,
+    SharedRecordStore,
+    SingleFlight,
+    StyleRegistry,
+    TableQuery,
+    ToolCatalog,
+    ToolMetrics,
+    ToolRegistry,
+    dispatch_jsonrpc,
+    is_jsonrpc,
+    iter_tool_result_json,
+    jsonrpc_response,
+    page_description,
+    parse_jsonrpc,
+    prefork_supported,
+    rpc_label,
+    configure_logging,
+    enable_reuse_port,
+    send_chunked,
+    table_query_schema,
+    worker_log_file
 )
+
+# Логирование настраивается при запуске (setup_logging): файл и stderr пишутся
+# отдельным потоком через очередь
 logger = logging.getLogger('demo-mcp-server')
+# Записи на каждый запрос (вызовы инструментов, access log) проходят выборку --log-sample-rate
+request_logger = logging.getLogger('demo-mcp-server.requests')
 
-class UIGenerator:
-    """Упрощенная версия UI Generator для Python MCP сервера"""
-    
-    @staticmethod
-    def generate_table(data: List[Dict], title: str = "", description: str = "") -> str:
-        """Генерация HTML таблицы"""
-        if not data:
-            return f"""
-            <div class="ui-component">
-                <h3>{title}</h3>
-                <p>Нет данных для отображения</p>
-            </div>
-            """
-        
-        headers = list(data[0].keys())
-        header_row = ''.join(f'<th>{header}</th>' for header in headers)
-        
-        rows = []
-        for item in data:
-            cells = ''.join(f'<td>{item.get(header, "")}</td>' for header in headers)
-            rows.append(f'<tr>{cells}</tr>')
-        
-        table_html = f"""
-        <style>
-            .ui-component {{
+# Стили компонентов: встраиваются в HTML или публикуются как ui://styles/<hash>
+TABLE_STYLES = """
+            .ui-component {
                 font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
                 margin: 16px 0;
                 border-radius: 8px;
                 overflow: hidden;
-            }}
-            .ui-table {{
+            }
+            .ui-table {
                 width: 100%;
                 border-collapse: collapse;
                 background: white;
                 border: 1px solid #dee2e6;
                 border-radius: 8px;
                 overflow: hidden;
-            }}
+            }
             .ui-table th,
-            .ui-table td {{
+            .ui-table td {
                 padding: 12px;
                 text-align: left;
                 border-bottom: 1px solid #dee2e6;
-            }}
-            .ui-table th {{
+            }
+            .ui-table th {
                 background-color: #f8f9fa;
                 font-weight: 600;
                 color: #495057;
-            }}
-            .ui-table tr:last-child td {{
+            }
+            .ui-table tr:last-child td {
                 border-bottom: none;
-            }}
-            .ui-table tr:hover {{
+            }
+            .ui-table tr:hover {
                 background-color: #f8f9fa;
-            }}
-            .ui-title {{
+            }
+            .ui-title {
                 margin: 0 0 16px 0;
                 color: #333;
                 font-size: 18px;
                 font-weight: 600;
-            }}
-            .ui-description {{
+            }
+            .ui-description {
                 margin: 0 0 16px 0;
                 color: #666;
                 font-size: 14px;
-            }}
-        </style>
-        <div class="ui-component">
-            {f'<h3 class="ui-title">{title}</h3>' if title else ''}
-            {f'<p class="ui-description">{description}</p>' if description else ''}
-            <table class="ui-table">
-                <thead><tr>{header_row}</tr></thead>
-                <tbody>{''.join(rows)}</tbody>
-            </table>
-        </div>
+            }
         """
-        
-        return table_html
-    
-    @staticmethod
-    def generate_card(data: Dict, title: str = "", description: str = "") -> str:
-        """Генерация HTML карточки"""
-        fields = []
-        for key, value in data.items():
-            if isinstance(value, (list, dict)):
-                value = json.dumps(value, ensure_ascii=False, indent=2)
-            fields.append(f"""
-                <div class="ui-field">
-                    <label class="ui-field-label">{key}</label>
-                    <span class="ui-field-value">{value}</span>
-                </div>
-            """)
-        
-        card_html = f"""
-        <style>
-            .ui-component {{
+
+CARD_STYLES = """
+            .ui-component {
                 font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
                 margin: 16px 0;
-            }}
-            .ui-card {{
+            }
+            .ui-card {
                 background: white;
                 border: 1px solid #dee2e6;
                 border-radius: 8px;
                 padding: 20px;
                 box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            }}
-            .ui-field {{
+            }
+            .ui-field {
                 display: flex;
                 justify-content: space-between;
                 margin: 12px 0;
                 padding: 8px 0;
                 border-bottom: 1px solid #f1f3f4;
-            }}
-            .ui-field:last-child {{
+            }
+            .ui-field:last-child {
                 border-bottom: none;
-            }}
-            .ui-field-label {{
+            }
+            .ui-field-label {
                 font-weight: 600;
                 color: #495057;
                 min-width: 120px;
-            }}
-            .ui-field-value {{
+            }
+            .ui-field-value {
                 color: #212529;
                 text-align: right;
                 flex: 1;
                 word-break: break-word;
-            }}
-            .ui-title {{
+            }
+            .ui-title {
                 margin: 0 0 16px 0;
                 color: #333;
                 font-size: 18px;
                 font-weight: 600;
-            }}
-            .ui-description {{
+            }
+            .ui-description {
                 margin: 0 0 16px 0;
                 color: #666;
                 font-size: 14px;
-            }}
-        </style>
+            }
+        """
+
+DASHBOARD_STYLES = """
+            .ui-component {
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+                margin: 16px 0;
+            }
+            .dashboard {
+                background: white;
+                border: 1px solid #dee2e6;
+                border-radius: 8px;
+                padding: 20px;
+            }
+            .metrics-grid {
+                display: grid;
+                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+                gap: 16px;
+                margin-top: 16px;
+            }
+            .metric-card {
+                padding: 16px;
+                background: #f8f9fa;
+                border-radius: 8px;
+                text-align: center;
+                border: 1px solid #e9ecef;
+            }
+            .metric-title {
+                font-size: 14px;
+                color: #6c757d;
+                margin-bottom: 8px;
+            }
+            .metric-value {
+                font-size: 24px;
+                font-weight: 700;
+                color: #333;
+                margin-bottom: 4px;
+            }
+            .metric-change {
+                font-size: 12px;
+            }
+            .ui-title {
+                margin: 0;
+                color: #333;
+                font-size: 18px;
+                font-weight: 600;
+            }
+        """
+
+FORM_STYLES = """
+            .ui-component {
+                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+                margin: 16px 0;
+            }
+            .ui-form {
+                max-width: 500px;
+                background: white;
+                border: 1px solid #dee2e6;
+                border-radius: 8px;
+                padding: 24px;
+                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+            }
+            .ui-form-title {
+                margin: 0 0 20px 0;
+                color: #333;
+                font-size: 18px;
+                font-weight: 600;
+            }
+            .ui-form-field {
+                margin-bottom: 16px;
+            }
+            .ui-form-field label {
+                display: block;
+                margin-bottom: 6px;
+                font-weight: 500;
+                color: #555;
+            }
+            .ui-form-field input,
+            .ui-form-field select {
+                width: 100%;
+                padding: 10px 12px;
+                border: 1px solid #ccc;
+                border-radius: 4px;
+                font-size: 14px;
+                box-sizing: border-box;
+                transition: border-color 0.2s;
+            }
+            .ui-form-field input:focus,
+            .ui-form-field select:focus {
+                outline: none;
+                border-color: #007bff;
+                box-shadow: 0 0 0 2px rgba(0,123,255,0.25);
+            }
+            .ui-form-submit {
+                background: #007bff;
+                color: white;
+                padding: 12px 24px;
+                border: none;
+                border-radius: 4px;
+                font-size: 14px;
+                cursor: pointer;
+                font-weight: 500;
+                transition: background-color 0.2s;
+            }
+            .ui-form-submit:hover {
+                background: #0056b3;
+            }
+            .required {
+                color: #dc3545;
+            }
+        """
+
+class UIGenerator:
+    """Упрощенная версия UI Generator для Python MCP сервера"""
+    
+    def __init__(self, styles: Optional[StyleRegistry] = None):
+        self.styles = styles or StyleRegistry()
+    
+    def generate_table(self, data: Iterable[Dict], title: str = "", description: str = "") -> str:
+        """Генерация HTML таблицы"""
+        return ''.join(self.iter_table(data, title, description))
+    
+    def iter_table(self, data: Iterable[Dict], title: str = "", description: str = "",
+                   batch_size: int = 256) -> Iterator[str]:
+        """Потоковая генерация HTML таблицы фрагментами по batch_size строк
+        
+        Строки берутся из итератора по одной, поэтому в памяти одновременно
+        находится только текущий фрагмент, а первый байт готов сразу.
+        """
+        rows = iter(data)
+        first = next(rows, None)
+        if first is None:
+            yield f"""
+            <div class="ui-component">
+                <h3>{title}</h3>
+                <p>Нет данных для отображения</p>
+            </div>
+            """
+            return
+        
+        headers = list(first.keys())
+        header_row = ''.join(f'<th>{header}</th>' for header in headers)
+        
+        yield f"""
+        {self.styles.render(TABLE_STYLES)}
+        <div class="ui-component">
+            {f'<h3 class="ui-title">{title}</h3>' if title else ''}
+            {f'<p class="ui-description">{description}</p>' if description else ''}
+            <table class="ui-table">
+                <thead><tr>{header_row}</tr></thead>
+                <tbody>"""
+        
+        batch = []
+        for item in itertools.chain((first,), rows):
+            cells = ''.join(f'<td>{item.get(header, "")}</td>' for header in headers)
+            batch.append(f'<tr>{cells}</tr>')
+            if len(batch) >= batch_size:
+                yield ''.join(batch)
+                batch = []
+        if batch:
+            yield ''.join(batch)
+        
+        yield """</tbody>
+            </table>
+        </div>
+        """
+    
+    def generate_card(self, data: Dict, title: str = "", description: str = "") -> str:
+        """Генерация HTML карточки"""
+        fields = []
+        for key, value in data.items():
+            if isinstance(value, (list, dict)):
+                value = json.dumps(value, ensure_ascii=False, indent=2)
+            fields.append(f"""
+                <div class="ui-field">
+                    <label class="ui-field-label">{key}</label>
+                    <span class="ui-field-value">{value}</span>
+                </div>
+            """)
+        
+        card_html = f"""
+        {self.styles.render(CARD_STYLES)}
         <div class="ui-component">
             {f'<h3 class="ui-title">{title}</h3>' if title else ''}
             {f'<p class="ui-description">{description}</p>' if description else ''}
@@ -177,8 +346,7 @@ class UIGenerator:
         
         return card_html
     
-    @staticmethod
-    def generate_dashboard(metrics: List[Dict], title: str = "") -> str:
+    def generate_dashboard(self, metrics: List[Dict], title: str = "") -> str:
         """Генерация дашборда с метриками"""
         metric_cards = []
         for metric in metrics:
@@ -202,51 +370,7 @@ class UIGenerator:
             """)
         
         dashboard_html = f"""
-        <style>
-            .ui-component {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 16px 0;
-            }}
-            .dashboard {{
-                background: white;
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                padding: 20px;
-            }}
-            .metrics-grid {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                gap: 16px;
-                margin-top: 16px;
-            }}
-            .metric-card {{
-                padding: 16px;
-                background: #f8f9fa;
-                border-radius: 8px;
-                text-align: center;
-                border: 1px solid #e9ecef;
-            }}
-            .metric-title {{
-                font-size: 14px;
-                color: #6c757d;
-                margin-bottom: 8px;
-            }}
-            .metric-value {{
-                font-size: 24px;
-                font-weight: 700;
-                color: #333;
-                margin-bottom: 4px;
-            }}
-            .metric-change {{
-                font-size: 12px;
-            }}
-            .ui-title {{
-                margin: 0;
-                color: #333;
-                font-size: 18px;
-                font-weight: 600;
-            }}
-        </style>
+        {self.styles.render(DASHBOARD_STYLES)}
         <div class="ui-component">
             <div class="dashboard">
                 {f'<h3 class="ui-title">{title}</h3>' if title else ''}
@@ -259,16 +383,193 @@ class UIGenerator:
         
         return dashboard_html
 
+# Инструменты сервера: регистрируются декоратором @TOOLS.tool у обработчиков DemoMCPServer
+TOOLS = ToolRegistry()
+
+
 class DemoMCPServer:
-    """Демо MCP сервер с возможностями UI генерации"""
+    """Демо MCP сервер с возможностями UI генерации
+
+    Обработчики инструментов принимают словарь проверенных аргументов; все
+    инструменты зависят только от аргументов и данных, поэтому кэшируются.
+    """
+    
+    USER_FIELDS = ("id", "name", "email", "department", "position", "salary",
+                   "active", "joinDate", "tasksCompleted", "efficiency")
+    TASK_FIELDS = ("id", "title", "status", "priority", "assignee", "progress",
+                   "estimatedHours", "loggedHours", "dueDate", "created")
+    # Вторичные индексы датасетов, поддерживаются при каждом изменении
+    INDEXED_FIELDS = {
+        "users": ("department", "active"),
+        "tasks": ("status", "assignee", "priority"),
+        "projects": ("status",)
+    }
+    # Материализованные суммы по отделам для статистики команды
+    SUMMED_FIELDS = {
+        "users": {"department": ("efficiency", "tasksCompleted")}
+    }
     
-    def __init__(self):
-        self.ui = UIGenerator()
-        self.users_data = self._generate_users_data()
-        self.tasks_data = self._generate_tasks_data()
-        self.projects_data = self._generate_projects_data()
+    def __init__(self, cache_max_bytes: int = 32 * 1024 * 1024, shared_styles: bool = False,
+                 compression_level: int = 6, compression_min_size: int = 1024, profiling: bool = False):
+        self.styles = StyleRegistry(shared=shared_styles)
+        self.compression = ResponseCompressor(level=compression_level, min_size=compression_min_size)
+        self.metrics = ToolMetrics()
+        self.profiles = ProfileStore(enabled=profiling)
+        self.ui = UIGenerator(self.styles)
+        # Версия данных увеличивается при любом изменении датасетов
+        self.data_version = 0
+        self.render_cache = RenderCache(max_bytes=cache_max_bytes)
+        # Одинаковые одновременные вызовы выполняются один раз
+        self.single_flight = SingleFlight()
+        self._data_lock = threading.Lock()
+        self._tables: Dict[str, PagedTable] = {}
+        self._stores: Dict[str, RecordStore] = {}
+        # Общий сегмент датасетов для нескольких процессов (use_shared_data)
+        self._shared: Optional[SharedDatasets] = None
+        self._shared_generation = 0
+        self._stores["users"] = self._make_store("users", self._generate_users_data())
+        self._stores["tasks"] = self._make_store("tasks", self._generate_tasks_data())
+        self._stores["projects"] = self._make_store("projects", self._generate_projects_data())
+        self.refresh_tool_catalog()
         logger.info("Demo MCP Server инициализирован")
     
+    @property
+    def users_data(self) -> List[Dict]:
+        return self._store("users").records
+    
+    @users_data.setter
+    def users_data(self, records: List[Dict]):
+        self._replace_dataset("users", records)
+    
+    @property
+    def tasks_data(self) -> List[Dict]:
+        return self._store("tasks").records
+    
+    @tasks_data.setter
+    def tasks_data(self, records: List[Dict]):
+        self._replace_dataset("tasks", records)
+    
+    @property
+    def projects_data(self) -> List[Dict]:
+        return self._store("projects").records
+    
+    @projects_data.setter
+    def projects_data(self, records: List[Dict]):
+        self._replace_dataset("projects", records)
+    
+    def _store(self, name: str) -> RecordStore:
+        self.refresh_shared()
+        if name not in self._stores:
+            raise ValueError(f"Неизвестный датасет: {name}")
+        return self._stores[name]
+    
+    def _dataset(self, name: str) -> List[Dict]:
+        return self._store(name).records
+    
+    def _make_store(self, name: str, records: List[Dict]) -> RecordStore:
+        return RecordStore(records, self.INDEXED_FIELDS[name], summed_fields=self.SUMMED_FIELDS.get(name))
+    
+    def use_shared_data(self, shared: SharedDatasets):
+        """Перевести датасеты в общий сегмент
+        
+        Текущие данные публикуются одним поколением, а хранилища читают записи из
+        сегмента, так что процессы после fork не держат свои копии. Изменения
+        публикуются новым поколением и видны всем процессам.
+        """
+        with self._data_lock:
+            shared.publish({name: store.records for name, store in self._stores.items()})
+            self._shared = shared
+        self._sync_shared()
+    
+    def refresh_shared(self):
+        """Подхватить новое поколение общего сегмента (проверка - чтение 8 байт)"""
+        if self._shared is not None and self._shared.generation != self._shared_generation:
+            self._sync_shared()
+    
+    def _sync_shared(self):
+        """Перестроить хранилища по текущему поколению общего сегмента"""
+        with self._data_lock:
+            view = self._shared.view()
+            if view.generation == self._shared_generation:
+                return
+            self._stores = {
+                name: SharedRecordStore(records, self.INDEXED_FIELDS[name],
+                                        summed_fields=self.SUMMED_FIELDS.get(name))
+                for name, records in view.datasets.items()
+            }
+            self._shared_generation = view.generation
+            self.data_version += 1
+    
+    def _change_shared(self, dataset: str, change) -> Any:
+        """Изменить датасет в общем сегменте: change(RecordStore) -> результат
+        
+        Новое поколение публикуется, если результат истинный.
+        """
+        if dataset not in self.INDEXED_FIELDS:
+            raise ValueError(f"Неизвестный датасет: {dataset}")
+        def apply(records: List[Dict]):
+            store = self._make_store(dataset, records)
+            result = change(store)
+            return (store.records if result else None), result
+        result = self._shared.update(dataset, apply)
+        self._sync_shared()
+        return result
+    
+    def _replace_dataset(self, name: str, records: List[Dict]):
+        """Заменить датасет целиком с перестройкой индексов"""
+        if self._shared is not None:
+            self._shared.update(name, lambda _: (records, True))
+            self._sync_shared()
+            return
+        store = self._make_store(name, records)
+        with self._data_lock:
+            self._stores[name] = store
+            self.data_version += 1
+    
+    def _paged_table(self, dataset: str) -> PagedTable:
+        """Индексированное представление датасета для текущей версии данных"""
+        self.refresh_shared()
+        table = self._tables.get(dataset)
+        # Версия читается до записей: таблица не получит версию новее своих данных
+        version = self.data_version
+        if table is None or table.version != version:
+            records = self._dataset(dataset)
+            # Снимок списка: add_record из другого потока дописывает в общий список,
+            # а индексы таблицы должны соответствовать её записям
+            table = PagedTable(list(records) if isinstance(records, list) else records, version)
+            self._tables[dataset] = table
+        return table
+    
+    def add_record(self, dataset: str, record: Dict) -> Dict:
+        """Добавить запись в датасет"""
+        if self._shared is not None:
+            return self._change_shared(dataset, lambda store: store.add(record))
+        with self._data_lock:
+            self._store(dataset).add(record)
+            self.data_version += 1
+        return record
+    
+    def update_record(self, dataset: str, record_id: str, changes: Dict) -> Optional[Dict]:
+        """Обновить поля записи по ID"""
+        if self._shared is not None:
+            return self._change_shared(dataset, lambda store: store.update(record_id, changes))
+        with self._data_lock:
+            record = self._store(dataset).update(record_id, changes)
+            if record is None:
+                return None
+            self.data_version += 1
+        return record
+    
+    def delete_record(self, dataset: str, record_id: str) -> bool:
+        """Удалить запись по ID"""
+        if self._shared is not None:
+            return self._change_shared(dataset, lambda store: store.delete(record_id))
+        with self._data_lock:
+            if not self._store(dataset).delete(record_id):
+                return False
+            self.data_version += 1
+        return True
+    
     def _generate_users_data(self) -> List[Dict]:
         """Генерация тестовых данных пользователей"""
         names = [
@@ -362,107 +663,148 @@ class DemoMCPServer:
             }
         ]
     
+    def refresh_tool_catalog(self):
+        """Пересобрать каталог инструментов (tools/list, SSE рукопожатие); нужно при изменении набора"""
+        self.tool_catalog = ToolCatalog(self.get_tools_list(), self.compression)
+    
     def get_tools_list(self) -> List[Dict]:
         """Список доступных инструментов"""
-        return [
-            {
-                "name": "show_users_table",
-                "description": "Показать таблицу всех пользователей системы",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {},
-                    "required": []
-                }
-            },
-            {
-                "name": "show_user_profile",
-                "description": "Показать профиль конкретного пользователя",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "userId": {
-                            "type": "string",
-                            "description": "ID пользователя (например: USER-001)"
-                        }
-                    },
-                    "required": []
-                }
-            },
-            {
-                "name": "show_tasks_board",
-                "description": "Показать доску задач с их статусами",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {},
-                    "required": []
-                }
-            },
-            {
-                "name": "show_project_dashboard",
-                "description": "Показать дашборд с метриками проектов",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {},
-                    "required": []
-                }
-            },
-            {
-                "name": "show_team_statistics",
-                "description": "Показать статистику работы команды",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {},
-                    "required": []
-                }
-            },
-            {
-                "name": "create_user_form",
-                "description": "Создать форму для добавления нового пользователя",
-                "inputSchema": {
-                    "type": "object", 
-                    "properties": {},
-                    "required": []
-                }
-            }
-        ]
+        return TOOLS.catalog()
     
-    def call_tool(self, tool_name: str, arguments: Dict = None) -> Dict:
-        """Вызов конкретного инструмента"""
-        if arguments is None:
-            arguments = {}
+    def call_tool(self, tool_name: str, arguments: Dict = None, known_styles: Optional[Set[str]] = None,
+                  profile: bool = False) -> Dict:
+        """Вызов конкретного инструмента
+
+        known_styles - хэши общих стилей, которые клиент уже получил (режим shared_styles).
+        profile (или аргумент _profile) - снять профиль вызова мимо кэша; id профиля
+        возвращается в _meta.profile результата.
+        """
+        arguments = dict(arguments or {})
+        profile = ProfileStore.requested(arguments) or profile
+        entry = None
+        # Ключ кэша строится по версии данных, поэтому новое поколение сегмента подхватывается до него
+        self.refresh_shared()
+        spec = TOOLS.get(tool_name)
             
+        started = time.perf_counter()
         try:
-            if tool_name == "show_users_table":
-                return self._show_users_table()
-            elif tool_name == "show_user_profile":
-                return self._show_user_profile(arguments.get("userId", ""))
-            elif tool_name == "show_tasks_board":
-                return self._show_tasks_board()
-            elif tool_name == "show_project_dashboard":
-                return self._show_project_dashboard()
-            elif tool_name == "show_team_statistics":
-                return self._show_team_statistics()
-            elif tool_name == "create_user_form":
-                return self._create_user_form()
-            else:
-                return {
+            if spec is None:
+                result = {
                     "isError": True,
                     "content": [{"type": "text", "text": f"Неизвестный инструмент: {tool_name}"}]
                 }
+            else:
+                arguments = spec.validate(arguments)
+                if profile and self.profiles.enabled:
+                    result, entry = self.profiles.run(tool_name, lambda: spec.handler(self, arguments))
+                elif spec.cacheable(arguments):
+                    key = RenderCache.make_key(tool_name, arguments, self.data_version)
+                    result, coalesced = self.single_flight.do(
+                        key, lambda: self.render_cache.get_or_render(key, lambda: spec.handler(self, arguments))
+                    )
+                    if coalesced:
+                        self.metrics.coalesced(tool_name)
+                else:
+                    result = spec.handler(self, arguments)
+                result = self.styles.attach(result, known_styles if known_styles is not None else set())
                 
         except Exception as e:
             logger.error(f"Ошибка выполнения инструмента {tool_name}: {e}")
-            return {
+            result = {
                 "isError": True,
                 "content": [{"type": "text", "text": f"Ошибка выполнения: {str(e)}"}]
             }
+        self.metrics.call(TOOLS.metric_label(tool_name), time.perf_counter() - started,
+                          error=bool(result.get("isError")))
+        if entry is not None:
+            result = dict(result, _meta={"profile": entry})
+        return result
     
-    def _show_users_table(self) -> Dict:
-        """Показать таблицу пользователей"""
+    def cache_stats(self) -> Dict[str, Any]:
+        """Статистика кэша рендеринга и объединения одинаковых вызовов"""
+        return dict(self.render_cache.stats(), singleFlight=self.single_flight.stats())
+    
+    def rpc_call(self, method: str, params: Any, known_styles: Optional[Set[str]] = None,
+                 profile: bool = False) -> Any:
+        """Обработчик метода JSON-RPC 2.0 (эндпоинт /rpc)"""
+        if not isinstance(params, dict):
+            raise JsonRpcError(JSONRPC_INVALID_PARAMS, "Invalid params", "ожидается объект params")
+        if method == "tools/list":
+            return {"tools": list(self.tool_catalog.tools)}
+        elif method == "tools/call":
+            arguments = params.get("arguments") or {}
+            if not isinstance(arguments, dict):
+                raise JsonRpcError(JSONRPC_INVALID_PARAMS, "Invalid params", "arguments должен быть объектом")
+            if params.get("knownStyles"):
+                known_styles = (known_styles or set()) | StyleRegistry.parse_known(params["knownStyles"])
+            return self.call_tool(params.get("name", ""), arguments, known_styles, profile)
+        elif method == "resources/list":
+            return {"resources": [
+                {"uri": resource["uri"], "mimeType": resource["mimeType"]}
+                for resource in self.styles.resources()
+            ]}
+        elif method == "resources/read":
+            uri = params.get("uri", "")
+            resource = self.styles.resource(uri.rsplit('/', 1)[-1]) if uri.startswith("ui://styles/") else None
+            if resource is None:
+                raise JsonRpcError(JSONRPC_INVALID_PARAMS, f"Ресурс не найден: {uri}")
+            return {"contents": [resource]}
+        elif method == "cache/stats":
+            return self.cache_stats()
+        elif method == "compression/stats":
+            return self.compression.stats()
+        elif method == "profiles/list" and self.profiles.enabled:
+            return {"profiles": self.profiles.list()}
+        elif method == "profiles/get" and self.profiles.enabled:
+            try:
+                report = self.profiles.report(str(params.get("id", "")), params.get("sort", "cumulative"),
+                                              params.get("limit"))
+            except ValueError as e:
+                raise JsonRpcError(JSONRPC_INVALID_PARAMS, str(e))
+            if report is None:
+                raise JsonRpcError(JSONRPC_INVALID_PARAMS, f"Профиль не найден: {params.get('id')}")
+            return {"id": params.get("id"), "report": report}
+        raise JsonRpcError(JSONRPC_METHOD_NOT_FOUND, "Неподдерживаемый метод", method)
+    
+    def stream_tool_result(self, tool_name: str, arguments: Dict = None,
+                           known_styles: Optional[Set[str]] = None) -> Optional[Iterator[bytes]]:
+        """Потоковый JSON результат инструмента
+        
+        Возвращает None, если инструмент не поддерживает потоковую отдачу или его
+        результат уже есть в кэше - тогда быстрее обычный call_tool.
+        """
+        spec = TOOLS.get(tool_name)
+        if spec is None or spec.stream is None:
+            return None
+        self.refresh_shared()
+        try:
+            arguments = spec.validate(arguments or {})
+        except ValueError:
+            # Ошибку в аргументах вернёт обычный call_tool в виде isError
+            return None
+        if RenderCache.make_key(tool_name, arguments, self.data_version) in self.render_cache:
+            return None
+        try:
+            stream = self.stream_tool(tool_name, arguments)
+        except ValueError:
+            return None
+        uri, fragments = stream
+        return iter_tool_result_json(uri, fragments, self.styles, known_styles)
+    
+    def stream_tool(self, tool_name: str, arguments: Dict = None) -> Optional[Tuple[str, Iterator[str]]]:
+        """URI ресурса и генератор HTML фрагментов для инструментов с потоковой отдачей"""
+        spec = TOOLS.get(tool_name)
+        if spec is None or spec.stream is None:
+            return None
+        uri, fragments = spec.stream
+        return uri, fragments(self, arguments)
+    
+    def _users_table_fragments(self, arguments: Dict = None) -> Iterator[str]:
+        query = TableQuery.from_arguments(arguments, self.USER_FIELDS)
+        users, total = self._paged_table("users").query(query)
         # Упрощаем данные для таблицы
-        table_data = []
-        for user in self.users_data:
-            table_data.append({
+        table_data = (
+            {
                 "ID": user["id"],
                 "Имя": user["name"],
                 "Email": user["email"], 
@@ -472,13 +814,27 @@ class DemoMCPServer:
                 "Статус": "Активен" if user["active"] else "Неактивен",
                 "Задач": user["tasksCompleted"],
                 "Эффективность": f"{user['efficiency']}%"
-            })
-        
-        html = self.ui.generate_table(
+            }
+            for user in users
+        )
+        return self.ui.iter_table(
             table_data,
             title="Сотрудники компании",
-            description="Полный список всех сотрудников с основной информацией"
+            description=page_description(
+                "Полный список всех сотрудников с основной информацией", query, len(users), total
+            )
         )
+    
+    @TOOLS.tool(
+        "show_users_table",
+        "Показать таблицу пользователей системы с постраничным выводом, сортировкой и фильтром",
+        {"type": "object", "properties": table_query_schema(USER_FIELDS), "required": []},
+        cacheable=True,
+        stream=("ui://users-table", _users_table_fragments)
+    )
+    def _show_users_table(self, arguments: Dict = None) -> Dict:
+        """Показать таблицу пользователей"""
+        html = ''.join(self._users_table_fragments(arguments))
         
         return {
             "content": [
@@ -493,10 +849,25 @@ class DemoMCPServer:
             ]
         }
     
-    def _show_user_profile(self, user_id: str) -> Dict:
+    @TOOLS.tool(
+        "show_user_profile",
+        "Показать профиль конкретного пользователя",
+        {
+            "type": "object",
+            "properties": {
+                "userId": {
+                    "type": "string",
+                    "description": "ID пользователя (например: USER-001)"
+                }
+            },
+            "required": []
+        },
+        cacheable=True
+    )
+    def _show_user_profile(self, arguments: Dict) -> Dict:
         """Показать профиль пользователя"""
         # Найти пользователя по ID
-        user = next((u for u in self.users_data if u["id"] == user_id), None)
+        user = self._store("users").get(arguments.get("userId", ""))
         
         if not user:
             # Если ID не найден, показываем первого пользователя
@@ -535,12 +906,12 @@ class DemoMCPServer:
             ]
         }
     
-    def _show_tasks_board(self) -> Dict:
-        """Показать доску задач"""
+    def _tasks_board_fragments(self, arguments: Dict = None) -> Iterator[str]:
+        query = TableQuery.from_arguments(arguments, self.TASK_FIELDS)
+        tasks, total = self._paged_table("tasks").query(query)
         # Подготовить данные для таблицы
-        table_data = []
-        for task in self.tasks_data:
-            table_data.append({
+        table_data = (
+            {
                 "ID": task["id"],
                 "Название": task["title"],
                 "Статус": task["status"],
@@ -549,13 +920,25 @@ class DemoMCPServer:
                 "Прогресс": f"{task['progress']}%",
                 "Часов": f"{task['loggedHours']}/{task['estimatedHours']}",
                 "Срок": task["dueDate"]
-            })
-        
-        html = self.ui.generate_table(
+            }
+            for task in tasks
+        )
+        return self.ui.iter_table(
             table_data,
             title="Доска задач",
-            description="Текущие задачи и их статусы"
+            description=page_description("Текущие задачи и их статусы", query, len(tasks), total)
         )
+    
+    @TOOLS.tool(
+        "show_tasks_board",
+        "Показать доску задач с их статусами, постраничным выводом, сортировкой и фильтром",
+        {"type": "object", "properties": table_query_schema(TASK_FIELDS), "required": []},
+        cacheable=True,
+        stream=("ui://tasks-board", _tasks_board_fragments)
+    )
+    def _show_tasks_board(self, arguments: Dict = None) -> Dict:
+        """Показать доску задач"""
+        html = ''.join(self._tasks_board_fragments(arguments))
         
         return {
             "content": [
@@ -570,13 +953,20 @@ class DemoMCPServer:
             ]
         }
     
-    def _show_project_dashboard(self) -> Dict:
+    @TOOLS.tool(
+        "show_project_dashboard",
+        "Показать дашборд с метриками проектов",
+        {"type": "object", "properties": {}, "required": []},
+        cacheable=True
+    )
+    def _show_project_dashboard(self, arguments: Dict = None) -> Dict:
         """Показать дашборд проектов"""
-        # Подсчет метрик
-        total_tasks = len(self.tasks_data)
-        completed_tasks = len([t for t in self.tasks_data if t["status"] == "Завершена"])
-        in_progress_tasks = len([t for t in self.tasks_data if t["status"] == "В работе"])
-        active_users = len([u for u in self.users_data if u["active"]])
+        # Подсчет метрик по индексам
+        tasks = self._store("tasks")
+        total_tasks = len(tasks)
+        completed_tasks = tasks.count("status", "Завершена")
+        in_progress_tasks = tasks.count("status", "В работе")
+        active_users = self._store("users").count("active", True)
         
         # Метрики для дашборда
         metrics = [
@@ -624,33 +1014,27 @@ class DemoMCPServer:
             ]
         }
     
-    def _show_team_statistics(self) -> Dict:
+    @TOOLS.tool(
+        "show_team_statistics",
+        "Показать статистику работы команды",
+        {"type": "object", "properties": {}, "required": []},
+        cacheable=True
+    )
+    def _show_team_statistics(self, arguments: Dict = None) -> Dict:
         """Показать статистику команды"""
-        # Статистика по отделам
-        departments = {}
-        for user in self.users_data:
-            dept = user["department"]
-            if dept not in departments:
-                departments[dept] = {"count": 0, "efficiency": 0, "tasks": 0}
-            departments[dept]["count"] += 1
-            departments[dept]["efficiency"] += user["efficiency"]
-            departments[dept]["tasks"] += user["tasksCompleted"]
-        
-        # Средние значения
-        for dept in departments:
-            count = departments[dept]["count"]
-            departments[dept]["efficiency"] = round(departments[dept]["efficiency"] / count)
-            departments[dept]["avgTasks"] = round(departments[dept]["tasks"] / count)
+        # Статистика по отделам из агрегатов хранилища
+        departments = self._store("users").totals("department")
         
         # Подготовка данных для таблицы
         table_data = []
         for dept, stats in departments.items():
+            count = stats["count"]
             table_data.append({
                 "Отдел": dept,
-                "Сотрудников": stats["count"],
-                "Средняя эффективность": f"{stats['efficiency']}%",
-                "Среднее кол-во задач": stats["avgTasks"],
-                "Всего задач": stats["tasks"]
+                "Сотрудников": count,
+                "Средняя эффективность": f"{round(stats['efficiency'] / count)}%",
+                "Среднее кол-во задач": round(stats["tasksCompleted"] / count),
+                "Всего задач": stats["tasksCompleted"]
             })
         
         html = self.ui.generate_table(
@@ -672,71 +1056,16 @@ class DemoMCPServer:
             ]
         }
     
-    def _create_user_form(self) -> Dict:
+    @TOOLS.tool(
+        "create_user_form",
+        "Создать форму для добавления нового пользователя",
+        {"type": "object", "properties": {}, "required": []},
+        cacheable=True
+    )
+    def _create_user_form(self, arguments: Dict = None) -> Dict:
         """Создать форму для добавления пользователя"""
-        form_html = """
-        <style>
-            .ui-component {
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 16px 0;
-            }
-            .ui-form {
-                max-width: 500px;
-                background: white;
-                border: 1px solid #dee2e6;
-                border-radius: 8px;
-                padding: 24px;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            }
-            .ui-form-title {
-                margin: 0 0 20px 0;
-                color: #333;
-                font-size: 18px;
-                font-weight: 600;
-            }
-            .ui-form-field {
-                margin-bottom: 16px;
-            }
-            .ui-form-field label {
-                display: block;
-                margin-bottom: 6px;
-                font-weight: 500;
-                color: #555;
-            }
-            .ui-form-field input,
-            .ui-form-field select {
-                width: 100%;
-                padding: 10px 12px;
-                border: 1px solid #ccc;
-                border-radius: 4px;
-                font-size: 14px;
-                box-sizing: border-box;
-                transition: border-color 0.2s;
-            }
-            .ui-form-field input:focus,
-            .ui-form-field select:focus {
-                outline: none;
-                border-color: #007bff;
-                box-shadow: 0 0 0 2px rgba(0,123,255,0.25);
-            }
-            .ui-form-submit {
-                background: #007bff;
-                color: white;
-                padding: 12px 24px;
-                border: none;
-                border-radius: 4px;
-                font-size: 14px;
-                cursor: pointer;
-                font-weight: 500;
-                transition: background-color 0.2s;
-            }
-            .ui-form-submit:hover {
-                background: #0056b3;
-            }
-            .required {
-                color: #dc3545;
-            }
-        </style>
+        form_html = f"""
+        {self.styles.render(FORM_STYLES)}
         <div class="ui-component">
             <div class="ui-form">
                 <h3 class="ui-form-title">Добавить нового сотрудника</h3>
@@ -801,72 +1130,499 @@ class DemoMCPServer:
             ]
         }
 
+class SSESession:
+    """Долгоживущая SSE сессия клиента с ограниченным буфером событий
+
+    Буферизованные события получают id вида "<session_id>:<seq>", поэтому клиент
+    может переподключиться с заголовком Last-Event-ID и получить пропущенное.
+    """
+
+    # Сколько heartbeat подряд может не поместиться в буфер сокета, прежде чем
+    # клиент будет считаться зависшим и отключён
+    max_stalled_heartbeats = 2
+
+    def __init__(self, session_id: str, replay_size: int = 256):
+        self.session_id = session_id
+        self.replay = deque(maxlen=replay_size)
+        self.seq = 0
+        self.sock: Optional[socket.socket] = None
+        # Хэши общих стилей, уже доставленных в эту сессию, и число их сбросов
+        self.styles_sent: Set[str] = set()
+        self.styles_resets = 0
+        self.stalled_heartbeats = 0
+        self.disconnected_at: Optional[float] = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self.sock is not None
+
+    def attach(self, sock: socket.socket, last_seq: Optional[int] = None):
+        """Привязать сокет к сессии и дослать события, пропущенные после last_seq"""
+        with self._lock:
+            self._close_socket()
+            self.sock = sock
+            self.disconnected_at = None
+            self.stalled_heartbeats = 0
+
+            resumed = last_seq is not None
+            pending = [frame for seq, frame in self.replay if resumed and seq > last_seq]
+            oldest = self.replay[0][0] if self.replay else self.seq + 1
+            missed = max(0, oldest - last_seq - 1) if resumed else 0
+            if missed:
+                # Среди потерянных событий могли быть ресурсы стилей
+                self.styles_sent.clear()
+                self.styles_resets += 1
+
+            greeting = {"sessionId": self.session_id, "resumed": resumed, "missed": missed}
+            if self._write(self._frame(greeting, event='session')):
+                for frame in pending:
+                    if not self._write(frame):
+                        break
+
+    def send(self, data: Any, event: Optional[str] = None, buffered: bool = True) -> Optional[str]:
+        """Отправить событие; буферизованные события сохраняются для повторной доставки"""
+        with self._lock:
+            return self._send(data, event, buffered)
+
+    def heartbeat(self, frame: bytes) -> bool:
+        """Отправить heartbeat без ожидания; возвращает True, если кадр записан целиком
+
+        Heartbeat пропускается, если сессия занята другой записью или буфер сокета
+        полон. Клиент, у которого буфер полон max_stalled_heartbeats раз подряд, и
+        клиент, в сокет которого поместилась только часть кадра (поток событий
+        испорчен), отключаются: переподключившись с Last-Event-ID, они получат
+        пропущенное.
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            sock = self.sock
+            if sock is None:
+                return False
+            timeout = sock.gettimeout()
+            sock.settimeout(0)
+            try:
+                sent = sock.send(frame)
+            except BlockingIOError:
+                sent = 0
+            except OSError as e:
+                logger.info(f"SSE клиент {self.session_id} отключился: {e}")
+                self._close_socket()
+                return False
+            sock.settimeout(timeout)
+            if sent == len(frame):
+                self.stalled_heartbeats = 0
+                return True
+            self.stalled_heartbeats += 1
+            if sent or self.stalled_heartbeats >= self.max_stalled_heartbeats:
+                logger.info(f"SSE клиент {self.session_id} не читает события, соединение закрыто")
+                self._close_socket()
+            return False
+        finally:
+            self._lock.release()
+
+    def styles_snapshot(self) -> Tuple[Set[str], int]:
+        """Копия хэшей доставленных стилей и число сбросов на момент копии"""
+        with self._lock:
+            return set(self.styles_sent), self.styles_resets
+
+    def send_with_styles(self, data: Any, event: str, attached: Set[str], resets: int) -> bool:
+        """Отправить событие и отметить приложенные к нему стили доставленными
+
+        Если после styles_snapshot стили сбрасывались (переподключение с потерей
+        событий), событие не отправляется и возвращается False: стили, которые
+        были пропущены как известные, нужно приложить заново.
+        """
+        with self._lock:
+            if resets != self.styles_resets:
+                return False
+            self.styles_sent.update(attached)
+            self._send(data, event, True)
+            return True
+
+    def _send(self, data: Any, event: Optional[str], buffered: bool) -> Optional[str]:
+        event_id = None
+        if buffered:
+            self.seq += 1
+            event_id = f"{self.session_id}:{self.seq}"
+        frame = self._frame(data, event, event_id)
+        if buffered:
+            self.replay.append((self.seq, frame))
+        self._write(frame)
+        return event_id
+
+    def close(self):
+        with self._lock:
+            self._close_socket()
+
+    @staticmethod
+    def _frame(data: Any, event: Optional[str] = None, event_id: Optional[str] = None) -> bytes:
+        payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+        lines = []
+        if event_id:
+            lines.append(f"id: {event_id}")
+        if event:
+            lines.append(f"event: {event}")
+        lines.extend(f"data: {line}" for line in payload.split('\n'))
+        return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+    def _write(self, frame: bytes) -> bool:
+        if self.sock is None:
+            return False
+        try:
+            self.sock.sendall(frame)
+            self.stalled_heartbeats = 0
+            return True
+        except OSError as e:
+            logger.info(f"SSE клиент {self.session_id} отключился: {e}")
+            self._close_socket()
+            return False
+
+    def _close_socket(self):
+        if self.sock is None:
+            return
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        self.sock = None
+        self.disconnected_at = time.monotonic()
+
+class SSESessionHub:
+    """Реестр SSE сессий с общим таймером heartbeat
+
+    Один фоновый поток рассылает heartbeat всем подключённым клиентам и удаляет
+    сессии, которые не переподключились в течение resume_ttl секунд. Heartbeat
+    пишется без ожидания (SSESession.heartbeat), поэтому клиент, который не
+    читает сокет, не задерживает heartbeat остальных на write_timeout.
+    """
+
+    def __init__(self, heartbeat_interval: float = 15.0, replay_size: int = 256,
+                 resume_ttl: float = 60.0, max_sessions: int = 1024, write_timeout: float = 5.0):
+        self.heartbeat_interval = heartbeat_interval
+        self.replay_size = replay_size
+        self.resume_ttl = resume_ttl
+        self.max_sessions = max_sessions
+        self.write_timeout = write_timeout
+        self._sessions: Dict[str, SSESession] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._timer is None:
+            self._timer = threading.Thread(target=self._heartbeat_loop, name='sse-heartbeat', daemon=True)
+            self._timer.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    @property
+    def active_connections(self) -> int:
+        with self._lock:
+            return sum(1 for session in self._sessions.values() if session.connected)
+
+    def acquire(self, last_event_id: Optional[str] = None) -> Tuple[Optional[SSESession], Optional[int]]:
+        """Найти сессию по Last-Event-ID или создать новую
+
+        Возвращает (сессия, последний полученный клиентом seq). seq равен None для
+        новой сессии; сессия равна None, если достигнут лимит max_sessions.
+        """
+        session_id, last_seq = self._parse_event_id(last_event_id)
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None:
+                return session, last_seq
+            if len(self._sessions) >= self.max_sessions:
+                return None, None
+            session = SSESession(uuid.uuid4().hex, self.replay_size)
+            self._sessions[session.session_id] = session
+            return session, None
+
+    def connect(self, session: SSESession, sock: socket.socket, last_seq: Optional[int] = None):
+        sock.settimeout(self.write_timeout)
+        session.attach(sock, last_seq)
+
+    def get(self, session_id: str) -> Optional[SSESession]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def publish(self, session_id: str, data: Any, event: Optional[str] = None) -> Optional[str]:
+        """Отправить событие в сессию; возвращает id события или None, если сессии нет"""
+        session = self.get(session_id)
+        if session is None:
+            return None
+        return session.send(data, event=event)
+
+    @staticmethod
+    def _parse_event_id(last_event_id: Optional[str]) -> Tuple[Optional[str], int]:
+        if not last_event_id:
+            return None, 0
+        session_id, _, seq = last_event_id.strip().partition(':')
+        try:
+            return session_id, int(seq) if seq else 0
+        except ValueError:
+            return session_id, 0
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            now = time.monotonic()
+            with self._lock:
+                sessions = list(self._sessions.values())
+            frame = SSESession._frame({"type": "heartbeat", "timestamp": time.time()})
+            for session in sessions:
+                if session.connected:
+                    session.heartbeat(frame)
+                elif session.disconnected_at is not None and now - session.disconnected_at > self.resume_ttl:
+                    with self._lock:
+                        self._sessions.pop(session.session_id, None)
+
 # HTTP сервер для SSE
-class MCPSSEHandler(http.server.SimpleHTTPRequestHandler):
+class MCPSSEHandler(KeepAliveHandlerMixin, http.server.SimpleHTTPRequestHandler):
     server_instance = None
+    sse_hub: Optional[SSESessionHub] = None
+    # Выставляется, когда сокет передан SSESessionHub и не должен закрываться сервером
+    detached = False
+    # Выставляется send_chunked после отправки заголовков потокового ответа
+    response_started = False
+    # Максимальная длина параметров вызова в логе
+    log_value_limit = 200
+    # Максимальный размер тела POST запроса
+    MAX_BODY_BYTES = 16 * 1024 * 1024
     
     def do_GET(self):
-        if self.path == '/sse':
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/event-stream')
-            self.send_header('Cache-Control', 'no-cache')
-            self.send_header('Connection', 'keep-alive')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-            self.end_headers()
-            
-            try:
-                # Отправляем информацию о доступных инструментах
-                tools_data = {
-                    "jsonrpc": "2.0",
-                    "result": {
-                        "tools": {}
-                    }
-                }
-                
-                if MCPSSEHandler.server_instance:
-                    tools_list = MCPSSEHandler.server_instance.get_tools_list()
-                    for tool in tools_list:
-                        tools_data["result"]["tools"][tool["name"]] = {
-                            "description": tool["description"],
-                            "inputSchema": tool["inputSchema"]
-                        }
-                
-                self.wfile.write(f'data: {json.dumps(tools_data, ensure_ascii=False)}\n\n'.encode('utf-8'))
-                self.wfile.flush()
-                
-                # Отправляем heartbeat
-                time.sleep(0.5)
-                heartbeat = {"type": "heartbeat", "timestamp": time.time()}
-                self.wfile.write(f'data: {json.dumps(heartbeat)}\n\n'.encode('utf-8'))
-                self.wfile.flush()
-                
-            except Exception as e:
-                logger.error(f"Ошибка SSE: {e}")
+        server = MCPSSEHandler.server_instance
+        if server is None:
+            self.route_get()
+            return
+        with server.metrics.in_flight():
+            self.route_get()
+    
+    def do_POST(self):
+        server = MCPSSEHandler.server_instance
+        if server is None:
+            self.route_post()
+            return
+        with server.metrics.in_flight():
+            self.route_post()
+    
+    def route_get(self):
+        if self.path == '/sse' or self.path.startswith('/sse?'):
+            self.handle_sse()
                 
         elif self.path.startswith('/tool/'):
             self.handle_tool_call()
             
+        elif self.path.startswith('/styles/'):
+            self.handle_style()
+            
+        elif self.path == '/cache/stats':
+            server = MCPSSEHandler.server_instance
+            self.send_json(200, server.cache_stats() if server else {})
+            
+        elif self.path == '/compression/stats':
+            server = MCPSSEHandler.server_instance
+            self.send_json(200, server.compression.stats() if server else {})
+            
+        elif self.path == '/metrics':
+            self.handle_metrics()
+            
+        elif self.path == '/tools':
+            self.handle_tools()
+            
+        elif self.path.startswith(ProfileStore.PATH_PREFIX):
+            self.handle_profiles()
+            
         elif self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
             response = {
                 'message': 'Demo MCP Server with UI Generator running', 
                 'status': 'ok',
                 'sse_endpoint': 'http://localhost:8813/sse',
-                'available_tools': len(MCPSSEHandler.server_instance.get_tools_list()) if MCPSSEHandler.server_instance else 0
+                'rpc_endpoint': 'http://localhost:8813/rpc',
+                'available_tools': len(MCPSSEHandler.server_instance.tool_catalog) if MCPSSEHandler.server_instance else 0
             }
-            self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+            self.send_json(200, response)
         else:
             self.send_error(404)
     
-    def do_POST(self):
+    def route_post(self):
         if self.path.startswith('/tool/'):
             self.handle_tool_call()
+        elif self.path == '/rpc' or self.path.startswith('/rpc?'):
+            self.handle_rpc()
+        else:
+            self.send_error(404)
+
+    def send_json(self, status: int, payload: Any, label: Optional[str] = None):
+        """Отправка JSON ответа с Content-Length
+
+        label - метка для статистики сжатия и метрик; ответы с меткой сжимаются по
+        Accept-Encoding, а время сериализации и записи попадает в /metrics.
+        payload типа bytes уже сериализован и отправляется как есть
+        """
+        started = time.perf_counter()
+        body = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        server = MCPSSEHandler.server_instance
+        encoding = None
+        if label is not None and server is not None:
+            encoding = server.compression.choose(self.headers.get('Accept-Encoding'), len(body))
+            body = server.compression.compress(body, encoding, label)
+        serialized = time.perf_counter()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if label is not None:
+            self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+        if label is not None and server is not None:
+            server.metrics.phase(label, "serialize", serialized - started)
+            server.metrics.phase(label, "write", time.perf_counter() - serialized)
+            server.metrics.response(label, len(body))
+
+    def read_body(self, required: bool) -> Optional[bytes]:
+        """Тело POST запроса по Content-Length
+
+        Без заголовка запрос с обязательным телом получает 411, с некорректной
+        длиной - 400, со слишком большим телом - 413. В этих случаях ответ уже
+        отправлен, соединение закрывается (тело не дочитано) и возвращается None
+        """
+        value = self.headers.get('Content-Length')
+        if value is None:
+            if not required:
+                return b''
+            status, message = 411, "Не указан Content-Length"
         else:
+            try:
+                length = int(value)
+            except ValueError:
+                length = -1
+            if 0 <= length <= self.MAX_BODY_BYTES:
+                return self.rfile.read(length)
+            if length > self.MAX_BODY_BYTES:
+                status, message = 413, "Слишком большое тело запроса"
+            else:
+                status, message = 400, "Некорректный Content-Length"
+        self.close_connection = True
+        self.send_json(status, {"error": message})
+        return None
+
+    def handle_metrics(self):
+        """Метрики в текстовом формате Prometheus"""
+        server = MCPSSEHandler.server_instance
+        if server is None:
+            self.send_error(503)
+            return
+        body = server.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_profiles(self):
+        """Список профилей, отчёт по профилю и скачивание в формате pstats (при --profiling)"""
+        server = MCPSSEHandler.server_instance
+        response = server.profiles.http_get(self.path) if server else None
+        if response is None:
+            self.send_error(404)
+            return
+        status, content_type, body = response
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_style(self):
+        """Отдача общего CSS по хэшу (содержимое неизменно, можно кэшировать навсегда)"""
+        style_hash = self.path[len('/styles/'):].split('?')[0]
+        server = MCPSSEHandler.server_instance
+        css = server.styles.get(style_hash) if server else None
+        if css is None:
             self.send_error(404)
+            return
+        body = css.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/css; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_tools(self):
+        """Каталог инструментов готовым (и заранее сжатым) телом; с If-None-Match - 304"""
+        server = MCPSSEHandler.server_instance
+        if server is None:
+            self.send_error(503)
+            return
+        catalog = server.tool_catalog
+        if catalog.matches(self.headers.get('If-None-Match')):
+            self.send_response(304)
+            self.send_header('ETag', catalog.etag)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            return
+        body, encoding = catalog.body(self.headers.get('Accept-Encoding'))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', catalog.etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_sse(self):
+        """Открытие или возобновление долгоживущего SSE потока"""
+        hub = MCPSSEHandler.sse_hub
+        if hub is None:
+            self.send_error(503)
+            return
+
+        query = dict(urllib.parse.parse_qsl(self.path.split('?', 1)[1])) if '?' in self.path else {}
+        last_event_id = self.headers.get('Last-Event-ID') or query.get('lastEventId')
+        # ETag каталога, который уже есть у клиента (EventSource не умеет задавать заголовки)
+        known_tools = self.headers.get('If-None-Match') or query.get('tools')
+
+        session, last_seq = hub.acquire(last_event_id)
+        if session is None:
+            self.send_error(503, 'Too many SSE sessions')
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'keep-alive')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Last-Event-ID, If-None-Match, X-MCP-Session, X-MCP-Known-Styles')
+        self.end_headers()
+        self.wfile.flush()
+
+        # Дальше сокетом владеет hub: обработчик возвращается, поток пула освобождается.
+        # Заголовок Connection: keep-alive сбрасывает close_connection, возвращаем его,
+        # иначе handle() будет ждать следующий запрос на этом сокете
+        self.detached = True
+        self.close_connection = True
+        hub.connect(session, self.connection, last_seq)
+        if last_seq is None:
+            catalog = MCPSSEHandler.server_instance.tool_catalog
+            session.send(catalog.handshake_unchanged if catalog.matches(known_tools) else catalog.handshake)
     
     def handle_tool_call(self):
         """Обработка вызова инструмента"""
@@ -882,47 +1638,390 @@ class MCPSSEHandler(http.server.SimpleHTTPRequestHandler):
             
             # Читаем тело запроса для POST
             if self.command == 'POST':
-                content_length = int(self.headers.get('Content-Length', 0))
-                if content_length > 0:
-                    post_data = self.rfile.read(content_length)
+                post_data = self.read_body(required=False)
+                if post_data is None:
+                    return
+                if post_data:
                     try:
                         post_params = json.loads(post_data.decode('utf-8'))
                         query_params.update(post_params)
                     except:
                         pass
+
+            # Результат можно получить событием в SSE сессии вместо тела ответа
+            session_id = query_params.pop('session', None) or self.headers.get('X-MCP-Session')
+            request_id = query_params.pop('requestId', None)
+            # Профиль снимается с обычного вызова, поток в этом случае не используется
+            profile = ProfileStore.requested(query_params, self.headers.get(ProfileStore.HEADER))
+            # Большие таблицы можно получать по частям (chunked)
+            stream = str(query_params.pop('stream', '')).lower() in ('1', 'true', 'yes') and not profile
             
-            logger.info(f"Вызов инструмента: {tool_name} с параметрами: {query_params}")
+            request_logger.info("Вызов инструмента: %s с параметрами: %s",
+                                tool_name, LogValue(query_params, MCPSSEHandler.log_value_limit))
             
-            if MCPSSEHandler.server_instance:
-                result = MCPSSEHandler.server_instance.call_tool(tool_name, query_params)
-                
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                
-                self.wfile.write(json.dumps(result, ensure_ascii=False).encode('utf-8'))
-            else:
+            server = MCPSSEHandler.server_instance
+            if not server:
                 self.send_error(500)
+            elif session_id:
+                self.push_tool_result(session_id, tool_name, query_params, request_id, profile)
+            else:
+                known_styles = StyleRegistry.parse_known(self.headers.get('X-MCP-Known-Styles'))
+                chunks = server.stream_tool_result(tool_name, query_params, known_styles) if stream else None
+                if chunks is not None:
+                    send_chunked(self, chunks, compressor=server.compression, label=tool_name,
+                                 metrics=server.metrics)
+                else:
+                    result = server.call_tool(tool_name, query_params, known_styles, profile)
+                    self.send_json(200, result, label=tool_name)
                 
         except Exception as e:
             logger.error(f"Ошибка обработки вызова инструмента: {e}")
+            if not self.response_started:
+                self.send_error(500)
+
+    def handle_rpc(self):
+        """JSON-RPC 2.0: одиночный запрос или пакет, запросы пакета выполняются параллельно"""
+        server = MCPSSEHandler.server_instance
+        if not server:
             self.send_error(500)
+            return
+        body = self.read_body(required=True)
+        if body is None:
+            return
+        try:
+            payload = parse_jsonrpc(body)
+        except JsonRpcError as e:
+            self.send_json(200, jsonrpc_response(None, error=e))
+            return
+
+        # tools/list отдаётся готовым буфером каталога
+        response = server.tool_catalog.rpc_response(payload) if is_jsonrpc(payload) else None
+        if response is not None:
+            self.send_json(200, response, label=ToolCatalog.LABEL)
+            return
+
+        # Стили, уже отправленные в одном пакете, не прикладываются повторно
+        known_styles = StyleRegistry.parse_known(self.headers.get('X-MCP-Known-Styles'))
+        profile = ProfileStore.requested(None, self.headers.get(ProfileStore.HEADER))
+        response = dispatch_jsonrpc(
+            payload,
+            lambda method, params: server.rpc_call(method, params, known_styles, profile),
+            getattr(self.server, 'batch_executor', None)
+        )
+        if response is None:
+            self.send_response(204)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+        else:
+            self.send_json(200, response, label=rpc_label(payload))
+
+    def push_tool_result(self, session_id: str, tool_name: str, arguments: Dict, request_id: Optional[str],
+                         profile: bool = False):
+        """Принять вызов (202) и доставить результат событием tool_result в SSE сессию"""
+        hub = MCPSSEHandler.sse_hub
+        session = hub.get(session_id) if hub else None
+        if session is None:
+            self.send_json(404, {"error": f"SSE сессия не найдена: {session_id}"})
+            return
+
+        request_id = request_id or uuid.uuid4().hex
+        self.send_json(202, {"status": "accepted", "sessionId": session_id, "requestId": request_id})
+
+        # Вызов работает с копией доставленных стилей: attach сессии может сбросить их
+        # под её блокировкой, пока инструмент выполняется в другом потоке
+        server = MCPSSEHandler.server_instance
+        known, resets = session.styles_snapshot()
+        sent = set(known)
+        result = server.call_tool(tool_name, arguments, sent, profile)
+        attached = sent - known
+        event = {"tool": tool_name, "requestId": request_id, "result": result}
+        while not session.send_with_styles(event, 'tool_result', attached, resets):
+            # Стили сброшены во время вызова: прикладываем те, что клиент мог потерять
+            known, resets = session.styles_snapshot()
+            sent = known | attached
+            server.styles.attach(result, sent)
+            attached = sent - known
     
     def log_message(self, format, *args):
-        logger.info(f"HTTP: {format % args}")
+        # Строка запроса с длинным query string обрезается так же, как параметры вызова
+        request_logger.info("HTTP: " + format, *(LogValue(arg, self.log_value_limit) if isinstance(arg, str) else arg
+                                                 for arg in args))
+
+class PooledHTTPServer(http.server.HTTPServer):
+    """HTTP сервер с ограниченным пулом рабочих потоков и лимитом соединений
+
+    Соединения обрабатываются в ThreadPoolExecutor, поэтому медленный SSE клиент
+    не блокирует вызовы инструментов. Когда все слоты заняты, цикл accept ждёт
+    освобождения (новые соединения копятся в backlog ядра), а по истечении
+    accept_timeout клиент получает 503 с Retry-After.
+
+    Keep-alive соединение занимает поток, пока ждёт следующего запроса, поэтому
+    при очереди на потоки обработчик закрывает его после ответа (connections_waiting).
 
-def run_sse_server():
+    С reuse_port сокет открывается с SO_REUSEPORT, чтобы несколько процессов
+    (run_prefork_server) слушали один порт.
+    """
+
+    request_queue_size = 128
+    sse_hub: Optional[SSESessionHub] = None
+
+    def __init__(self, server_address, handler_class, max_workers: int = 32,
+                 max_connections: int = 256, accept_timeout: float = 5.0, batch_workers: int = 8,
+                 reuse_port: bool = False):
+        self.reuse_port = reuse_port
+        self.max_workers = max_workers
+        self.max_connections = max_connections
+        self.accept_timeout = accept_timeout
+        self.rejected_connections = 0
+        self.active_connections = 0
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._count_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mcp-http')
+        # Запросы JSON-RPC пакета выполняются в отдельном пуле: ожидание задач
+        # в пуле соединений могло бы занять все его потоки
+        self.batch_executor = ThreadPoolExecutor(max_workers=batch_workers, thread_name_prefix='mcp-rpc') \
+            if batch_workers > 1 else None
+        super().__init__(server_address, handler_class)
+
+    def server_bind(self):
+        if self.reuse_port:
+            enable_reuse_port(self.socket)
+        super().server_bind()
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(timeout=self.accept_timeout):
+            self.rejected_connections += 1
+            logger.warning(f"Сервер перегружен, соединение от {client_address[0]} отклонено")
+            self._reject(request)
+            return
+        with self._count_lock:
+            self.active_connections += 1
+        self._executor.submit(self._process_in_worker, request, client_address)
+
+    @property
+    def connections_waiting(self) -> int:
+        """Сколько принятых соединений ждут свободного потока пула"""
+        return max(0, self.active_connections - self.max_workers)
+
+    def finish_request(self, request, client_address) -> bool:
+        handler = self.RequestHandlerClass(request, client_address, self)
+        return getattr(handler, 'detached', False)
+
+    def _process_in_worker(self, request, client_address):
+        detached = False
+        try:
+            detached = self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            # Сокеты SSE сессий остаются открытыми, ими управляет SSESessionHub
+            if not detached:
+                self.shutdown_request(request)
+            with self._count_lock:
+                self.active_connections -= 1
+            self._slots.release()
+
+    def _reject(self, request):
+        try:
+            request.sendall(
+                b'HTTP/1.1 503 Service Unavailable\r\n'
+                b'Retry-After: 1\r\n'
+                b'Content-Length: 0\r\n'
+                b'Connection: close\r\n\r\n'
+            )
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        if self.sse_hub is not None:
+            self.sse_hub.stop()
+        self._executor.shutdown(wait=False)
+        if self.batch_executor is not None:
+            self.batch_executor.shutdown(wait=False)
+
+def create_server_instance(cache_max_bytes: int = 32 * 1024 * 1024, shared_styles: bool = False,
+                           compression_level: int = 6, compression_min_size: int = 1024,
+                           profiling: bool = False) -> DemoMCPServer:
+    """Экземпляр DemoMCPServer для обработчика; создаётся один раз"""
+    if MCPSSEHandler.server_instance is None:
+        MCPSSEHandler.server_instance = DemoMCPServer(
+            cache_max_bytes=cache_max_bytes,
+            shared_styles=shared_styles,
+            compression_level=compression_level,
+            compression_min_size=compression_min_size,
+            profiling=profiling
+        )
+    return MCPSSEHandler.server_instance
+
+def create_http_server(host: str = '', port: int = 8813, max_workers: int = 32,
+                       max_connections: int = 256, accept_timeout: float = 5.0,
+                       heartbeat_interval: float = 15.0, replay_size: int = 256,
+                       resume_ttl: float = 60.0, max_sse_sessions: int = 1024,
+                       cache_max_bytes: int = 32 * 1024 * 1024, shared_styles: bool = False,
+                       batch_workers: int = 8, keepalive_timeout: float = 5.0,
+                       max_keepalive_requests: int = 100, compression_level: int = 6,
+                       compression_min_size: int = 1024, profiling: bool = False,
+                       reuse_port: bool = False) -> PooledHTTPServer:
+    """Создание HTTP сервера с привязанным экземпляром DemoMCPServer и SSE сессиями"""
+    MCPSSEHandler.keepalive_timeout = keepalive_timeout
+    MCPSSEHandler.max_keepalive_requests = max_keepalive_requests
+    create_server_instance(cache_max_bytes, shared_styles, compression_level, compression_min_size, profiling)
+    hub = SSESessionHub(
+        heartbeat_interval=heartbeat_interval,
+        replay_size=replay_size,
+        resume_ttl=resume_ttl,
+        max_sessions=max_sse_sessions
+    )
+    MCPSSEHandler.sse_hub = hub
+    MCPSSEHandler.server_instance.metrics.sse_connections(lambda: hub.active_connections)
+    httpd = PooledHTTPServer(
+        (host, port),
+        MCPSSEHandler,
+        max_workers=max_workers,
+        max_connections=max_connections,
+        accept_timeout=accept_timeout,
+        batch_workers=batch_workers,
+        reuse_port=reuse_port
+    )
+    httpd.sse_hub = hub
+    hub.start()
+    return httpd
+
+def setup_logging(log_file: Optional[str] = 'mcp-server.log', level: str = 'INFO',
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3,
+                  sample_rate: float = 1.0, value_limit: int = 200):
+    """Асинхронное логирование с ротацией файла и выборкой записей на каждый запрос"""
+    listener = configure_logging(log_file, getattr(logging, level.upper(), logging.INFO),
+                                 max_bytes=max_bytes, backup_count=backup_count)
+    for log_filter in [f for f in request_logger.filters if isinstance(f, SamplingFilter)]:
+        request_logger.removeFilter(log_filter)
+    request_logger.addFilter(SamplingFilter(sample_rate))
+    MCPSSEHandler.log_value_limit = value_limit
+    return listener
+
+def run_sse_server(host: str = '', port: int = 8813, **server_options):
     """Запуск HTTP сервера для SSE"""
-    # Создаем экземпляр MCP сервера
-    MCPSSEHandler.server_instance = DemoMCPServer()
-    
-    with socketserver.TCPServer(('', 8813), MCPSSEHandler) as httpd:
-        logger.info('🚀 Demo MCP SSE server running on http://localhost:8813')
-        logger.info('📡 SSE endpoint: http://localhost:8813/sse')
+    with create_http_server(host, port, **server_options) as httpd:
+        logger.info(f'🚀 Demo MCP SSE server running on http://localhost:{port}')
+        logger.info(f'📡 SSE endpoint: http://localhost:{port}/sse')
+        logger.info(f'📦 JSON-RPC 2.0 endpoint (batch): http://localhost:{port}/rpc')
+        logger.info(f'🧵 Workers: {httpd.max_workers}, max connections: {httpd.max_connections}')
         logger.info('🎨 UI Generator demo tools available!')
         logger.info('🔧 Add this URL as SSE MCP server in the interface')
         httpd.serve_forever()
 
+def run_prefork_server(processes: int, host: str = '', port: int = 8813,
+                       log_options: Optional[Dict[str, Any]] = None, **server_options) -> int:
+    """Запуск processes процессов на одном порту (SO_REUSEPORT) под наблюдением мастера
+
+    Датасеты генерируются в мастере и до fork публикуются в общий сегмент
+    (SharedDatasets), который процессы отображают только для чтения: данные
+    у всех одинаковые, а изменения видны всем процессам. Кэш, SSE сессии и
+    метрики у каждого процесса свои. Каждый процесс пишет свой файл лога.
+    """
+    log_options = dict(log_options or {})
+    logging.basicConfig(level=getattr(logging, log_options.get('level', 'INFO').upper(), logging.INFO),
+                        format=LOG_FORMAT)
+    server = create_server_instance(**{name: server_options[name] for name in (
+        'cache_max_bytes', 'shared_styles', 'compression_level', 'compression_min_size', 'profiling'
+    ) if name in server_options})
+    shared = SharedDatasets()
+    server.use_shared_data(shared)
+    logger.info(f'🧩 Prefork: {processes} processes on port {port}, datasets in {shared.base}.*')
+
+    def serve(slot: int):
+        listener = setup_logging(**dict(log_options, log_file=worker_log_file(log_options.get('log_file'), slot)))
+        try:
+            run_sse_server(host, port, reuse_port=True, **server_options)
+        finally:
+            listener.stop()
+
+    try:
+        return PreforkSupervisor(processes, serve).run()
+    finally:
+        shared.unlink()
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(description='Демо MCP SSE сервер с UI Generator')
+    parser.add_argument('--host', default='', help='Адрес для прослушивания (по умолчанию все интерфейсы)')
+    parser.add_argument('--port', type=int, default=8813, help='Порт HTTP сервера')
+    parser.add_argument('--workers', type=int, default=32, help='Размер пула рабочих потоков')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Число процессов на одном порту (SO_REUSEPORT, перезапуск упавших); 1 - без prefork')
+    parser.add_argument('--max-connections', type=int, default=256,
+                        help='Максимум одновременно обрабатываемых соединений')
+    parser.add_argument('--accept-timeout', type=float, default=5.0,
+                        help='Сколько ждать свободного слота, прежде чем ответить 503 (сек)')
+    parser.add_argument('--heartbeat-interval', type=float, default=15.0,
+                        help='Интервал heartbeat для SSE сессий (сек)')
+    parser.add_argument('--replay-size', type=int, default=256,
+                        help='Сколько событий хранить для возобновления по Last-Event-ID')
+    parser.add_argument('--resume-ttl', type=float, default=60.0,
+                        help='Сколько хранить отключившуюся SSE сессию (сек)')
+    parser.add_argument('--max-sse-sessions', type=int, default=1024,
+                        help='Максимум одновременных SSE сессий')
+    parser.add_argument('--cache-mb', type=float, default=32.0,
+                        help='Размер кэша отрендеренного HTML (МБ, 0 отключает кэш)')
+    parser.add_argument('--shared-styles', action='store_true',
+                        help='Отдавать CSS компонентов один раз на сессию ресурсом ui://styles/<hash>')
+    parser.add_argument('--batch-workers', type=int, default=8,
+                        help='Потоков для параллельного выполнения JSON-RPC пакета (1 - последовательно)')
+    parser.add_argument('--keepalive-timeout', type=float, default=5.0,
+                        help='Сколько держать простаивающее keep-alive соединение (сек)')
+    parser.add_argument('--max-keepalive-requests', type=int, default=100,
+                        help='Максимум запросов на одном соединении')
+    parser.add_argument('--compression-level', type=int, default=6,
+                        help='Уровень сжатия ответов инструментов gzip/deflate/br (0 отключает)')
+    parser.add_argument('--compression-min-size', type=int, default=1024,
+                        help='Ответы меньше этого размера (байт) не сжимаются')
+    parser.add_argument('--profiling', action='store_true',
+                        help='Разрешить профилирование вызовов (X-MCP-Profile, _profile) и /profiles')
+    parser.add_argument('--log-file', default='mcp-server.log',
+                        help='Файл лога (пустая строка - только stderr)')
+    parser.add_argument('--log-level', default='INFO', help='Уровень логирования')
+    parser.add_argument('--log-max-mb', type=float, default=10.0,
+                        help='Размер файла лога, после которого он ротируется (МБ)')
+    parser.add_argument('--log-backups', type=int, default=3, help='Сколько старых файлов лога хранить')
+    parser.add_argument('--log-sample-rate', type=float, default=1.0,
+                        help='Доля записей на каждый запрос, попадающих в лог (0..1); ошибки пишутся всегда')
+    parser.add_argument('--log-max-value', type=int, default=200,
+                        help='Параметры вызова длиннее этого числа символов обрезаются в логе')
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    run_sse_server()
\ No newline at end of file
+    args = parse_args()
+    log_options = dict(
+        log_file=args.log_file or None,
+        level=args.log_level,
+        max_bytes=int(args.log_max_mb * 1024 * 1024),
+        backup_count=args.log_backups,
+        sample_rate=args.log_sample_rate,
+        value_limit=args.log_max_value
+    )
+    server_options = dict(
+        max_workers=args.workers,
+        max_connections=args.max_connections,
+        accept_timeout=args.accept_timeout,
+        heartbeat_interval=args.heartbeat_interval,
+        replay_size=args.replay_size,
+        resume_ttl=args.resume_ttl,
+        max_sse_sessions=args.max_sse_sessions,
+        cache_max_bytes=int(args.cache_mb * 1024 * 1024),
+        shared_styles=args.shared_styles,
+        batch_workers=args.batch_workers,
+        keepalive_timeout=args.keepalive_timeout,
+        max_keepalive_requests=args.max_keepalive_requests,
+        compression_level=args.compression_level,
+        compression_min_size=args.compression_min_size,
+        profiling=args.profiling
+    )
+    if args.processes > 1:
+        if not prefork_supported():
+            raise SystemExit("--processes требует fork и SO_REUSEPORT (Linux, BSD, macOS)")
+        raise SystemExit(run_prefork_server(args.processes, args.host, args.port, log_options, **server_options))
+    else:
+        setup_logging(**log_options)
+        run_sse_server(host=args.host, port=args.port, **server_options)
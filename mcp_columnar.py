@@ -0,0 +1,509 @@
+"""
+Колоночное хранение датасетов демо MCP серверов
+Числовые колонки - массивы NumPy (или array.array без NumPy), категориальные -
+коды в словаре значений. Агрегаты, гистограммы и сортировка считаются по колонкам
+целиком, без создания словаря на каждую запись.
+"""
+
+import json
+import mmap
+import os
+import random
+import struct
+import tempfile
+from array import array
+from collections.abc import Sequence as SequenceABC
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: общий сегмент датасетов недоступен
+    fcntl = None
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен
+    np = None
+
+HAS_NUMPY = np is not None
+
+
+def _numeric_column(values: Iterable, typecode: str):
+    if HAS_NUMPY:
+        return np.fromiter(values, dtype=np.int64 if typecode == 'q' else np.float64)
+    return array(typecode, values)
+
+
+def _codes_column(codes: Iterable[int]):
+    if HAS_NUMPY:
+        return np.fromiter(codes, dtype=np.uint16)
+    return array('H', codes)
+
+
+class ColumnarTable:
+    """Таблица из колонок одинаковой длины
+
+    numeric - целые или дробные колонки, categorical - колонки с небольшим числом
+    различных значений (отдел, статус, приоритет, флаги), text - остальные поля,
+    которые хранятся обычным списком и нужны только для вывода строк.
+    """
+
+    def __init__(self, length: int, fields: Sequence[str], numeric: Dict[str, Any],
+                 categorical: Dict[str, Any], categories: Dict[str, List], text: Dict[str, List]):
+        self.length = length
+        self.fields = tuple(fields)
+        self.numeric = numeric
+        self.categorical = categorical
+        self.categories = categories
+        self.text = text
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict], numeric: Iterable[str] = (),
+                     categorical: Iterable[str] = ()) -> "ColumnarTable":
+        numeric, categorical = tuple(numeric), tuple(categorical)
+        fields = tuple(records[0]) if records else numeric + categorical
+        numeric_columns = {}
+        for field in numeric:
+            typecode = 'd' if any(isinstance(r.get(field), float) for r in records) else 'q'
+            numeric_columns[field] = _numeric_column((r.get(field) or 0 for r in records), typecode)
+        categorical_columns, categories = {}, {}
+        for field in categorical:
+            lookup: Dict[Any, int] = {}
+            categorical_columns[field] = _codes_column(
+                lookup.setdefault(r.get(field), len(lookup)) for r in records
+            )
+            categories[field] = list(lookup)
+        text = {field: [r.get(field) for r in records]
+                for field in fields if field not in numeric_columns and field not in categorical_columns}
+        return cls(len(records), fields, numeric_columns, categorical_columns, categories, text)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def column(self, field: str) -> List:
+        """Значения колонки в виде списка"""
+        if field in self.numeric:
+            return self.numeric[field].tolist()
+        if field in self.categorical:
+            values = self.categories[field]
+            return [values[code] for code in self.categorical[field].tolist()]
+        return list(self.text[field])
+
+    def row(self, position: int) -> Dict:
+        record = {}
+        for field in self.fields:
+            if field in self.numeric:
+                record[field] = self.numeric[field][position].item() if HAS_NUMPY \
+                    else self.numeric[field][position]
+            elif field in self.categorical:
+                record[field] = self.categories[field][int(self.categorical[field][position])]
+            else:
+                record[field] = self.text[field][position]
+        return record
+
+    def rows(self, positions: Optional[Iterable[int]] = None) -> Iterator[Dict]:
+        """Записи по позициям (по умолчанию все), создаются по одной при итерации"""
+        for position in range(self.length) if positions is None else positions:
+            yield self.row(int(position))
+
+    def group_totals(self, group: str, fields: Iterable[str] = ()) -> Dict[Any, Dict[str, Any]]:
+        """Число записей и суммы числовых колонок по значениям категориальной колонки"""
+        fields = tuple(fields)
+        codes = self.categorical[group]
+        labels = self.categories[group]
+        if HAS_NUMPY:
+            counts = np.bincount(codes, minlength=len(labels))
+            sums = {field: np.bincount(codes, weights=self.numeric[field], minlength=len(labels))
+                    for field in fields}
+            result = {}
+            for code, label in enumerate(labels):
+                if counts[code]:
+                    bucket = {"count": int(counts[code])}
+                    for field in fields:
+                        total = sums[field][code]
+                        bucket[field] = int(total) if self.numeric[field].dtype.kind == 'i' else float(total)
+                    result[label] = bucket
+            return result
+
+        counts = [0] * len(labels)
+        for code in codes:
+            counts[code] += 1
+        sums = {}
+        for field in fields:
+            totals = [0] * len(labels)
+            for code, value in zip(codes, self.numeric[field]):
+                totals[code] += value
+            sums[field] = totals
+        return {
+            label: dict({"count": counts[code]}, **{field: sums[field][code] for field in fields})
+            for code, label in enumerate(labels) if counts[code]
+        }
+
+    def histogram(self, field: str, bins: int = 10) -> List[Dict[str, Any]]:
+        """Гистограмма числовой колонки: границы и число значений в каждом интервале"""
+        bins = max(1, int(bins))
+        column = self.numeric[field]
+        if self.length == 0:
+            return []
+        if HAS_NUMPY:
+            counts, edges = np.histogram(column, bins=bins)
+            return [{"from": float(edges[i]), "to": float(edges[i + 1]), "count": int(counts[i])}
+                    for i in range(bins)]
+
+        low, high = min(column), max(column)
+        width = (high - low) / bins or 1
+        counts = [0] * bins
+        for value in column:
+            counts[min(int((value - low) / width), bins - 1)] += 1
+        return [{"from": low + i * width, "to": low + (i + 1) * width, "count": counts[i]}
+                for i in range(bins)]
+
+    def argsort(self, field: str, descending: bool = False) -> Sequence[int]:
+        """Позиции записей в порядке сортировки колонки (стабильная сортировка)"""
+        if field in self.categorical:
+            labels = self.categories[field]
+            # Ранги кодов в порядке сортировки самих значений
+            rank_of = [0] * len(labels)
+            for rank, code in enumerate(sorted(range(len(labels)), key=lambda c: str(labels[c]))):
+                rank_of[code] = rank
+            keys = np.asarray(rank_of)[self.categorical[field]] if HAS_NUMPY \
+                else [rank_of[code] for code in self.categorical[field]]
+        elif field in self.numeric:
+            keys = self.numeric[field]
+        else:
+            keys = self.text[field]
+
+        if HAS_NUMPY and isinstance(keys, np.ndarray):
+            return np.argsort(-keys if descending else keys, kind='stable')
+        return sorted(range(self.length), key=keys.__getitem__, reverse=descending)
+
+    def nbytes(self) -> int:
+        """Размер числовых и категориальных колонок в байтах"""
+        total = 0
+        for column in list(self.numeric.values()) + list(self.categorical.values()):
+            total += column.nbytes if HAS_NUMPY else len(column) * column.itemsize
+        return total
+
+
+class _LazyText(SequenceABC):
+    """Строковая колонка вида шаблон + номер, значения создаются при обращении"""
+
+    def __init__(self, template: str, length: int):
+        self.template = template
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(self.length))]
+        if not -self.length <= position < self.length:
+            raise IndexError(position)
+        return self.template.format(position % self.length + 1)
+
+
+def synthetic_users(count: int, seed: int = 42, departments: Sequence[str] = ("IT", "HR", "Sales", "Marketing")
+                    ) -> ColumnarTable:
+    """Синтетические пользователи сразу в колоночном виде, без промежуточных словарей"""
+    rng = random.Random(seed)
+    ids = range(1, count + 1)
+    if HAS_NUMPY:
+        generator = np.random.default_rng(seed)
+        salary = generator.integers(50000, 200001, size=count, dtype=np.int64)
+        department = generator.integers(0, len(departments), size=count, dtype=np.uint16)
+        active = generator.integers(0, 2, size=count, dtype=np.uint16)
+    else:
+        salary = array('q', (rng.randint(50000, 200000) for _ in ids))
+        department = array('H', (rng.randrange(len(departments)) for _ in ids))
+        active = array('H', (rng.randrange(2) for _ in ids))
+    return ColumnarTable(
+        count,
+        ("id", "name", "email", "department", "salary", "active"),
+        numeric={"id": _numeric_column(ids, 'q'), "salary": salary},
+        categorical={"department": department, "active": active},
+        categories={"department": list(departments), "active": [False, True]},
+        text={
+            "name": _LazyText("Пользователь {}", count),
+            "email": _LazyText("user{}@test.com", count)
+        }
+    )
+
+
+
+# Общий сегмент датасетов для нескольких процессов (local-mcp-server.py --processes)
+#
+# Файл поколения:  MAGIC | формат u32 | длина каталога u64 | каталог JSON | блоки колонок
+# Файл управления: номер текущего поколения u64
+#
+# Колонки: int/float - массивы 'q'/'d', bool - байты, category - коды 'H' и
+# значения в каталоге, text и json - смещения 'Q' и общий блок UTF-8. В json
+# пустая запись означает отсутствующее в записи поле.
+
+SEGMENT_MAGIC = b"MCPD"
+SEGMENT_FORMAT = 1
+_SEGMENT_HEADER = struct.Struct("<4sIQ")
+_GENERATION = struct.Struct("<Q")
+_MISSING = object()
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _column_kind(values: List, rows: int) -> str:
+    """Тип колонки сегмента по всем значениям (отсутствующее поле - _MISSING)"""
+    kinds = {type(value) for value in values}
+    if kinds == {bool}:
+        return "bool"
+    if kinds == {int} and all(-2 ** 63 <= value < 2 ** 63 for value in values):
+        return "int"
+    if kinds == {float}:
+        return "float"
+    if kinds == {str}:
+        distinct = len(set(values))
+        return "category" if distinct <= min(rows // 2, 65535) else "text"
+    return "json"
+
+
+def _encode_column(values: List, kind: str) -> Tuple[Dict[str, Any], List[bytes]]:
+    """Описание колонки для каталога и её блоки"""
+    if kind == "int":
+        return {}, [array('q', values).tobytes()]
+    if kind == "float":
+        return {}, [array('d', values).tobytes()]
+    if kind == "bool":
+        return {}, [bytes(values)]
+    if kind == "category":
+        lookup: Dict[str, int] = {}
+        codes = array('H', (lookup.setdefault(value, len(lookup)) for value in values))
+        return {"values": list(lookup)}, [codes.tobytes()]
+    if kind == "text":
+        encoded = [value.encode('utf-8') for value in values]
+    else:
+        encoded = [b"" if value is _MISSING else json.dumps(value, ensure_ascii=False).encode('utf-8')
+                   for value in values]
+    offsets = array('Q', [0])
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    return {}, [offsets.tobytes(), b"".join(encoded)]
+
+
+def encode_segment(datasets: Dict[str, Sequence[Dict]], generation: int = 0) -> bytes:
+    """Датасеты (списки записей) в колоночный сегмент"""
+    directory: Dict[str, Any] = {"generation": generation, "datasets": {}}
+    blocks: List[bytes] = []
+    position = 0
+    for name, records in datasets.items():
+        fields: Dict[str, None] = {}
+        for record in records:
+            fields.update(dict.fromkeys(record))
+        columns = {}
+        for field in fields:
+            values = [record.get(field, _MISSING) for record in records]
+            kind = "json" if any(value is _MISSING for value in values) else _column_kind(values, len(records))
+            meta, parts = _encode_column(values, kind)
+            meta["kind"] = kind
+            meta["blocks"] = []
+            for part in parts:
+                meta["blocks"].append([position, len(part)])
+                blocks.append(part + b"\0" * (_align(len(part)) - len(part)))
+                position += _align(len(part))
+            columns[field] = meta
+        directory["datasets"][name] = {"rows": len(records), "fields": list(fields), "columns": columns}
+
+    encoded_directory = json.dumps(directory, ensure_ascii=False).encode('utf-8')
+    data_start = _align(_SEGMENT_HEADER.size + len(encoded_directory))
+    header = _SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_FORMAT, len(encoded_directory)) + encoded_directory
+    return b"".join([header, b"\0" * (data_start - len(header))] + blocks)
+
+
+class SharedRecords(SequenceABC):
+    """Записи датасета из сегмента: словарь создаётся при обращении к записи
+
+    Сами данные остаются в отображённом файле и не копируются в процесс.
+    """
+
+    def __init__(self, buffer: memoryview, data_start: int, meta: Dict[str, Any]):
+        self.length = meta["rows"]
+        self.fields = tuple(meta["fields"])
+        self._getters = [(field, self._getter(buffer, data_start, meta["columns"][field]))
+                         for field in self.fields]
+
+    @staticmethod
+    def _getter(buffer: memoryview, data_start: int, column: Dict[str, Any]) -> Callable[[int], Any]:
+        blocks = [buffer[data_start + offset:data_start + offset + length] for offset, length in column["blocks"]]
+        kind = column["kind"]
+        if kind == "int":
+            return blocks[0].cast('q').__getitem__
+        if kind == "float":
+            return blocks[0].cast('d').__getitem__
+        if kind == "bool":
+            flags = blocks[0]
+            return lambda position: flags[position] == 1
+        if kind == "category":
+            codes, values = blocks[0].cast('H'), column["values"]
+            return lambda position: values[codes[position]]
+        offsets, blob = blocks[0].cast('Q'), blocks[1]
+        if kind == "text":
+            return lambda position: str(blob[offsets[position]:offsets[position + 1]], 'utf-8')
+
+        def decode(position: int) -> Any:
+            start, stop = offsets[position], offsets[position + 1]
+            return json.loads(str(blob[start:stop], 'utf-8')) if stop > start else _MISSING
+        return decode
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(self.length))]
+        if position < 0:
+            position += self.length
+        if not 0 <= position < self.length:
+            raise IndexError(position)
+        record = {}
+        for field, getter in self._getters:
+            value = getter(position)
+            if value is not _MISSING:
+                record[field] = value
+        return record
+
+    def column(self, field: str) -> List:
+        """Значения поля по всем записям (None, если поля нет) без создания записей"""
+        getter = dict(self._getters).get(field)
+        if getter is None:
+            return [None] * self.length
+        values = [getter(position) for position in range(self.length)]
+        return [None if value is _MISSING else value for value in values]
+
+
+class SegmentView:
+    """Отображённый только для чтения файл одного поколения"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._map)
+        magic, fmt, directory_length = _SEGMENT_HEADER.unpack_from(buffer, 0)
+        if magic != SEGMENT_MAGIC or fmt != SEGMENT_FORMAT:
+            raise ValueError(f"{path}: не сегмент датасетов формата {SEGMENT_FORMAT}")
+        start = _SEGMENT_HEADER.size
+        directory = json.loads(str(buffer[start:start + directory_length], 'utf-8'))
+        data_start = _align(start + directory_length)
+        self.generation = directory["generation"]
+        self.size = len(self._map)
+        self.datasets = {name: SharedRecords(buffer, data_start, meta)
+                         for name, meta in directory["datasets"].items()}
+
+    def records(self, name: str) -> SharedRecords:
+        return self.datasets[name]
+
+
+class SharedDatasets:
+    """Датасеты в общем сегменте, который процессы отображают только для чтения
+
+    Мастер публикует датасеты до fork, процессы читают их из одних и тех же
+    страниц памяти, так что память не растёт с числом процессов. Каждое
+    изменение пишет новое поколение в отдельный файл и атомарно переключает
+    номер поколения в файле управления; процессы сверяют номер (8 байт) при
+    обращении к данным и переотображают сегмент, если он сменился. Изменения
+    сериализуются блокировкой файла управления (flock), поэтому их можно
+    делать из любого процесса.
+    """
+
+    def __init__(self, directory: Optional[str] = None, name: Optional[str] = None):
+        if fcntl is None:
+            raise RuntimeError("Общий сегмент датасетов требует fcntl (Linux, BSD, macOS)")
+        if directory is None:
+            directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        self.base = os.path.join(directory, name or f"mcp-datasets-{os.getpid()}")
+        self.owner = os.getpid()
+        with open(self.control_path, 'wb') as f:
+            f.write(_GENERATION.pack(0))
+        self._control: Optional[mmap.mmap] = None
+        self._view: Optional[SegmentView] = None
+
+    @property
+    def control_path(self) -> str:
+        return f"{self.base}.ctl"
+
+    def segment_path(self, generation: int) -> str:
+        return f"{self.base}.{generation}"
+
+    @property
+    def generation(self) -> int:
+        """Номер текущего поколения (0 - ещё ничего не опубликовано)"""
+        if self._control is None:
+            with open(self.control_path, 'rb') as f:
+                self._control = mmap.mmap(f.fileno(), _GENERATION.size, access=mmap.ACCESS_READ)
+        return _GENERATION.unpack_from(self._control, 0)[0]
+
+    def view(self) -> SegmentView:
+        """Отображение текущего поколения; переоткрывается, если поколение сменилось"""
+        while True:
+            generation = self.generation
+            if self._view is not None and self._view.generation == generation:
+                return self._view
+            try:
+                self._view = SegmentView(self.segment_path(generation))
+                return self._view
+            except FileNotFoundError:
+                # Поколение успели заменить между чтением номера и открытием файла
+                continue
+
+    def publish(self, datasets: Dict[str, Sequence[Dict]]) -> int:
+        """Записать датасеты новым поколением; возвращает его номер"""
+        with self._locked() as control:
+            return self._write(control, datasets)
+
+    def update(self, name: str, change: Callable[[List[Dict]], Tuple[Optional[Sequence[Dict]], Any]]) -> Any:
+        """Изменить датасет name под блокировкой
+
+        change получает записи текущего поколения (словари) и возвращает
+        (новые записи или None, результат). Новое поколение публикуется, только
+        если записи вернулись; результат change возвращается вызывающему.
+        """
+        with self._locked() as control:
+            current = SegmentView(self.segment_path(_GENERATION.unpack(os.pread(control, 8, 0))[0]))
+            records, result = change(list(current.records(name)))
+            if records is not None:
+                datasets = {dataset: list(view) for dataset, view in current.datasets.items() if dataset != name}
+                datasets[name] = records
+                self._write(control, datasets)
+            return result
+
+    @contextmanager
+    def _locked(self) -> Iterator[int]:
+        control = os.open(self.control_path, os.O_RDWR)
+        try:
+            fcntl.flock(control, fcntl.LOCK_EX)
+            yield control
+        finally:
+            os.close(control)
+
+    def _write(self, control: int, datasets: Dict[str, Sequence[Dict]]) -> int:
+        previous = _GENERATION.unpack(os.pread(control, 8, 0))[0]
+        generation = previous + 1
+        path = self.segment_path(generation)
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(encode_segment(datasets, generation))
+        os.replace(f"{path}.tmp", path)
+        os.pwrite(control, _GENERATION.pack(generation), 0)
+        if previous:
+            # Отображения старого поколения в процессах остаются действительными
+            try:
+                os.unlink(self.segment_path(previous))
+            except FileNotFoundError:
+                pass
+        return generation
+
+    def unlink(self):
+        """Удалить файлы сегмента (вызывает мастер при остановке)"""
+        for path in (self.segment_path(self.generation), self.control_path):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,2231 @@
+"""
+Общие компоненты демо MCP серверов
+Используются local-mcp-server.py и demo-ui-generator-server.py
+"""
+
+import asyncio
+import atexit
+import bisect
+import cProfile
+import gc
+import hashlib
+import io
+import json
+import logging
+import logging.handlers
+import marshal
+import multiprocessing
+import os
+import pickle
+import pstats
+import queue
+import random
+import re
+import signal
+import socket
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен, без него остаются gzip и deflate
+    brotli = None
+
+STYLE_URI_PREFIX = "ui://styles/"
+STYLE_LINK_RE = re.compile(r'<link rel="stylesheet" href="ui://styles/([0-9a-f]+)">')
+
+
+def canonical_arguments(arguments: Optional[Dict]) -> str:
+    """Каноническое представление аргументов: одинаковые аргументы дают одинаковую строку"""
+    return json.dumps(arguments or {}, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class RenderCache:
+    """LRU кэш отрендеренных HTML ресурсов с ограничением по размеру в байтах
+
+    Ключ строится из имени инструмента, канонических аргументов и версии данных,
+    поэтому изменение датасета само по себе делает старые записи недостижимыми,
+    а LRU со временем их вытесняет.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Dict, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: Optional[Dict], data_version: int) -> Tuple[str, str, int]:
+        return (tool_name, canonical_arguments(arguments), data_version)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, resource: Dict) -> bool:
+        """Сохранить ресурс; ресурсы больше max_bytes не кэшируются"""
+        size = len(resource.get("text", "").encode('utf-8'))
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (resource, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return True
+
+    def get_or_render(self, key: Hashable, render: Callable[[], Dict]) -> Dict:
+        """Вернуть результат инструмента из кэша или вызвать render и закэшировать его ресурс"""
+        resource = self.get(key)
+        if resource is not None:
+            return self._result_from(resource)
+        result = render()
+        self._store_result(key, result)
+        return result
+
+    async def get_or_render_async(self, key: Hashable, render: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Асинхронный вариант get_or_render для корутин-инструментов"""
+        resource = self.get(key)
+        if resource is not None:
+            return self._result_from(resource)
+        result = await render()
+        self._store_result(key, result)
+        return result
+
+    @staticmethod
+    def _result_from(resource: Dict) -> Dict:
+        return {"content": [{"type": "resource", "resource": dict(resource)}]}
+
+    def _store_result(self, key: Hashable, result: Dict):
+        # Кэшируются только успешные ответы из одного HTML ресурса
+        content = result.get("content", [])
+        if not result.get("isError") and len(content) == 1 and content[0].get("type") == "resource":
+            self.put(key, dict(content[0]["resource"]))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def copy_tool_result(result: Dict) -> Dict:
+    """Копия результата инструмента, которую можно дополнять (styles.attach), не трогая оригинал
+
+    Копируются словари и список content, строки HTML остаются общими.
+    """
+    content = [
+        dict(item, resource=dict(item["resource"])) if isinstance(item.get("resource"), dict) else dict(item)
+        for item in result.get("content", [])
+    ]
+    return dict(result, content=content)
+
+
+class _LeaderCancelled(Exception):
+    """Вызов, выполнявший общий рендер, отменён: ожидающие вызовы повторяют попытку"""
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Объединение одинаковых одновременных вызовов инструментов (single-flight)
+
+    Первый вызов с ключом выполняет рендер, а вызовы с тем же ключом, пришедшие
+    до его завершения, ждут и получают копию того же результата (или то же
+    исключение). Ключ - RenderCache.make_key: имя инструмента, канонические
+    аргументы и версия данных, поэтому вызов после изменения данных не получит
+    рендер старой версии. do - для потоков, do_async - для корутин одного цикла
+    событий. Каждый вызывающий получает свою копию результата (copy_tool_result).
+    Если отменена корутина, выполнявшая рендер, ожидающие её не отменяются:
+    один из них выполняет рендер заново, остальные ждут уже его.
+    С enabled=False каждый вызов выполняется сам (для сравнения в бенчмарках).
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.executed = 0
+        self.coalesced = 0
+        self._by_tool: Dict[str, int] = {}
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, render: Callable[[], Dict]) -> Tuple[Dict, bool]:
+        """(результат, был ли вызов объединён с уже выполняющимся)"""
+        if not self.enabled:
+            return render(), False
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                leader = True
+            else:
+                self._count(key)
+                leader = False
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy_tool_result(flight.result), True
+
+        try:
+            flight.result = render()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                self.executed += 1
+            flight.done.set()
+        return copy_tool_result(flight.result), False
+
+    async def do_async(self, key: Hashable, render: Callable[[], Awaitable[Dict]]) -> Tuple[Dict, bool]:
+        """Вариант do для корутин; вызовы из разных циклов событий не объединяются"""
+        if not self.enabled:
+            return await render(), False
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                future = self._futures.get(key)
+                if future is not None and future.get_loop() is loop:
+                    self._count(key)
+                else:
+                    own = self._futures[key] = loop.create_future()
+                    break
+            try:
+                # shield: отмена ожидающего вызова не отменяет общий рендер
+                return copy_tool_result(await asyncio.shield(future)), True
+            except _LeaderCancelled:
+                # Этот вызов рендер так и не получил, объединённым он не считается
+                with self._lock:
+                    self._uncount(key)
+
+        try:
+            result = await render()
+        except asyncio.CancelledError:
+            own.set_exception(_LeaderCancelled())
+            own.exception()
+            raise
+        except BaseException as e:
+            own.set_exception(e)
+            # Исключение получат ожидающие; без них asyncio не должен сообщать о непрочитанной ошибке
+            own.exception()
+            raise
+        else:
+            own.set_result(result)
+        finally:
+            with self._lock:
+                if self._futures.get(key) is own:
+                    del self._futures[key]
+                self.executed += 1
+        return copy_tool_result(result), False
+
+    def _count(self, key: Hashable):
+        tool = str(key[0]) if isinstance(key, tuple) and key else str(key)
+        self.coalesced += 1
+        self._by_tool[tool] = self._by_tool.get(tool, 0) + 1
+
+    def _uncount(self, key: Hashable):
+        tool = str(key[0]) if isinstance(key, tuple) and key else str(key)
+        self.coalesced -= 1
+        self._by_tool[tool] -= 1
+        if not self._by_tool[tool]:
+            del self._by_tool[tool]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "inFlight": len(self._flights) + len(self._futures),
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "byTool": dict(self._by_tool)
+            }
+
+
+class StyleRegistry:
+    """Таблицы стилей компонентов, публикуемые один раз как ресурсы ui://styles/<hash>
+
+    В обычном режиме генераторы встраивают CSS блоком <style>. В режиме shared
+    компонент содержит только <link> на ui://styles/<hash>, а сам CSS прикладывается
+    к ответу отдельным ресурсом, если клиент ещё его не получал.
+    """
+
+    def __init__(self, shared: bool = False):
+        self.shared = shared
+        self._styles: Dict[str, str] = {}
+        self._links: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def register(self, css: str) -> str:
+        """Зарегистрировать CSS и вернуть его хэш"""
+        style_hash = hashlib.sha256(css.encode('utf-8')).hexdigest()[:16]
+        with self._lock:
+            self._styles[style_hash] = css
+            self._links[css] = f'<link rel="stylesheet" href="{STYLE_URI_PREFIX}{style_hash}">'
+        return style_hash
+
+    def render(self, css: str) -> str:
+        """HTML для подключения стилей компонента: <style> или ссылка на общий ресурс"""
+        if not self.shared:
+            return f"<style>{css}</style>"
+        link = self._links.get(css)
+        if link is None:
+            self.register(css)
+            link = self._links[css]
+        return link
+
+    def get(self, style_hash: str) -> Optional[str]:
+        return self._styles.get(style_hash)
+
+    def resource(self, style_hash: str) -> Optional[Dict[str, str]]:
+        css = self.get(style_hash)
+        if css is None:
+            return None
+        return {"uri": f"{STYLE_URI_PREFIX}{style_hash}", "mimeType": "text/css", "text": css}
+
+    def resources(self) -> List[Dict[str, str]]:
+        return [self.resource(style_hash) for style_hash in list(self._styles)]
+
+    @staticmethod
+    def parse_known(value: Any) -> Set[str]:
+        """Хэши стилей, уже имеющиеся у клиента (список или строка через запятую)"""
+        if not value:
+            return set()
+        if isinstance(value, str):
+            value = value.split(',')
+        return {item.strip().rsplit('/', 1)[-1] for item in value if item and item.strip()}
+
+    def attach(self, result: Dict, known: Set[str]) -> Dict:
+        """Приложить к ответу ресурсы стилей, на которые ссылаются его HTML ресурсы
+
+        Уже известные клиенту хэши пропускаются, отправленные добавляются в known.
+        """
+        if not self.shared:
+            return result
+        content = result.get("content", [])
+        needed: List[str] = []
+        for item in content:
+            resource = item.get("resource") if item.get("type") == "resource" else None
+            if resource and resource.get("mimeType") == "text/html":
+                needed.extend(STYLE_LINK_RE.findall(resource.get("text", "")))
+        for style_hash in dict.fromkeys(needed):
+            if style_hash in known:
+                continue
+            resource = self.resource(style_hash)
+            if resource is not None:
+                content.append({"type": "resource", "resource": resource})
+                known.add(style_hash)
+        return result
+
+
+def iter_tool_result_json(uri: str, fragments: Iterable[str], styles: Optional[StyleRegistry] = None,
+                          known_styles: Optional[Set[str]] = None) -> Iterator[bytes]:
+    """JSON результата инструмента с одним HTML ресурсом, собираемый по мере генерации
+
+    Каждый HTML фрагмент экранируется и отдаётся сразу, так что весь документ
+    никогда не находится в памяти целиком. Итоговый JSON совпадает по структуре
+    с обычным ответом {"content": [{"type": "resource", ...}]}.
+    """
+    yield (
+        '{"content": [{"type": "resource", "resource": {"uri": '
+        + json.dumps(uri, ensure_ascii=False)
+        + ', "mimeType": "text/html", "text": "'
+    ).encode('utf-8')
+
+    referenced: List[str] = []
+    for fragment in fragments:
+        if styles is not None and styles.shared:
+            referenced.extend(STYLE_LINK_RE.findall(fragment))
+        yield json.dumps(fragment, ensure_ascii=False)[1:-1].encode('utf-8')
+    yield b'"}}'
+
+    known = known_styles if known_styles is not None else set()
+    for style_hash in dict.fromkeys(referenced):
+        resource = styles.resource(style_hash) if style_hash not in known else None
+        if resource is not None:
+            known.add(style_hash)
+            yield (', ' + json.dumps({"type": "resource", "resource": resource}, ensure_ascii=False)).encode('utf-8')
+    yield b']}'
+
+
+class ResponseCompressor:
+    """Сжатие ответов по Accept-Encoding (br, gzip, deflate) со статистикой
+
+    Ответы меньше min_size отправляются как есть: на них сжатие почти не даёт
+    выигрыша, а время на него тратится. level 0 отключает сжатие. Статистика
+    копится по меткам (обычно имя инструмента): сколько байт было и сколько ушло.
+    """
+
+    WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+    def __init__(self, level: int = 6, min_size: int = 1024):
+        self.level = max(0, min(int(level), 9))
+        self.min_size = min_size
+        # Порядок предпочтения сервера при равных q
+        self.encodings = (("br",) if brotli is not None else ()) + ("gzip", "deflate")
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+        preferences = {}
+        for item in (header or "").split(","):
+            name, _, params = item.strip().partition(";")
+            if not name:
+                continue
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            preferences[name.strip().lower()] = quality
+        return preferences
+
+    def choose(self, accept_encoding: Optional[str], size: Optional[int] = None) -> Optional[str]:
+        """Кодировка для ответа или None; size=None - размер заранее неизвестен (поток)"""
+        if not self.level or not accept_encoding or (size is not None and size < self.min_size):
+            return None
+        preferences = self.parse_accept_encoding(accept_encoding)
+        default = preferences.get("*", 0.0)
+        best, best_quality = None, 0.0
+        for encoding in self.encodings:
+            quality = preferences.get(encoding, default)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def compress(self, body: bytes, encoding: Optional[str], label: str = "") -> bytes:
+        if encoding is None:
+            self.record(label, len(body), len(body), False)
+            return body
+        compressed = self.encode(body, encoding)
+        self.record(label, len(body), len(compressed), True)
+        return compressed
+
+    def encode(self, body: bytes, encoding: str) -> bytes:
+        """Сжать тело без записи в статистику (для заранее подготовленных ответов)"""
+        if encoding == "br":
+            return brotli.compress(body, quality=min(self.level + 2, 11))
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, self.WBITS[encoding])
+        return compressor.compress(body) + compressor.flush()
+
+    def stream(self, chunks: Iterable[bytes], encoding: Optional[str], label: str = "") -> Iterator[bytes]:
+        """Сжатие потока: каждая часть сбрасывается сразу, чтобы клиент мог начать разбор"""
+        raw = sent = 0
+        if encoding is None:
+            for chunk in chunks:
+                raw += len(chunk)
+                yield chunk
+            self.record(label, raw, raw, False)
+            return
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=min(self.level + 2, 11))
+            process, flush, finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, self.WBITS[encoding])
+            process = compressor.compress
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)  # noqa: E731
+            finish = compressor.flush
+        for chunk in chunks:
+            if not chunk:
+                continue
+            raw += len(chunk)
+            data = process(chunk) + flush()
+            sent += len(data)
+            if data:
+                yield data
+        tail = finish()
+        sent += len(tail)
+        if tail:
+            yield tail
+        self.record(label, raw, sent, True)
+
+    def record(self, label: str, raw: int, sent: int, compressed: bool):
+        """Учесть отправленный ответ в статистике: raw байт до сжатия, sent - отправлено"""
+        with self._lock:
+            stats = self._stats.setdefault(label or "other", {
+                "responses": 0, "compressed": 0, "rawBytes": 0, "sentBytes": 0
+            })
+            stats["responses"] += 1
+            stats["compressed"] += int(compressed)
+            stats["rawBytes"] += raw
+            stats["sentBytes"] += sent
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            per_label = {
+                label: dict(stats, ratio=round(stats["sentBytes"] / stats["rawBytes"], 3) if stats["rawBytes"] else 1.0)
+                for label, stats in self._stats.items()
+            }
+        return {
+            "level": self.level,
+            "minSize": self.min_size,
+            "encodings": list(self.encodings),
+            "rawBytes": sum(stats["rawBytes"] for stats in per_label.values()),
+            "sentBytes": sum(stats["sentBytes"] for stats in per_label.values()),
+            "byTool": per_label
+        }
+
+
+class ToolCatalog:
+    """Неизменяемый каталог инструментов с заранее сериализованными ответами
+
+    Тело tools/list ({"tools": [...]}), его сжатые варианты и данные SSE
+    рукопожатия кодируются один раз при создании, так что ответ сводится к записи
+    готового буфера. ETag - хэш тела tools/list: клиент с актуальным каталогом
+    получает 304 (GET /tools) или короткое событие без списка (SSE). Когда набор
+    инструментов меняется, сервер создаёт новый каталог вместо изменения старого.
+    """
+
+    LABEL = "tools/list"
+
+    def __init__(self, tools: Iterable[Dict[str, Any]], compressor: Optional[ResponseCompressor] = None):
+        tools = list(tools)
+        self.json = json.dumps({"tools": tools}, ensure_ascii=False).encode('utf-8')
+        # Копия из JSON не разделяет словари с кодом, который строил список
+        self.tools: Tuple[Dict[str, Any], ...] = tuple(json.loads(self.json)["tools"])
+        self.names = frozenset(tool["name"] for tool in self.tools)
+        self.etag = '"' + hashlib.sha256(self.json).hexdigest()[:16] + '"'
+        self.handshake = json.dumps({
+            "jsonrpc": "2.0",
+            "result": {
+                "tools": {tool["name"]: {key: tool[key] for key in ("description", "inputSchema") if key in tool}
+                          for tool in self.tools},
+                "etag": self.etag
+            }
+        }, ensure_ascii=False)
+        self.handshake_unchanged = json.dumps({"jsonrpc": "2.0", "result": {"etag": self.etag, "unchanged": True}})
+        self._compressor = compressor
+        self._encoded: Dict[str, bytes] = {}
+        if compressor is not None and compressor.level and len(self.json) >= compressor.min_size:
+            for encoding in compressor.encodings:
+                self._encoded[encoding] = compressor.encode(self.json, encoding)
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def body(self, accept_encoding: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+        """Готовое тело tools/list и его кодировка (None - без сжатия)"""
+        compressor = self._compressor
+        encoding = compressor.choose(accept_encoding, len(self.json)) if compressor is not None else None
+        body = self._encoded.get(encoding, self.json) if encoding else self.json
+        if body is self.json:
+            encoding = None
+        if compressor is not None:
+            compressor.record(self.LABEL, len(self.json), len(body), encoding is not None)
+        return body, encoding
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Совпадает ли заголовок If-None-Match (или переданный клиентом ETag) с каталогом"""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag == "*" or tag == self.etag or f'"{tag}"' == self.etag:
+                return True
+        return False
+
+    def rpc_response(self, request: Any) -> Optional[bytes]:
+        """Готовый ответ на одиночный запрос tools/list или None для остальных запросов
+
+        JSON-RPC 2.0 запрос получает конверт с id вокруг готового тела, запрос
+        в старом формате {method, params} - само тело.
+        """
+        if not isinstance(request, dict) or request.get("method") != "tools/list" or \
+                not isinstance(request.get("params", {}), dict):
+            return None
+        if not is_jsonrpc(request):
+            return self.json
+        if "id" not in request:
+            return None
+        request_id = json.dumps(request["id"], ensure_ascii=False).encode('utf-8')
+        return b'{"jsonrpc": "2.0", "id": ' + request_id + b', "result": ' + self.json + b'}'
+
+
+_TYPE_NAMES = {
+    "integer": "целым числом", "number": "числом", "string": "строкой",
+    "boolean": "true или false", "object": "объектом", "array": "массивом"
+}
+
+
+def _coerce_integer(value: Any) -> Any:
+    if isinstance(value, bool):
+        raise TypeError
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        return int(value.strip())
+    raise TypeError
+
+
+def _coerce_number(value: Any) -> Any:
+    if isinstance(value, bool):
+        raise TypeError
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            return float(value.strip())
+    raise TypeError
+
+
+def _coerce_string(value: Any) -> Any:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise TypeError
+
+
+def _coerce_boolean(value: Any) -> Any:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("true", "1", "yes", "false", "0", "no"):
+        return value.lower() in ("true", "1", "yes")
+    raise TypeError
+
+
+def _coerce_instance(kind: type) -> Callable[[Any], Any]:
+    def coerce(value: Any) -> Any:
+        if not isinstance(value, kind):
+            raise TypeError
+        return value
+    return coerce
+
+
+_COERCERS = {
+    "integer": _coerce_integer,
+    "number": _coerce_number,
+    "string": _coerce_string,
+    "boolean": _coerce_boolean,
+    "object": _coerce_instance(dict),
+    "array": _coerce_instance(list)
+}
+
+
+def _compile_property(name: str, schema: Dict[str, Any]) -> Callable[[Any], Any]:
+    """Проверка одного аргумента: тип, enum, minimum и maximum"""
+    types = schema.get("type")
+    types = [types] if isinstance(types, str) else list(types or ())
+    coercers = [_COERCERS[kind] for kind in types if kind in _COERCERS]
+    expected = " или ".join(_TYPE_NAMES.get(kind, kind) for kind in types)
+    enum = schema.get("enum")
+    # Строковые значения enum сравниваются без учёта регистра и приводятся к написанию схемы
+    enum_lookup = {str(item).lower(): item for item in enum} if enum is not None else None
+    minimum, maximum = schema.get("minimum"), schema.get("maximum")
+
+    def check(value: Any) -> Any:
+        if coercers:
+            for coerce in coercers:
+                try:
+                    value = coerce(value)
+                    break
+                except (TypeError, ValueError):
+                    continue
+            else:
+                raise ValueError(f"{name} должен быть {expected}, получено: {value}")
+        if enum_lookup is not None:
+            key = value.lower() if isinstance(value, str) else str(value).lower()
+            if key not in enum_lookup:
+                raise ValueError(f"{name} должен быть одним из: {', '.join(map(str, enum))}, получено: {value}")
+            value = enum_lookup[key]
+        if minimum is not None and value < minimum:
+            raise ValueError(f"{name} должен быть не меньше {minimum}")
+        if maximum is not None and value > maximum:
+            value = maximum
+        return value
+    return check
+
+
+def compile_arguments_validator(schema: Optional[Dict[str, Any]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Проверка аргументов инструмента, собранная из inputSchema один раз при регистрации
+
+    Поддерживаются properties верхнего уровня (type, в том числе список типов,
+    enum, minimum, maximum) и required. Аргументы из query string приходят
+    строками, поэтому числа и флаги приводятся, как в TableQuery, а значения
+    больше maximum ограничиваются им. Пустые значения и аргументы, которых нет
+    в схеме, передаются как есть. Возвращает новый словарь; ошибка - ValueError.
+    """
+    properties = (schema or {}).get("properties") or {}
+    checks = {name: _compile_property(name, prop) for name, prop in properties.items()}
+    required = tuple((schema or {}).get("required") or ())
+
+    def validate(arguments: Dict[str, Any]) -> Dict[str, Any]:
+        for name in required:
+            if arguments.get(name) in (None, ""):
+                raise ValueError(f"Не указан обязательный аргумент {name}")
+        result = dict(arguments)
+        for name, value in arguments.items():
+            check = checks.get(name)
+            if check is not None and value is not None and value != "":
+                result[name] = check(value)
+        return result
+    return validate
+
+
+class ToolSpec:
+    """Инструмент в реестре: описание для каталога, обработчик, валидатор и политика кэша
+
+    cacheable - bool или функция от проверенных аргументов; stream - (URI ресурса,
+    функция HTML фрагментов) для инструментов с потоковой отдачей.
+    """
+
+    def __init__(self, name: str, description: str, handler: Callable, input_schema: Optional[Dict] = None,
+                 cacheable: Any = False, stream: Optional[Tuple[str, Callable]] = None):
+        self.name = name
+        self.description = description
+        self.handler = handler
+        self.input_schema = input_schema
+        self.stream = stream
+        self.validate = compile_arguments_validator(input_schema)
+        self._cacheable = cacheable
+
+    def cacheable(self, arguments: Dict[str, Any]) -> bool:
+        """Можно ли отдать результат из кэша (и считать его по ключу аргументов и версии данных)"""
+        return bool(self._cacheable(arguments) if callable(self._cacheable) else self._cacheable)
+
+    def to_dict(self) -> Dict[str, Any]:
+        tool = {"name": self.name, "description": self.description}
+        if self.input_schema is not None:
+            tool["inputSchema"] = self.input_schema
+        return tool
+
+
+class ComponentSpec:
+    """UI компонент в реестре: функция рендера и CSS, если компонент рендерится в пуле процессов"""
+
+    def __init__(self, name: str, handler: Callable, offload_styles: Optional[str] = None,
+                 uses_schema: bool = False):
+        self.name = name
+        self.handler = handler
+        self.offload_styles = offload_styles
+        self.uses_schema = uses_schema
+
+    def render(self, owner: Any, data: Any, title: str, schema: Any = None) -> str:
+        if self.uses_schema:
+            return self.handler(owner, data, title, schema)
+        return self.handler(owner, data, title)
+
+
+class ToolRegistry:
+    """Декларативный реестр инструментов и UI компонентов сервера
+
+    Заполняется декораторами в теле класса сервера при импорте модуля:
+
+        TOOLS = ToolRegistry()
+
+        class Server:
+            @TOOLS.tool("show_users_table", "Таблица пользователей", schema, cacheable=True)
+            def _show_users_table(self, arguments): ...
+
+    Вызов - один поиск в словаре; валидатор аргументов собирается из inputSchema
+    при регистрации. Порядок регистрации - порядок инструментов в tools/list.
+    Реестр - единое место для политики кэша и метки метрик инструмента:
+    имена, которых нет в реестре, считаются в метриках под меткой unknown.
+    """
+
+    UNKNOWN_LABEL = "unknown"
+
+    def __init__(self):
+        self._tools: Dict[str, ToolSpec] = {}
+        self.components: Dict[str, ComponentSpec] = {}
+
+    def tool(self, name: str, description: str, input_schema: Optional[Dict] = None, cacheable: Any = False,
+             stream: Optional[Tuple[str, Callable]] = None) -> Callable[[Callable], Callable]:
+        """Декоратор обработчика инструмента; сама функция не меняется"""
+        def register(handler: Callable) -> Callable:
+            if name in self._tools:
+                raise ValueError(f"Инструмент {name} уже зарегистрирован")
+            self._tools[name] = ToolSpec(name, description, handler, input_schema, cacheable, stream)
+            return handler
+        return register
+
+    def component(self, name: str, offload_styles: Optional[str] = None,
+                  uses_schema: bool = False) -> Callable[[Callable], Callable]:
+        """Декоратор функции рендера компонента (self, data, title[, schema]) -> HTML"""
+        def register(handler: Callable) -> Callable:
+            if name in self.components:
+                raise ValueError(f"Компонент {name} уже зарегистрирован")
+            self.components[name] = ComponentSpec(name, handler, offload_styles, uses_schema)
+            return handler
+        return register
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self._tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __iter__(self) -> Iterator[ToolSpec]:
+        return iter(self._tools.values())
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def catalog(self) -> List[Dict[str, Any]]:
+        """Описания инструментов для tools/list (основа ToolCatalog)"""
+        return [spec.to_dict() for spec in self._tools.values()]
+
+    def metric_label(self, name: str) -> str:
+        return name if name in self._tools else self.UNKNOWN_LABEL
+
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class LogValue:
+    """Значение для сообщения лога, которое обрезается до limit символов
+
+    Преобразуется в строку только при форматировании записи, то есть для записей,
+    отброшенных уровнем или выборкой, repr большого словаря не строится вовсе.
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: int = 200):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        text = self.value if isinstance(self.value, str) else repr(self.value)
+        if self.limit and len(text) > self.limit:
+            return f"{text[:self.limit]}... (+{len(text) - self.limit})"
+        return text
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает долю rate записей уровня ниже WARNING; предупреждения и ошибки - всегда"""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = max(0.0, min(float(rate), 1.0))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        return self.rate > 0.0 and random.random() < self.rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler без полного форматирования в потоке запроса
+
+    Стандартный prepare форматирует строку целиком (время, уровень) и копирует
+    запись, а потом обработчики в потоке записи форматируют её ещё раз. Здесь в
+    очередь уходит запись с уже подставленными аргументами: они могут измениться
+    после вызова, а остальное форматирование делается один раз в QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _stop_listener(listener: logging.handlers.QueueListener):
+    if getattr(listener, "_thread", None) is not None:
+        listener.stop()
+
+
+def configure_logging(log_file: Optional[str] = None, level: int = logging.INFO,
+                      max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3,
+                      stream: Optional[Any] = sys.stderr) -> logging.handlers.QueueListener:
+    """Логирование через очередь: запись в файл и stderr идёт в отдельном потоке
+
+    Корневой логгер получает только QueueHandler, поэтому поток запроса лишь
+    форматирует запись и кладёт её в очередь. Файл ротируется по размеру
+    (max_bytes, backup_count копий). Возвращает запущенный QueueListener;
+    при выходе из процесса он останавливается и дописывает очередь.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers: List[logging.Handler] = []
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True
+        ))
+    if stream is not None:
+        handlers.append(logging.StreamHandler(stream))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label(value)}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """Счётчики, гистограммы и датчики в текстовом формате Prometheus (без prometheus_client)
+
+    Семейства объявляются заранее (counter, histogram, gauge), значения хранятся по
+    наборам меток. Датчик может читать значение функцией при каждом render.
+    """
+
+    def __init__(self):
+        self._families: "OrderedDict[str, Tuple[str, str, Any]]" = OrderedDict()
+        self._values: Dict[str, Dict[Tuple[Tuple[str, str], ...], Any]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str):
+        self._families[name] = ("counter", help_text, None)
+        self._values[name] = {}
+
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self._families[name] = ("histogram", help_text, tuple(sorted(buckets)))
+        self._values[name] = {}
+
+    def gauge(self, name: str, help_text: str, func: Optional[Callable[[], float]] = None):
+        self._families[name] = ("gauge", help_text, func)
+        self._values[name] = {}
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Увеличить счётчик или датчик (для датчика amount может быть отрицательным)"""
+        key = self._key(labels)
+        with self._lock:
+            values = self._values[name]
+            values[key] = values.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = self._families[name][2]
+        key = self._key(labels)
+        index = bisect.bisect_left(buckets, value)
+        with self._lock:
+            state = self._values[name].get(key)
+            if state is None:
+                # Счётчики по интервалам (не накопительные), сумма, количество
+                state = self._values[name][key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def value(self, name: str, **labels) -> Any:
+        """Текущее значение счётчика или датчика; для гистограммы - число наблюдений"""
+        with self._lock:
+            state = self._values[name].get(self._key(labels))
+        if isinstance(state, list):
+            return state[2]
+        return state or 0
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            snapshot = {name: dict(values) if self._families[name][0] != "histogram"
+                        else {key: [list(state[0]), state[1], state[2]] for key, state in values.items()}
+                        for name, values in self._values.items()}
+        for name, (kind, help_text, extra) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            values = snapshot[name]
+            if kind == "gauge" and extra is not None:
+                values = {(): extra()}
+            if kind == "histogram":
+                for key, (counts, total, count) in sorted(values.items()):
+                    cumulative = 0
+                    for bound, bucket_count in zip(extra + (float("inf"),), counts):
+                        cumulative += bucket_count
+                        le = 'le="' + _format_number(bound) + '"'
+                        lines.append(f"{name}_bucket{_format_labels(key, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_number(total)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {count}")
+            else:
+                if not values and kind == "gauge":
+                    values = {(): 0}
+                for key, value in sorted(values.items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class ToolMetrics(MetricsRegistry):
+    """Метрики вызовов инструментов MCP сервера
+
+    Время вызова делится на фазы: render - выполнение инструмента (с учётом кэша),
+    serialize - JSON и сжатие, write - запись в сокет. Для потоковых ответов
+    генерация, сериализация и сжатие идут вперемешку и считаются как render.
+    Метка tool у serialize/write и размера ответа - метка ответа: имя
+    инструмента, метод JSON-RPC или batch. Имена приходят от клиента, поэтому
+    после max_tools различных меток новые считаются под меткой other.
+    """
+
+    def __init__(self, max_tools: int = 256):
+        super().__init__()
+        self.max_tools = max_tools
+        self._tools: Set[str] = set()
+        self.counter("mcp_tool_calls_total", "Вызовы инструментов")
+        self.counter("mcp_tool_errors_total", "Вызовы инструментов, завершившиеся ошибкой")
+        self.counter("mcp_tool_coalesced_total", "Вызовы, получившие результат одновременного такого же вызова")
+        self.histogram("mcp_tool_latency_seconds", "Время обработки по фазам render, serialize, write",
+                       LATENCY_BUCKETS)
+        self.histogram("mcp_response_bytes", "Размер ответа в байтах (после сжатия)", SIZE_BUCKETS)
+        self.gauge("mcp_requests_in_flight", "HTTP запросы в обработке")
+
+    def sse_connections(self, func: Callable[[], int]):
+        """Датчик активных SSE соединений"""
+        self.gauge("mcp_sse_connections", "Активные SSE соединения", func)
+
+    def _tool(self, tool: str) -> str:
+        if tool in self._tools:
+            return tool
+        with self._lock:
+            if len(self._tools) >= self.max_tools:
+                return "other"
+            self._tools.add(tool)
+        return tool
+
+    def call(self, tool: str, render_seconds: float, error: bool = False):
+        tool = self._tool(tool)
+        self.inc("mcp_tool_calls_total", tool=tool)
+        if error:
+            self.inc("mcp_tool_errors_total", tool=tool)
+        self.observe("mcp_tool_latency_seconds", render_seconds, tool=tool, phase="render")
+
+    def coalesced(self, tool: str):
+        self.inc("mcp_tool_coalesced_total", tool=self._tool(tool))
+
+    def phase(self, tool: str, phase: str, seconds: float):
+        self.observe("mcp_tool_latency_seconds", seconds, tool=self._tool(tool), phase=phase)
+
+    def response(self, tool: str, size: int):
+        self.observe("mcp_response_bytes", size, tool=self._tool(tool))
+
+    @contextmanager
+    def in_flight(self):
+        self.inc("mcp_requests_in_flight")
+        try:
+            yield
+        finally:
+            self.inc("mcp_requests_in_flight", -1)
+
+
+class ProfileStore:
+    """Профили отдельных вызовов инструментов (cProfile) с доступом по id
+
+    Профилирование включается на сервере (enabled) и запрашивается на каждый вызов
+    заголовком X-MCP-Profile или аргументом _profile. Одновременно профилируется
+    один вызов: cProfile в Python 3.12+ не допускает двух активных профилировщиков,
+    поэтому пока идёт профиль, остальные вызовы выполняются без него. Хранятся
+    последние max_profiles профилей.
+    """
+
+    HEADER = "X-MCP-Profile"
+    ARGUMENT = "_profile"
+    SORT_KEYS = ("cumulative", "tottime", "calls", "ncalls", "time", "filename", "name")
+    PATH_PREFIX = "/profiles"
+
+    def __init__(self, enabled: bool = False, max_profiles: int = 32, top: int = 30):
+        self.enabled = enabled
+        self.max_profiles = max_profiles
+        self.top = top
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+
+    @classmethod
+    def requested(cls, arguments: Optional[Dict], header: Optional[str] = None) -> bool:
+        """Запрошен ли профиль; аргумент _profile удаляется из arguments"""
+        flag = arguments.pop(cls.ARGUMENT, None) if isinstance(arguments, dict) else None
+        return any(str(value).lower() in ("1", "true", "yes") for value in (flag, header) if value is not None)
+
+    def _start(self) -> Optional[cProfile.Profile]:
+        if not self.enabled or not self._active.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Уже работает другой профилировщик (например, запуск под cProfile целиком)
+            self._active.release()
+            return None
+        return profiler
+
+    def _finish(self, profiler: cProfile.Profile, label: str, seconds: float) -> Dict[str, Any]:
+        profiler.disable()
+        self._active.release()
+        stats = pstats.Stats(profiler)
+        entry = {
+            "id": uuid.uuid4().hex[:16],
+            "tool": label,
+            "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "durationMs": round(seconds * 1000, 3),
+            "calls": stats.total_calls
+        }
+        with self._lock:
+            self._profiles[entry["id"]] = dict(entry, stats=stats.stats)
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return entry
+
+    def run(self, label: str, func: Callable[[], Any]) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """(результат func, описание профиля или None, если профиль не снят)"""
+        profiler = self._start()
+        if profiler is None:
+            return func(), None
+        started = time.perf_counter()
+        try:
+            result = func()
+        finally:
+            entry = self._finish(profiler, label, time.perf_counter() - started)
+        return result, entry
+
+    async def run_async(self, label: str, factory: Callable[[], Awaitable[Any]]
+                        ) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """То же для корутины; в профиль попадают и другие корутины, работавшие в это время в цикле"""
+        profiler = self._start()
+        if profiler is None:
+            return await factory(), None
+        started = time.perf_counter()
+        try:
+            result = await factory()
+        finally:
+            entry = self._finish(profiler, label, time.perf_counter() - started)
+        return result, entry
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Профили от новых к старым, без самих данных"""
+        with self._lock:
+            return [{key: value for key, value in entry.items() if key != "stats"}
+                    for entry in reversed(self._profiles.values())]
+
+    def _stats(self, profile_id: str, stream=None) -> Optional[pstats.Stats]:
+        with self._lock:
+            entry = self._profiles.get(profile_id)
+        if entry is None:
+            return None
+        return pstats.Stats(_StatsSnapshot(entry["stats"]), stream=stream)
+
+    def report(self, profile_id: str, sort: str = "cumulative", limit: Optional[int] = None) -> Optional[str]:
+        """Текстовый отчёт pstats: limit самых тяжёлых функций по sort"""
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"Неизвестная сортировка: {sort}")
+        buffer = io.StringIO()
+        stats = self._stats(profile_id, buffer)
+        if stats is None:
+            return None
+        stats.sort_stats(sort).print_stats(limit or self.top)
+        return buffer.getvalue()
+
+    def dump(self, profile_id: str) -> Optional[bytes]:
+        """Профиль в формате pstats (то же, что Stats.dump_stats), для snakeviz и pstats.Stats(path)"""
+        with self._lock:
+            entry = self._profiles.get(profile_id)
+        return None if entry is None else marshal.dumps(entry["stats"])
+
+    def http_get(self, path: str) -> Optional[Tuple[int, str, bytes]]:
+        """Ответ на GET /profiles, /profiles/<id>[?sort=&limit=], /profiles/<id>.prof
+
+        (статус, Content-Type, тело) или None, если путь не относится к профилям.
+        """
+        path, _, query = path.partition("?")
+        if not self.enabled or not (path == self.PATH_PREFIX or path.startswith(self.PATH_PREFIX + "/")):
+            return None
+        if path == self.PATH_PREFIX:
+            body = json.dumps({"profiles": self.list()}, ensure_ascii=False).encode("utf-8")
+            return 200, "application/json", body
+        profile_id = path[len(self.PATH_PREFIX) + 1:]
+        if profile_id.endswith(".prof"):
+            data = self.dump(profile_id[:-len(".prof")])
+            return (404, "text/plain; charset=utf-8", "Профиль не найден".encode("utf-8")) if data is None \
+                else (200, "application/octet-stream", data)
+        params = dict(pair.partition("=")[::2] for pair in query.split("&") if pair)
+        try:
+            limit = int(params["limit"]) if params.get("limit") else None
+            report = self.report(profile_id, params.get("sort") or "cumulative", limit)
+        except ValueError as e:
+            return 400, "text/plain; charset=utf-8", str(e).encode("utf-8")
+        if report is None:
+            return 404, "text/plain; charset=utf-8", "Профиль не найден".encode("utf-8")
+        return 200, "text/plain; charset=utf-8", report.encode("utf-8")
+
+
+class _StatsSnapshot:
+    """Сохранённые данные профиля в виде, который принимает pstats.Stats"""
+
+    def __init__(self, stats: Dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def send_chunked(handler, chunks: Iterable[bytes], content_type: str = 'application/json', status: int = 200,
+                 compressor: Optional[ResponseCompressor] = None, label: str = "",
+                 metrics: Optional[ToolMetrics] = None):
+    """Отправить ответ по мере готовности частей
+
+    Transfer-Encoding: chunked используется, только если и запрос, и обработчик
+    (protocol_version) работают по HTTP/1.1; иначе тело идёт до закрытия
+    соединения с Connection: close. handler - экземпляр BaseHTTPRequestHandler.
+    С compressor поток сжимается, если клиент прислал подходящий Accept-Encoding.
+    С metrics время получения частей записывается как render, запись - как write.
+    """
+    encoding = compressor.choose(handler.headers.get('Accept-Encoding')) if compressor else None
+    if compressor is not None:
+        chunks = compressor.stream(chunks, encoding, label)
+    # Обработчик HTTP/1.0 отвечает строкой статуса HTTP/1.0, и chunked в таком ответе недопустим
+    chunked = handler.request_version == 'HTTP/1.1' and handler.protocol_version == 'HTTP/1.1'
+    # chunked ответ размечен, после него соединение можно переиспользовать (см. KeepAliveHandlerMixin)
+    keep_alive = chunked and not handler.close_connection
+    handler.send_response(status)
+    # send_response мог закрыть соединение по лимиту запросов
+    keep_alive = keep_alive and not handler.close_connection
+    handler.send_header('Content-Type', content_type)
+    handler.send_header('Access-Control-Allow-Origin', '*')
+    if compressor is not None:
+        handler.send_header('Vary', 'Accept-Encoding')
+    if encoding:
+        handler.send_header('Content-Encoding', encoding)
+    if chunked:
+        handler.send_header('Transfer-Encoding', 'chunked')
+    if not keep_alive:
+        handler.send_header('Connection', 'close')
+    handler.end_headers()
+    # Если поток оборвётся на середине, соединение нельзя переиспользовать
+    handler.close_connection = True
+    # После заголовков ошибку уже нельзя сообщить статусом: поток просто обрывается
+    handler.response_started = True
+
+    if metrics is not None:
+        chunks = timed_chunks(chunks, metrics, label)
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if chunked:
+            handler.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        else:
+            handler.wfile.write(chunk)
+    if chunked:
+        handler.wfile.write(b'0\r\n\r\n')
+    handler.wfile.flush()
+    handler.close_connection = not keep_alive
+
+
+def timed_chunks(chunks: Iterable[bytes], metrics: ToolMetrics, label: str) -> Iterator[bytes]:
+    """Части потока с замером: ожидание части - render, запись до запроса следующей - write
+
+    Оборванный поток (ошибка генерации или записи) считается вызовом с ошибкой.
+    """
+    render = write = 0.0
+    size = 0
+    failed = True
+    iterator = iter(chunks)
+    try:
+        while True:
+            started = time.perf_counter()
+            chunk = next(iterator, None)
+            render += time.perf_counter() - started
+            if chunk is None:
+                break
+            size += len(chunk)
+            started = time.perf_counter()
+            yield chunk
+            write += time.perf_counter() - started
+        failed = False
+    finally:
+        metrics.call(label, render, error=failed)
+        metrics.phase(label, "write", write)
+        metrics.response(label, size)
+
+
+# Состояние процесса пула рендеринга: генератор и копии датасетов по имени
+_render_worker: Dict[str, Any] = {"renderer": None, "datasets": {}}
+
+
+def _init_render_worker(path: str, class_name: str, kwargs: Dict[str, Any]):
+    """Инициализатор процесса пула: загрузить модуль сервера и создать генератор"""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("_mcp_render_worker", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    _render_worker["renderer"] = getattr(module, class_name)(**kwargs)
+
+
+def _render_worker_pid() -> int:
+    return os.getpid()
+
+
+def _render_in_worker(method: str, dataset: Optional[Tuple[str, int]], payload: Optional[bytes],
+                      args: Tuple) -> Optional[str]:
+    """Рендер в процессе пула
+
+    dataset - (имя, версия) копии, которая живёт в процессе; payload - данные
+    в pickle, если копии нет или она устарела. Возвращает None, когда нужной
+    копии нет и данные не переданы.
+    """
+    if dataset is None:
+        data = pickle.loads(payload)
+    else:
+        name, version = dataset
+        cached = _render_worker["datasets"].get(name)
+        if cached is None or cached[0] != version:
+            if payload is None:
+                return None
+            cached = _render_worker["datasets"][name] = (version, pickle.loads(payload))
+        data = cached[1]
+    return getattr(_render_worker["renderer"], method)(data, *args)
+
+
+class RenderPool:
+    """Пул процессов для тяжёлых рендеров HTML
+
+    Генерация HTML - чистый Python под GIL: таблица на 50k строк в потоке
+    сервера останавливает все остальные запросы. Рендеры от threshold записей
+    уходят в процессы пула; остальные выполняются на месте.
+
+    Процессы загружают модуль сервера из path и создают class_name(**kwargs).
+    Именованный датасет передаётся по ссылке (имя и версия данных): процесс
+    держит свою копию и получает данные (pickle, сериализуются один раз на
+    версию) только при первом обращении к версии.
+    """
+
+    def __init__(self, path: str, class_name: str, kwargs: Optional[Dict[str, Any]] = None,
+                 workers: int = 2, threshold: int = 5000):
+        self.workers = workers
+        self.threshold = threshold
+        self._initargs = (path, class_name, kwargs or {})
+        self._payloads: Dict[str, Tuple[int, bytes]] = {}
+        self.stats = {"offloaded": 0, "datasetsSent": 0, "restarts": 0}
+        self._executor = self._start()
+
+    def _start(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_render_worker, initargs=self._initargs)
+
+    def warm(self, timeout: Optional[float] = None) -> Set[int]:
+        """Запустить все процессы заранее; возвращает их PID"""
+        futures = [self._executor.submit(_render_worker_pid) for _ in range(self.workers)]
+        return {future.result(timeout) for future in futures}
+
+    def should_offload(self, size: int) -> bool:
+        return size >= self.threshold
+
+    def _payload(self, dataset: str, version: int, data: Any) -> bytes:
+        cached = self._payloads.get(dataset)
+        if cached is None or cached[0] != version:
+            cached = self._payloads[dataset] = (version, pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+        return cached[1]
+
+    async def render(self, method: str, data: Any, args: Tuple = (),
+                     dataset: Optional[Tuple[str, int]] = None) -> str:
+        """HTML из method(data, *args) в процессе пула
+
+        dataset - (имя, версия данных), если data - весь именованный датасет.
+        При падении процесса пул пересоздаётся, а исключение BrokenProcessPool
+        уходит вызывающему.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            if dataset is None:
+                payload = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+                html = await loop.run_in_executor(executor, _render_in_worker, method, None, payload, args)
+            else:
+                html = await loop.run_in_executor(executor, _render_in_worker, method, dataset, None, args)
+                if html is None:
+                    self.stats["datasetsSent"] += 1
+                    payload = self._payload(dataset[0], dataset[1], data)
+                    html = await loop.run_in_executor(executor, _render_in_worker, method, dataset, payload, args)
+        except BrokenProcessPool:
+            if self._executor is executor:
+                self.stats["restarts"] += 1
+                self._executor = self._start()
+            raise
+        self.stats["offloaded"] += 1
+        return html
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.stats, workers=self.workers, threshold=self.threshold)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+prefork_logger = logging.getLogger("mcp-prefork")
+
+
+def prefork_supported() -> bool:
+    """Есть ли fork и SO_REUSEPORT (Linux, BSD, macOS)"""
+    return hasattr(os, "fork") and hasattr(socket, "SO_REUSEPORT")
+
+
+def enable_reuse_port(sock: socket.socket):
+    """SO_REUSEPORT до bind: несколько процессов слушают один порт, ядро делит между ними соединения"""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+
+def worker_log_file(log_file: Optional[str], slot: int) -> Optional[str]:
+    """Отдельный файл лога процесса: RotatingFileHandler нельзя делить между процессами"""
+    if not log_file:
+        return log_file
+    base, ext = os.path.splitext(log_file)
+    return f"{base}.w{slot}{ext}"
+
+
+class PreforkSupervisor:
+    """Мастер процесс prefork: workers дочерних процессов, перезапуск упавших
+
+    Каждый процесс вызывает target(slot) и сам открывает сокет с SO_REUSEPORT,
+    так что ядро распределяет соединения по процессам и серверы используют все
+    ядра. Всё, что создано до run(), процессы получают через fork одинаковым.
+    Завершившийся процесс перезапускается в том же слоте; если он прожил меньше
+    MIN_UPTIME секунд, пауза перед перезапуском удваивается (до MAX_RESTART_DELAY),
+    а после MAX_FAST_FAILURES таких падений подряд мастер останавливает все
+    процессы. SIGTERM и SIGINT передаются процессам, после их выхода run()
+    возвращается с кодом 1, если процессы падали, и 0 иначе.
+    """
+
+    MIN_UPTIME = 1.0
+    MAX_RESTART_DELAY = 30.0
+    MAX_FAST_FAILURES = 5
+    # Как часто мастер проверяет процессы, пока ждёт отложенного перезапуска
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, workers: int, target: Callable[[int], Any], restart_delay: float = 0.5):
+        self.workers = workers
+        self.target = target
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self.failures = 0
+        self.gave_up = False
+        self._children: Dict[int, Tuple[int, float]] = {}
+        self._delays: Dict[int, float] = {}
+        self._fast_failures: Dict[int, int] = {}
+        # Отложенные перезапуски: слот -> время (monotonic), когда его запустить
+        self._pending: Dict[int, float] = {}
+        self._stopping = False
+
+    @property
+    def pids(self) -> List[int]:
+        return list(self._children)
+
+    def run(self) -> int:
+        """Запустить процессы и следить за ними до остановки; код выхода мастера"""
+        previous = {signum: signal.signal(signum, self._on_signal) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            for slot in range(1, self.workers + 1):
+                self._spawn(slot)
+            while self._children or self._pending:
+                self._spawn_due()
+                reaped = self._reap()
+                if reaped is not None:
+                    self._on_exit(*reaped)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        return 1 if self.failures or self.gave_up else 0
+
+    def _reap(self) -> Optional[Tuple[int, int]]:
+        """(pid, статус) завершившегося процесса; пока есть отложенные перезапуски,
+        мастер не блокируется в wait, чтобы запустить их вовремя"""
+        if not self._pending:
+            try:
+                return os.wait()
+            except ChildProcessError:
+                return None
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid:
+            return pid, status
+        time.sleep(min(self.POLL_INTERVAL, max(0.0, min(self._pending.values()) - time.monotonic())))
+        return None
+
+    def _on_exit(self, pid: int, status: int):
+        slot, started = self._children.pop(pid, (None, 0.0))
+        code = os.waitstatus_to_exitcode(status)
+        if slot is None or self._stopping:
+            return
+        uptime = time.monotonic() - started
+        if code != 0:
+            self.failures += 1
+        if uptime >= self.MIN_UPTIME:
+            self._delays.pop(slot, None)
+            self._fast_failures.pop(slot, None)
+            delay = 0.0
+        else:
+            failures = self._fast_failures[slot] = self._fast_failures.get(slot, 0) + 1
+            if failures >= self.MAX_FAST_FAILURES:
+                prefork_logger.error(f"Процесс {slot} (pid {pid}) завершился с кодом {code} через {uptime:.1f} с "
+                                     f"{failures} раз подряд, мастер останавливает процессы")
+                self.gave_up = True
+                self.stop()
+                return
+            delay = self._delays[slot] = min(self._delays.get(slot, self.restart_delay / 2) * 2,
+                                             self.MAX_RESTART_DELAY)
+        prefork_logger.warning(f"Процесс {slot} (pid {pid}) завершился с кодом {code} через {uptime:.1f} с, "
+                               f"перезапуск через {delay:.1f} с")
+        self._pending[slot] = time.monotonic() + delay
+
+    def _spawn_due(self):
+        now = time.monotonic()
+        for slot, due in list(self._pending.items()):
+            if due <= now:
+                del self._pending[slot]
+                self.restarts += 1
+                self._spawn(slot)
+
+    def stop(self, signum: int = signal.SIGTERM):
+        """Остановить процессы; мастер выходит из run(), когда все они завершатся"""
+        self._stopping = True
+        self._pending.clear()
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _on_signal(self, signum, frame):
+        self.stop(signal.SIGTERM)
+
+    def _spawn(self, slot: int):
+        # Иначе буферы stdout и stderr мастера допишет ещё и каждый процесс
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Объекты мастера уходят в постоянное поколение: сборщик мусора в процессе
+        # не пишет в их заголовки, и страницы остаются общими после fork
+        gc.collect()
+        gc.freeze()
+        pid = os.fork()
+        if pid:
+            # Мастер свои объекты собирает как обычно; перед следующим fork они замораживаются снова
+            gc.unfreeze()
+            self._children[pid] = (slot, time.monotonic())
+            prefork_logger.info(f"Процесс {slot} запущен (pid {pid})")
+            return
+        # В процессе поколение остаётся замороженным до выхода намеренно: унаследованные
+        # объекты (датасеты, каталог, модули) живут столько же, сколько процесс, а
+        # после gc.unfreeze() каждая полная сборка снова писала бы в их заголовки,
+        # копируя общие страницы
+        # Дочерний процесс: SIGTERM завершает serve_forever как Ctrl+C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        code = 0
+        try:
+            self.target(slot)
+        except KeyboardInterrupt:
+            pass
+        except BaseException:
+            prefork_logger.exception(f"Процесс {slot} упал")
+            code = 1
+        finally:
+            # Мимо atexit и finally мастера, унаследованных через fork
+            os._exit(code)
+
+
+class KeepAliveHandlerMixin:
+    """Постоянные HTTP/1.1 соединения для обработчиков на BaseHTTPRequestHandler
+
+    Ставится перед базовым классом обработчика. Все ответы должны иметь
+    Content-Length или chunked кодирование. Соединение закрывается после
+    max_keepalive_requests запросов, после keepalive_timeout секунд простоя и
+    после ответа с ошибкой (тело такого запроса могло остаться непрочитанным).
+    Если у сервера есть атрибут connections_waiting и соединения ждут свободного
+    потока, соединение тоже закрывается, чтобы не держать поток на простое.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело уходят отдельными записями; без TCP_NODELAY на живом
+    # соединении второй сегмент ждёт ACK клиента (Nagle + delayed ACK, ~40 мс)
+    disable_nagle_algorithm = True
+    keepalive_timeout: float = 5.0
+    max_keepalive_requests: int = 100
+    requests_served = 0
+
+    def setup(self):
+        # StreamRequestHandler ставит таймаут сокета из self.timeout
+        self.timeout = self.keepalive_timeout
+        super().setup()
+
+    def handle_one_request(self):
+        self.requests_served += 1
+        # Флаг потокового ответа относится к одному запросу, а обработчик живёт всё соединение
+        self.response_started = False
+        super().handle_one_request()
+
+    def send_response(self, code: int, message: Optional[str] = None):
+        super().send_response(code, message)
+        if self.requests_served >= self.max_keepalive_requests or getattr(self.server, 'connections_waiting', 0):
+            self.send_header('Connection', 'close')
+        elif self.request_version == 'HTTP/1.1' and not self.close_connection:
+            self.send_header('Keep-Alive', f'timeout={int(self.keepalive_timeout)}, '
+                                           f'max={self.max_keepalive_requests - self.requests_served}')
+
+    def send_error(self, code: int, message: Optional[str] = None, explain: Optional[str] = None):
+        self.close_connection = True
+        super().send_error(code, message, explain)
+
+
+class TableQuery:
+    """Параметры постраничного запроса к таблице: page, pageSize, sortBy, sortOrder, filter"""
+
+    MAX_PAGE_SIZE = 500
+
+    def __init__(self, page: Optional[int] = None, page_size: Optional[int] = None,
+                 sort_by: Optional[str] = None, descending: bool = False,
+                 filters: Optional[Dict[str, str]] = None):
+        self.page = page
+        self.page_size = page_size
+        self.sort_by = sort_by
+        self.descending = descending
+        self.filters = filters or {}
+
+    @property
+    def paged(self) -> bool:
+        return self.page is not None or self.page_size is not None
+
+    @classmethod
+    def from_arguments(cls, arguments: Optional[Dict], columns: Iterable[str],
+                       default_page_size: int = 50) -> "TableQuery":
+        """Разбор и проверка аргументов инструмента
+
+        Аргументы могут прийти строками из query string, поэтому числа приводятся
+        явно. filter - объект {"поле": "значение"} или строка "поле=значение,поле2=значение".
+        """
+        arguments = arguments or {}
+        columns = set(columns)
+
+        page = arguments.get("page")
+        page_size = arguments.get("pageSize")
+        if page is not None or page_size is not None:
+            page = cls._positive_int("page", page if page is not None else 1)
+            page_size = min(cls._positive_int("pageSize", page_size or default_page_size), cls.MAX_PAGE_SIZE)
+
+        sort_by = arguments.get("sortBy") or None
+        if sort_by is not None and sort_by not in columns:
+            raise ValueError(f"Нельзя сортировать по полю {sort_by}, доступны: {', '.join(sorted(columns))}")
+        sort_order = str(arguments.get("sortOrder", "asc")).lower()
+        if sort_order not in ("asc", "desc"):
+            raise ValueError(f"sortOrder должен быть asc или desc, получено: {sort_order}")
+
+        raw_filter = arguments.get("filter") or {}
+        if isinstance(raw_filter, str):
+            raw_filter = dict(part.split("=", 1) for part in raw_filter.split(",") if "=" in part)
+        if not isinstance(raw_filter, dict):
+            raise ValueError("filter должен быть объектом {поле: значение}")
+        unknown = set(raw_filter) - columns
+        if unknown:
+            raise ValueError(f"Нельзя фильтровать по полям: {', '.join(sorted(unknown))}")
+        filters = {field.strip(): normalize_filter_value(value) for field, value in raw_filter.items()}
+
+        return cls(page, page_size, sort_by, sort_order == "desc", filters)
+
+    @staticmethod
+    def _positive_int(name: str, value: Any) -> int:
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} должен быть целым числом, получено: {value}")
+        if number < 1:
+            raise ValueError(f"{name} должен быть не меньше 1")
+        return number
+
+
+def normalize_filter_value(value: Any) -> str:
+    """Значение поля в виде, в котором его сравнивает фильтр (true/false для bool)"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    text = str(value).strip()
+    return text.lower() if text.lower() in ("true", "false") else text
+
+
+class PagedTable:
+    """Список записей с предвычисленными индексами сортировки и фильтрации
+
+    Индекс сортировки колонки - позиции записей в отсортированном порядке, поэтому
+    страница без фильтра берётся срезом за O(pageSize). Индекс фильтра - позиции
+    записей для каждого значения колонки; с фильтром стоимость O(k), где k -
+    число подходящих записей. Индексы строятся лениво и живут до смены версии данных.
+    Отфильтрованные выборки запоминаются, так что листание страниц стоит O(pageSize).
+
+    argsort(column) - необязательный источник порядка сортировки (например,
+    ColumnarTable.argsort по колоночному снимку тех же записей): позиции записей
+    по возрастанию со стабильным порядком равных или None, если колонку он не
+    сортирует - тогда записи сортируются здесь.
+    """
+
+    MAX_SELECTIONS = 64
+
+    def __init__(self, records: List[Dict], version: int = 0,
+                 argsort: Optional[Callable[[str], Optional[Iterable[int]]]] = None):
+        self.records = records
+        self.version = version
+        self._argsort = argsort
+        self._sort_indexes: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._value_indexes: Dict[str, Dict[str, List[int]]] = {}
+        self._selections: "OrderedDict[Tuple, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sort_index(self, column: str) -> Tuple[List[int], List[int]]:
+        """(позиции в порядке сортировки, ранг каждой позиции)"""
+        index = self._sort_indexes.get(column)
+        if index is None:
+            order = self._argsort(column) if self._argsort is not None else None
+            if order is None:
+                values = self._column_values(column)
+                order = sorted(range(len(values)), key=lambda i: self._sort_key(values[i]))
+            else:
+                order = order.tolist() if hasattr(order, "tolist") else list(order)
+            ranks = [0] * len(order)
+            for rank, position in enumerate(order):
+                ranks[position] = rank
+            index = (order, ranks)
+            with self._lock:
+                self._sort_indexes[column] = index
+        return index
+
+    def _column_values(self, column: str) -> List:
+        """Значения колонки; записи общего сегмента отдают колонку без создания словарей"""
+        read_column = getattr(self.records, "column", None)
+        if read_column is not None:
+            return read_column(column)
+        return [record.get(column) for record in self.records]
+
+    def value_index(self, column: str) -> Dict[str, List[int]]:
+        index = self._value_indexes.get(column)
+        if index is None:
+            index = {}
+            for position, value in enumerate(self._column_values(column)):
+                index.setdefault(normalize_filter_value(value), []).append(position)
+            with self._lock:
+                self._value_indexes[column] = index
+        return index
+
+    def query(self, query: TableQuery) -> Tuple[List[Dict], int]:
+        """Записи страницы и общее число записей, подходящих под фильтр"""
+        positions = self._selection(query) if query.filters else None
+        total = len(self.records) if positions is None else len(positions)
+
+        if query.paged:
+            start = (query.page - 1) * query.page_size
+            stop = min(start + query.page_size, total)
+        else:
+            start, stop = 0, total
+        if start >= stop:
+            return [], total
+
+        if positions is None:
+            if query.sort_by:
+                order = self.sort_index(query.sort_by)[0]
+                if query.descending:
+                    page_positions = order[total - stop:total - start][::-1]
+                else:
+                    page_positions = order[start:stop]
+            else:
+                page_positions = range(start, stop)
+        else:
+            page_positions = positions[start:stop]
+
+        return [self.records[position] for position in page_positions], total
+
+    def _selection(self, query: TableQuery) -> List[int]:
+        """Позиции записей под фильтром в порядке сортировки"""
+        key = (tuple(sorted(query.filters.items())), query.sort_by, query.descending)
+        with self._lock:
+            positions = self._selections.get(key)
+            if positions is not None:
+                self._selections.move_to_end(key)
+                return positions
+
+        positions = self._filtered_positions(query.filters)
+        if query.sort_by:
+            ranks = self.sort_index(query.sort_by)[1]
+            positions = sorted(positions, key=ranks.__getitem__, reverse=query.descending)
+
+        with self._lock:
+            self._selections[key] = positions
+            if len(self._selections) > self.MAX_SELECTIONS:
+                self._selections.popitem(last=False)
+        return positions
+
+    def _filtered_positions(self, filters: Dict[str, str]) -> List[int]:
+        postings = sorted(
+            (self.value_index(column).get(value, []) for column, value in filters.items()),
+            key=len
+        )
+        positions = postings[0]
+        for other in postings[1:]:
+            allowed = set(other)
+            positions = [position for position in positions if position in allowed]
+        return positions
+
+    @staticmethod
+    def _sort_key(value: Any) -> Tuple:
+        # None в конец, разные типы не сравниваются между собой напрямую
+        if value is None:
+            return (2, "")
+        if isinstance(value, (int, float)):
+            return (0, value)
+        return (1, str(value))
+
+
+class RecordStore:
+    """Записи датасета с хэш индексом по ключу и вторичными индексами по полям
+
+    Индексы обновляются при каждом add/update/delete, поэтому поиск по ID стоит O(1),
+    выборка по значению поля - O(k), а число записей с этим значением - O(1).
+    Порядок записей в records сохраняется; удаление стоит O(n).
+
+    Изменения и чтение индексов и агрегатов идут под внутренней блокировкой,
+    поэтому читать можно из других потоков во время изменений. Удаление не
+    сдвигает список records, а заменяет его новым: список, уже взятый читателем
+    (например, PagedTable с индексами позиций), не меняется под ним, а
+    добавление только дописывает запись в конец.
+
+    summed_fields задаёт материализованные агрегаты: для поля группировки хранятся
+    число записей и суммы перечисленных полей по каждому значению. Они тоже
+    обновляются за O(1) на изменение, так что totals() не проходит по записям.
+    """
+
+    def __init__(self, records: Iterable[Dict] = (), indexed_fields: Iterable[str] = (), key: str = "id",
+                 summed_fields: Optional[Dict[str, Iterable[str]]] = None):
+        self.key = key
+        self.indexed_fields = tuple(indexed_fields)
+        self.summed_fields = {group: tuple(fields) for group, fields in (summed_fields or {}).items()}
+        self.records: List[Dict] = []
+        self._by_key: Dict[Any, Dict] = {}
+        # поле -> значение -> {ключ записи: запись}; dict сохраняет порядок вставки
+        self._indexes: Dict[str, Dict[Any, Dict[Any, Dict]]] = {field: {} for field in self.indexed_fields}
+        # поле группировки -> значение -> {"count": n, поле: сумма}
+        self._totals: Dict[str, Dict[Any, Dict[str, Any]]] = {group: {} for group in self.summed_fields}
+        self._lock = threading.Lock()
+        for record in records:
+            self.add(record)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.records)
+
+    def get(self, record_id: Any) -> Optional[Dict]:
+        return self._by_key.get(record_id)
+
+    def find(self, field: str, value: Any) -> List[Dict]:
+        """Записи с заданным значением индексированного поля"""
+        index = self._index(field)
+        with self._lock:
+            return list(index.get(value, {}).values())
+
+    def count(self, field: str, value: Any) -> int:
+        return len(self._index(field).get(value, ()))
+
+    def counts(self, field: str) -> Dict[Any, int]:
+        """Число записей для каждого значения индексированного поля"""
+        index = self._index(field)
+        with self._lock:
+            return {value: len(bucket) for value, bucket in index.items()}
+
+    def totals(self, group: str) -> Dict[Any, Dict[str, Any]]:
+        """Число записей и суммы полей для каждого значения поля группировки"""
+        if group not in self._totals:
+            raise KeyError(f"Для поля {group} агрегаты не ведутся")
+        with self._lock:
+            return {value: dict(bucket) for value, bucket in self._totals[group].items()}
+
+    def add(self, record: Dict) -> Dict:
+        record_id = record[self.key]
+        with self._lock:
+            if record_id in self._by_key:
+                raise ValueError(f"Запись {record_id} уже существует")
+            self.records.append(record)
+            self._by_key[record_id] = record
+            for field in self.indexed_fields:
+                self._indexes[field].setdefault(record.get(field), {})[record_id] = record
+            self._aggregate(record, 1)
+        return record
+
+    def update(self, record_id: Any, changes: Dict) -> Optional[Dict]:
+        with self._lock:
+            record = self._by_key.get(record_id)
+            if record is None:
+                return None
+            if self.key in changes and changes[self.key] != record_id:
+                raise ValueError(f"Нельзя изменить поле {self.key}")
+            for field in self.indexed_fields:
+                if field in changes and changes[field] != record.get(field):
+                    self._unindex(field, record.get(field), record_id)
+                    self._indexes[field].setdefault(changes[field], {})[record_id] = record
+            reaggregate = any(
+                group in changes or any(field in changes for field in fields)
+                for group, fields in self.summed_fields.items()
+            )
+            if reaggregate:
+                self._aggregate(record, -1)
+            record.update(changes)
+            if reaggregate:
+                self._aggregate(record, 1)
+        return record
+
+    def delete(self, record_id: Any) -> bool:
+        with self._lock:
+            record = self._by_key.pop(record_id, None)
+            if record is None:
+                return False
+            for field in self.indexed_fields:
+                self._unindex(field, record.get(field), record_id)
+            self._aggregate(record, -1)
+            # Новый список вместо сдвига: позиции в уже взятом читателем списке остаются верными
+            self.records = [r for r in self.records if r is not record]
+        return True
+
+    def _index(self, field: str) -> Dict[Any, Dict[Any, Dict]]:
+        if field not in self._indexes:
+            raise KeyError(f"Поле {field} не индексировано")
+        return self._indexes[field]
+
+    def _aggregate(self, record: Dict, sign: int):
+        for group, fields in self.summed_fields.items():
+            groups = self._totals[group]
+            value = record.get(group)
+            bucket = groups.get(value)
+            if bucket is None:
+                bucket = groups[value] = dict.fromkeys(("count",) + fields, 0)
+            bucket["count"] += sign
+            for field in fields:
+                bucket[field] += sign * (record.get(field) or 0)
+            if bucket["count"] == 0:
+                del groups[value]
+
+    def _unindex(self, field: str, value: Any, record_id: Any):
+        bucket = self._indexes[field].get(value)
+        if bucket is not None:
+            bucket.pop(record_id, None)
+            if not bucket:
+                del self._indexes[field][value]
+
+
+class SharedRecordStore:
+    """Интерфейс чтения RecordStore над записями общего сегмента (mcp_columnar.SharedRecords)
+
+    Индексы хранят позиции, а не записи: словарь записи создаётся из сегмента
+    при обращении, поэтому в процессе живут только индексы. Изменения идут
+    через SharedDatasets.update, после чего хранилище строится заново.
+    """
+
+    def __init__(self, records, indexed_fields: Iterable[str] = (), key: str = "id",
+                 summed_fields: Optional[Dict[str, Iterable[str]]] = None):
+        self.key = key
+        self.records = records
+        self.indexed_fields = tuple(indexed_fields)
+        self._by_key = {value: position for position, value in enumerate(records.column(key))}
+        self._indexes: Dict[str, Dict[Any, List[int]]] = {}
+        for field in self.indexed_fields:
+            index: Dict[Any, List[int]] = {}
+            for position, value in enumerate(records.column(field)):
+                index.setdefault(value, []).append(position)
+            self._indexes[field] = index
+        self._totals: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        for group, fields in (summed_fields or {}).items():
+            groups: Dict[Any, Dict[str, Any]] = {}
+            columns = [records.column(field) for field in fields]
+            for position, value in enumerate(records.column(group)):
+                bucket = groups.get(value)
+                if bucket is None:
+                    bucket = groups[value] = dict.fromkeys(("count",) + tuple(fields), 0)
+                bucket["count"] += 1
+                for field, column in zip(fields, columns):
+                    bucket[field] += column[position] or 0
+            self._totals[group] = groups
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.records)
+
+    def get(self, record_id: Any) -> Optional[Dict]:
+        position = self._by_key.get(record_id)
+        return None if position is None else self.records[position]
+
+    def find(self, field: str, value: Any) -> List[Dict]:
+        return [self.records[position] for position in self._index(field).get(value, ())]
+
+    def count(self, field: str, value: Any) -> int:
+        return len(self._index(field).get(value, ()))
+
+    def counts(self, field: str) -> Dict[Any, int]:
+        return {value: len(positions) for value, positions in self._index(field).items()}
+
+    def totals(self, group: str) -> Dict[Any, Dict[str, Any]]:
+        if group not in self._totals:
+            raise KeyError(f"Для поля {group} агрегаты не ведутся")
+        return {value: dict(bucket) for value, bucket in self._totals[group].items()}
+
+    def _index(self, field: str) -> Dict[Any, List[int]]:
+        if field not in self._indexes:
+            raise KeyError(f"Поле {field} не индексировано")
+        return self._indexes[field]
+
+
+def table_query_schema(columns: Iterable[str]) -> Dict[str, Any]:
+    """Свойства inputSchema для аргументов page, pageSize, sortBy, sortOrder и filter"""
+    columns = list(columns)
+    return {
+        "page": {
+            "type": "integer",
+            "minimum": 1,
+            "description": "Номер страницы, начиная с 1 (без page и pageSize выводятся все записи)"
+        },
+        "pageSize": {
+            "type": "integer",
+            "minimum": 1,
+            "maximum": TableQuery.MAX_PAGE_SIZE,
+            "description": "Количество записей на странице"
+        },
+        "sortBy": {
+            "type": "string",
+            "enum": columns,
+            "description": "Поле для сортировки"
+        },
+        "sortOrder": {
+            "type": "string",
+            "enum": ["asc", "desc"],
+            "description": "Направление сортировки"
+        },
+        "filter": {
+            "type": ["object", "string"],
+            "additionalProperties": {"type": "string"},
+            "description": "Фильтр по точному совпадению полей: {\"department\": \"QA\"} или строка department=QA,active=true"
+        }
+    }
+
+
+def page_description(description: str, query: TableQuery, shown: int, total: int) -> str:
+    """Описание таблицы с информацией о странице и фильтре"""
+    if query.paged:
+        pages = max(1, -(-total // query.page_size))
+        if not shown:
+            return f"{description}. Страница {query.page} пуста, всего записей: {total}"
+        first = (query.page - 1) * query.page_size + 1
+        return f"{description}. Записи {first}–{first + shown - 1} из {total}, страница {query.page} из {pages}"
+    if query.filters:
+        return f"{description}. Найдено записей: {total}"
+    return description
+
+
+JSONRPC_PARSE_ERROR = -32700
+JSONRPC_INVALID_REQUEST = -32600
+JSONRPC_METHOD_NOT_FOUND = -32601
+JSONRPC_INVALID_PARAMS = -32602
+JSONRPC_INTERNAL_ERROR = -32603
+
+MAX_BATCH_SIZE = 64
+
+
+class JsonRpcError(Exception):
+    """Ошибка JSON-RPC 2.0 с кодом из спецификации"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+    def to_dict(self) -> Dict[str, Any]:
+        error = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            error["data"] = self.data
+        return error
+
+
+def jsonrpc_response(request_id: Any, result: Any = None, error: Optional[JsonRpcError] = None) -> Dict[str, Any]:
+    response = {"jsonrpc": "2.0", "id": request_id}
+    if error is not None:
+        response["error"] = error.to_dict()
+    else:
+        response["result"] = result
+    return response
+
+
+def is_jsonrpc(payload: Any) -> bool:
+    """Запрос в формате JSON-RPC 2.0 (одиночный или пакет), а не старый {method, params}"""
+    return isinstance(payload, list) or (isinstance(payload, dict) and payload.get("jsonrpc") == "2.0")
+
+
+def rpc_label(payload: Any) -> str:
+    """Метка запроса JSON-RPC для статистики: имя инструмента, метод или batch"""
+    if isinstance(payload, list):
+        return "batch"
+    if isinstance(payload, dict):
+        params = payload.get("params")
+        if payload.get("method") == "tools/call" and isinstance(params, dict):
+            return str(params.get("name", "tools/call"))
+        return str(payload.get("method", "other"))
+    return "other"
+
+
+def parse_jsonrpc(body: bytes) -> Any:
+    try:
+        return json.loads(body.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise JsonRpcError(JSONRPC_PARSE_ERROR, "Parse error", str(e))
+
+
+def _validate_jsonrpc(item: Any) -> Tuple[str, Any]:
+    if not isinstance(item, dict) or item.get("jsonrpc") != "2.0" or not isinstance(item.get("method"), str):
+        raise JsonRpcError(JSONRPC_INVALID_REQUEST, "Invalid Request")
+    params = item.get("params", {})
+    if not isinstance(params, (dict, list)):
+        raise JsonRpcError(JSONRPC_INVALID_PARAMS, "Invalid params", "params должен быть объектом или массивом")
+    return item["method"], params
+
+
+def _jsonrpc_id(item: Any) -> Any:
+    return item.get("id") if isinstance(item, dict) else None
+
+
+def _is_notification(item: Any) -> bool:
+    return isinstance(item, dict) and "id" not in item
+
+
+def _jsonrpc_failure(item: Any, error: Exception) -> Optional[Dict[str, Any]]:
+    if not isinstance(error, JsonRpcError):
+        error = JsonRpcError(JSONRPC_INTERNAL_ERROR, "Internal error", str(error))
+    # На уведомления не отвечают даже ошибкой, кроме некорректных запросов
+    if _is_notification(item) and error.code != JSONRPC_INVALID_REQUEST:
+        return None
+    return jsonrpc_response(_jsonrpc_id(item), error=error)
+
+
+def _check_batch(payload: Any) -> Optional[Dict[str, Any]]:
+    if not payload:
+        return jsonrpc_response(None, error=JsonRpcError(JSONRPC_INVALID_REQUEST, "Invalid Request", "пустой пакет"))
+    if len(payload) > MAX_BATCH_SIZE:
+        return jsonrpc_response(None, error=JsonRpcError(
+            JSONRPC_INVALID_REQUEST, "Invalid Request", f"в пакете больше {MAX_BATCH_SIZE} запросов"
+        ))
+    return None
+
+
+def dispatch_jsonrpc(payload: Any, call: Callable[[str, Any], Any], executor=None) -> Any:
+    """Выполнить одиночный запрос или пакет JSON-RPC 2.0
+
+    call(method, params) возвращает результат или бросает JsonRpcError. Запросы
+    пакета независимы и выполняются параллельно в executor, если он передан;
+    порядок ответов совпадает с порядком запросов. Возвращает None, если ответ
+    не нужен (только уведомления).
+    """
+    def handle(item: Any) -> Optional[Dict[str, Any]]:
+        try:
+            result = call(*_validate_jsonrpc(item))
+        except Exception as e:
+            return _jsonrpc_failure(item, e)
+        return None if _is_notification(item) else jsonrpc_response(item["id"], result)
+
+    if not isinstance(payload, list):
+        return handle(payload)
+    invalid = _check_batch(payload)
+    if invalid is not None:
+        return invalid
+    if executor is None or len(payload) == 1:
+        responses = [handle(item) for item in payload]
+    else:
+        responses = list(executor.map(handle, payload))
+    return [response for response in responses if response is not None] or None
+
+
+async def dispatch_jsonrpc_async(payload: Any, call: Callable[[str, Any], Awaitable[Any]]) -> Any:
+    """Асинхронный вариант dispatch_jsonrpc: запросы пакета выполняются через asyncio.gather"""
+    async def handle(item: Any) -> Optional[Dict[str, Any]]:
+        try:
+            result = await call(*_validate_jsonrpc(item))
+        except Exception as e:
+            return _jsonrpc_failure(item, e)
+        return None if _is_notification(item) else jsonrpc_response(item["id"], result)
+
+    if not isinstance(payload, list):
+        return await handle(payload)
+    invalid = _check_batch(payload)
+    if invalid is not None:
+        return invalid
+    responses = await asyncio.gather(*(handle(item) for item in payload))
+    return [response for response in responses if response is not None] or None
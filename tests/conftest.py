@@ -0,0 +1,61 @@
+"""
+Общие фикстуры тестов демо MCP серверов
+Имена файлов серверов содержат дефисы, поэтому модули загружаются по пути
+"""
+
+import importlib.util
+import logging
+import random
+import sys
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _load(filename: str, module_name: str) -> ModuleType:
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, ROOT / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def local_module() -> ModuleType:
+    """local-mcp-server.py"""
+    module = _load('local-mcp-server.py', 'local_mcp_server')
+    logging.getLogger('demo-mcp-server').setLevel(logging.CRITICAL)
+    return module
+
+
+@pytest.fixture(scope="session")
+def demo_module() -> ModuleType:
+    """demo-ui-generator-server.py"""
+    module = _load('demo-ui-generator-server.py', 'demo_ui_generator_server')
+    logging.getLogger('demo-ui-generator-server').setLevel(logging.CRITICAL)
+    return module
+
+
+@pytest.fixture
+def local_server(local_module):
+    # Тестовые данные генерируются через random
+    random.seed(0)
+    return local_module.DemoMCPServer()
+
+
+@pytest.fixture
+def demo_server(demo_module):
+    return demo_module.UIGeneratorDemoServer()
+
+
+def resource_text(result: dict) -> str:
+    """HTML первого ресурса в результате инструмента"""
+    return next(item["resource"]["text"] for item in result["content"] if item.get("type") == "resource")
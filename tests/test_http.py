@@ -0,0 +1,211 @@
+"""HTTP уровень обоих серверов на настоящих сокетах"""
+
+import asyncio
+import io
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+BODY = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                   "params": {"name": "show_user_profile", "arguments": {}}}).encode()
+
+
+def request(port: int, raw: bytes) -> bytes:
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(raw)
+        data = b""
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return data
+            data += chunk
+
+
+def split_response(response: bytes):
+    head, _, body = response.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return lines[0], headers, body
+
+
+def dechunk(body: bytes) -> bytes:
+    data = b""
+    while True:
+        size, _, body = body.partition(b"\r\n")
+        size = int(size, 16)
+        if not size:
+            return data
+        data, body = data + body[:size], body[size + 2:]
+
+
+@pytest.fixture
+def local_http(local_module):
+    local_module.MCPSSEHandler.server_instance = None
+    httpd = local_module.create_http_server("127.0.0.1", 0, heartbeat_interval=60)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+    local_module.MCPSSEHandler.server_instance = None
+
+
+@pytest.fixture
+def demo_threaded(demo_module, demo_server):
+    demo_module.DemoRequestHandler.server_instance = demo_server
+    httpd = demo_module.DemoHTTPServer(("127.0.0.1", 0), demo_module.DemoRequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def demo_async(demo_module, demo_server):
+    http = demo_module.AsyncDemoHTTPServer(demo_server, "127.0.0.1", 0)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(http.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield http.port
+    asyncio.run_coroutine_threadsafe(http.close(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+@pytest.fixture
+def request_fixture(request):
+    return request.getfixturevalue
+
+
+@pytest.mark.parametrize("version, chunked", [(b"HTTP/1.0", False), (b"HTTP/1.1", True)])
+def test_local_stream_uses_chunked_only_on_http11(local_http, version, chunked):
+    response = request(local_http, b"GET /tool/show_users_table?stream=1 " + version +
+                       b"\r\nHost: x\r\nConnection: close\r\n\r\n")
+    status, headers, body = split_response(response)
+    assert status.endswith("200 OK")
+    assert ("transfer-encoding" in headers) is chunked
+    result = json.loads(dechunk(body) if chunked else body)
+    assert "ui-table" in result["content"][0]["resource"]["text"]
+
+
+def test_demo_threaded_stream_is_close_delimited(demo_threaded):
+    body = json.dumps({"method": "tools/call", "params": {"name": "show_users_table", "stream": True}}).encode()
+    response = request(demo_threaded, b"POST / HTTP/1.1\r\nHost: x\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+    status, headers, payload = split_response(response)
+    assert status == "HTTP/1.0 200 OK"
+    assert "transfer-encoding" not in headers and headers["connection"] == "close"
+    assert "ui-table" in json.loads(payload)["content"][0]["resource"]["text"]
+
+
+@pytest.mark.parametrize("server", ["demo_threaded", "demo_async"])
+def test_demo_post_headers_match_between_servers(request_fixture, server):
+    port = request_fixture(server)
+    for accept, encoding in ((b"", None), (b"Accept-Encoding: gzip\r\n", "gzip")):
+        response = request(port, b"POST / HTTP/1.1\r\nHost: x\r\nConnection: close\r\n" + accept +
+                           b"Content-Length: %d\r\n\r\n" % len(BODY) + BODY)
+        status, headers, body = split_response(response)
+        assert status.endswith("200 OK")
+        assert headers["vary"] == "Accept-Encoding"
+        assert headers.get("content-encoding") == encoding
+        assert int(headers["content-length"]) == len(body)
+
+    status, _, body = split_response(request(port, b"POST / HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n"))
+    assert status.split(" ", 1)[1] == "411 Length Required" and "error" in json.loads(body)
+    status, _, _ = split_response(request(port, b"POST / HTTP/1.1\r\nHost: x\r\nContent-Length: x\r\n\r\n"))
+    assert status.split(" ", 1)[1] == "400 Bad Request"
+
+
+@pytest.mark.parametrize("path", [b"/rpc", b"/tool/show_user_profile"])
+def test_local_post_rejects_bad_content_length(local_http, local_module, path):
+    # Запросы без Connection: close: request() дочитывает до закрытия соединения,
+    # поэтому сервер должен закрыть его после ошибки (тело не прочитано)
+    if path == b"/rpc":
+        status, _, body = split_response(request(local_http, b"POST /rpc HTTP/1.1\r\nHost: x\r\n\r\n"))
+        assert status.split(" ", 1)[1] == "411 Length Required" and "error" in json.loads(body)
+    status, _, body = split_response(request(local_http, b"POST " + path + b" HTTP/1.1\r\nHost: x\r\n"
+                                                                         b"Content-Length: x\r\n\r\n"))
+    assert status.split(" ", 1)[1] == "400 Bad Request" and "error" in json.loads(body)
+    too_large = local_module.MCPSSEHandler.MAX_BODY_BYTES + 1
+    status, _, _ = split_response(request(local_http, b"POST " + path + b" HTTP/1.1\r\nHost: x\r\n"
+                                                                      b"Content-Length: %d\r\n\r\n{}" % too_large))
+    assert status.split(" ", 1)[1] == "413 Request Entity Too Large"
+
+
+def test_local_rpc_batch_over_http(local_http):
+    body = json.dumps([
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/list"},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/call", "params": {"name": "show_project_dashboard"}},
+        {"jsonrpc": "2.0", "method": "tools/list"},
+    ]).encode()
+    response = request(local_http, b"POST /rpc HTTP/1.1\r\nHost: x\r\nConnection: close\r\n"
+                                   b"Content-Type: application/json\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+    _, _, payload = split_response(response)
+    payload = json.loads(payload)
+    assert [item["id"] for item in payload] == [1, 2]
+    assert payload[1]["result"]["content"][0]["type"] == "resource"
+
+
+def test_local_sse_resume_over_http(local_http, local_module):
+    def open_sse(last_event_id=None):
+        sock = socket.create_connection(("127.0.0.1", local_http), timeout=5)
+        extra = b"Last-Event-ID: %s\r\n" % last_event_id.encode() if last_event_id else b""
+        sock.sendall(b"GET /sse HTTP/1.1\r\nHost: x\r\n" + extra + b"\r\n")
+        data = b""
+        while b"event: session" not in data or not data.endswith(b"\n\n"):
+            data += sock.recv(65536)
+        return sock, data
+
+    sock, data = open_sse()
+    session_id = json.loads(data.split(b"event: session\ndata: ", 1)[1].split(b"\n", 1)[0])["sessionId"]
+    sock.close()
+
+    hub = local_module.MCPSSEHandler.sse_hub
+    hub.publish(session_id, {"n": 1}, event="tool_result")
+    sock, data = open_sse(f"{session_id}:0")
+    while b"tool_result" not in data:
+        data += sock.recv(65536)
+    sock.close()
+    assert b'"resumed": true' in data and f"id: {session_id}:1".encode() in data
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Обработчик без сокета для проверки send_chunked"""
+
+    def __init__(self, protocol_version: str, request_version: str):
+        self.protocol_version = protocol_version
+        self.request_version = request_version
+        self.headers = {}
+        self.wfile = io.BytesIO()
+        self.close_connection = False
+        self.requestline = "GET / " + request_version
+        self.command = "GET"
+        self.client_address = ("127.0.0.1", 0)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.mark.parametrize("protocol, request_version, chunked", [
+    ("HTTP/1.0", "HTTP/1.1", False),
+    ("HTTP/1.1", "HTTP/1.0", False),
+    ("HTTP/1.1", "HTTP/1.1", True),
+])
+def test_send_chunked_respects_both_versions(protocol, request_version, chunked):
+    from mcp_server_common import send_chunked
+    handler = FakeHandler(protocol, request_version)
+    send_chunked(handler, iter([b'{"a":', b' 1}']))
+    status, headers, body = split_response(handler.wfile.getvalue())
+    assert status.startswith(protocol)
+    assert handler.protocol_version == protocol
+    assert ("transfer-encoding" in headers) is chunked
+    assert (dechunk(body) if chunked else body) == b'{"a": 1}'
+    assert handler.close_connection is not chunked
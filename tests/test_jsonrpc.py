@@ -0,0 +1,131 @@
+"""JSON-RPC 2.0: пакеты, уведомления и форма тела POST"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mcp_server_common import (
+    JSONRPC_INVALID_PARAMS,
+    JSONRPC_INVALID_REQUEST,
+    JSONRPC_METHOD_NOT_FOUND,
+    JSONRPC_PARSE_ERROR,
+    MAX_BATCH_SIZE,
+    JsonRpcError,
+    dispatch_jsonrpc,
+    dispatch_jsonrpc_async
+)
+
+
+def echo(method, params):
+    if method == "fail":
+        raise JsonRpcError(JSONRPC_INVALID_PARAMS, "Invalid params")
+    if method == "crash":
+        raise RuntimeError("boom")
+    return {"method": method, "params": params}
+
+
+BATCH = [
+    {"jsonrpc": "2.0", "id": 1, "method": "a", "params": {"x": 1}},
+    {"jsonrpc": "2.0", "method": "notify"},
+    {"jsonrpc": "2.0", "id": 2, "method": "fail"},
+    {"jsonrpc": "2.0", "id": 3, "method": "crash"},
+    {"id": 4, "method": "no-version"},
+    {"jsonrpc": "2.0", "id": 5, "method": "b", "params": [1, 2]},
+]
+
+
+def check_batch(response):
+    assert [item["id"] for item in response] == [1, 2, 3, 4, 5]
+    assert response[0]["result"] == {"method": "a", "params": {"x": 1}}
+    assert response[1]["error"]["code"] == JSONRPC_INVALID_PARAMS
+    assert response[2]["error"]["code"] == -32603
+    assert response[3]["error"]["code"] == JSONRPC_INVALID_REQUEST
+    assert response[4]["result"]["params"] == [1, 2]
+
+
+def test_batch_keeps_order_and_skips_notifications():
+    with ThreadPoolExecutor(4) as executor:
+        check_batch(dispatch_jsonrpc(BATCH, echo, executor))
+    check_batch(dispatch_jsonrpc(BATCH, echo))
+
+
+def test_async_batch_matches_threaded():
+    async def call(method, params):
+        await asyncio.sleep(0)
+        return echo(method, params)
+    check_batch(asyncio.run(dispatch_jsonrpc_async(BATCH, call)))
+
+
+def test_notifications_only_and_invalid_batches():
+    assert dispatch_jsonrpc([{"jsonrpc": "2.0", "method": "notify"}], echo) is None
+    assert dispatch_jsonrpc({"jsonrpc": "2.0", "method": "notify"}, echo) is None
+    assert dispatch_jsonrpc([], echo)["error"]["code"] == JSONRPC_INVALID_REQUEST
+    oversized = [{"jsonrpc": "2.0", "id": i, "method": "a"} for i in range(MAX_BATCH_SIZE + 1)]
+    assert dispatch_jsonrpc(oversized, echo)["error"]["code"] == JSONRPC_INVALID_REQUEST
+
+
+def test_local_server_batch(local_server):
+    response = dispatch_jsonrpc([
+        {"jsonrpc": "2.0", "id": "list", "method": "tools/list"},
+        {"jsonrpc": "2.0", "id": "call", "method": "tools/call",
+         "params": {"name": "show_users_table", "arguments": {"pageSize": 2}}},
+        {"jsonrpc": "2.0", "id": "args", "method": "tools/call", "params": {"name": "show_users_table",
+                                                                            "arguments": [1]}},
+        {"jsonrpc": "2.0", "id": "unknown", "method": "nope"},
+    ], local_server.rpc_call)
+    by_id = {item["id"]: item for item in response}
+    assert "show_users_table" in {tool["name"] for tool in by_id["list"]["result"]["tools"]}
+    assert by_id["call"]["result"]["content"][0]["resource"]["text"].count("<tr") == 3
+    assert by_id["args"]["error"]["code"] == JSONRPC_INVALID_PARAMS
+    assert by_id["unknown"]["error"]["code"] == JSONRPC_METHOD_NOT_FOUND
+
+
+def post(demo_module, demo_server, body: bytes):
+    return asyncio.run(demo_module.handle_http_post(demo_server, body))
+
+
+@pytest.mark.parametrize("body, code", [
+    (b'{"method": ', JSONRPC_PARSE_ERROR),
+    (b'"x"', JSONRPC_INVALID_REQUEST),
+    (b'5', JSONRPC_INVALID_REQUEST),
+    (b'null', JSONRPC_INVALID_REQUEST),
+    (b'{"method": "tools/call", "params": [1]}', JSONRPC_INVALID_PARAMS),
+    (b'{"method": "tools/call", "params": "x"}', JSONRPC_INVALID_PARAMS),
+])
+def test_demo_post_rejects_malformed_bodies(demo_module, demo_server, body, code):
+    status, payload, chunks, _ = post(demo_module, demo_server, body)
+    assert status == 200 and chunks is None
+    assert payload["error"]["code"] == code
+
+
+@pytest.mark.parametrize("arguments", [None, {}, [1], "abc"])
+def test_demo_post_tool_arguments_shapes(demo_module, demo_server, arguments):
+    for stream in (False, True):
+        body = json.dumps({"method": "tools/call", "params": {
+            "name": "show_users_table", "stream": stream, "arguments": arguments
+        }}).encode()
+        status, payload, chunks, label = post(demo_module, demo_server, body)
+        assert status == 200 and label == "show_users_table"
+        result = json.loads(b"".join(chunks)) if chunks is not None else payload
+        if isinstance(arguments, (list, str)):
+            assert chunks is None and result == {"error": "Invalid params"}
+        else:
+            assert "ui-table" in result["content"][0]["resource"]["text"]
+
+
+def test_demo_post_batch_and_notifications(demo_module, demo_server):
+    body = json.dumps([
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {"name": "show_user_profile"}},
+        {"jsonrpc": "2.0", "method": "tools/list"},
+        {"jsonrpc": "2.0", "id": 2, "method": "missing"},
+    ]).encode()
+    status, payload, _, label = post(demo_module, demo_server, body)
+    assert status == 200 and label == "batch"
+    assert [item["id"] for item in payload] == [1, 2]
+    assert "content" in payload[0]["result"]
+    assert payload[1]["error"]["code"] == JSONRPC_METHOD_NOT_FOUND
+
+    status, payload, _, _ = post(demo_module, demo_server, b'[{"jsonrpc": "2.0", "method": "tools/list"}]')
+    assert (status, payload) == (204, None)
@@ -0,0 +1,105 @@
+"""Изменение датасетов: индексы, агрегаты и чтение во время изменений"""
+
+import threading
+
+import pytest
+
+from mcp_server_common import PagedTable, RecordStore, TableQuery
+
+
+def make_records(count: int):
+    return [{"id": i, "department": f"D{i % 3}", "score": i} for i in range(count)]
+
+
+def test_store_keeps_indexes_and_totals_on_changes():
+    store = RecordStore(make_records(6), ("department",), summed_fields={"department": ("score",)})
+
+    store.add({"id": 6, "department": "D0", "score": 10})
+    assert [r["id"] for r in store.find("department", "D0")] == [0, 3, 6]
+    assert store.totals("department")["D0"] == {"count": 3, "score": 13}
+
+    assert store.update(3, {"department": "D1"})["department"] == "D1"
+    assert store.count("department", "D0") == 2
+    assert store.totals("department")["D1"] == {"count": 3, "score": 8}
+    assert store.update(99, {"department": "D1"}) is None
+    with pytest.raises(ValueError):
+        store.update(1, {"id": 2})
+
+    assert store.delete(0)
+    assert not store.delete(0)
+    assert store.get(0) is None
+    assert [r["id"] for r in store.records] == [1, 2, 3, 4, 5, 6]
+    assert store.counts("department") == {"D0": 1, "D1": 3, "D2": 2}
+
+
+def test_delete_does_not_shift_list_held_by_reader():
+    store = RecordStore(make_records(10), ("department",))
+    table = PagedTable(store.records)
+    query = TableQuery(page=1, page_size=5, sort_by="score", descending=True)
+    before = table.query(query)
+
+    store.delete(9)
+    assert table.query(query) == before
+    assert [r["id"] for r in store.records] == list(range(9))
+
+
+def test_server_record_methods_change_tool_output(local_server):
+    version = local_server.data_version
+    local_server.add_record("users", {
+        "id": "USER-900", "name": "Тест Тестов", "email": "test@company.com", "department": "QA",
+        "position": "Junior", "salary": 1000, "active": True, "joinDate": "2024-01-01",
+        "tasksCompleted": 1, "efficiency": 50
+    })
+    assert local_server.data_version == version + 1
+
+    result = local_server.call_tool("show_users_table", {"filter": {"id": "USER-900"}})
+    assert "Тест Тестов" in result["content"][0]["resource"]["text"]
+
+    assert local_server.update_record("users", "USER-900", {"name": "Пётр Тестов"})["name"] == "Пётр Тестов"
+    assert local_server.update_record("users", "USER-404", {"name": "x"}) is None
+    result = local_server.call_tool("show_users_table", {"filter": {"id": "USER-900"}})
+    assert "Пётр Тестов" in result["content"][0]["resource"]["text"]
+
+    assert local_server.delete_record("users", "USER-900")
+    assert not local_server.delete_record("users", "USER-900")
+    assert local_server.data_version == version + 3
+    result = local_server.call_tool("show_users_table", {"filter": {"id": "USER-900"}})
+    assert "Пётр Тестов" not in result["content"][0]["resource"]["text"]
+
+    with pytest.raises(ValueError):
+        local_server.add_record("unknown", {"id": 1})
+
+
+def test_reads_during_concurrent_changes(local_server):
+    users = [dict(user, id=f"EXTRA-{i}") for i, user in enumerate(local_server.users_data * 50)]
+    for user in users:
+        local_server.add_record("users", user)
+    errors = []
+    stop = threading.Event()
+
+    def writer():
+        try:
+            for user in users:
+                local_server.delete_record("users", user["id"])
+                local_server.add_record("users", user)
+        except Exception as e:  # pragma: no cover - сообщение об ошибке в потоке
+            errors.append(e)
+        finally:
+            stop.set()
+
+    def reader():
+        query = TableQuery(page=2, page_size=20, sort_by="salary")
+        try:
+            while not stop.is_set():
+                rows, _ = local_server._paged_table("users").query(query)
+                assert [r["salary"] for r in rows] == sorted(r["salary"] for r in rows)
+                local_server._store("users").totals("department")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
@@ -0,0 +1,57 @@
+"""Общий сегмент датасетов: публикация и переключение поколений"""
+
+import os
+
+import pytest
+
+from mcp_columnar import SharedDatasets, fcntl
+
+pytestmark = pytest.mark.skipif(fcntl is None, reason="общий сегмент требует fcntl")
+
+
+@pytest.fixture
+def shared(tmp_path):
+    segment = SharedDatasets(directory=str(tmp_path), name="test")
+    yield segment
+    segment.unlink()
+
+
+def test_publish_and_update_switch_generation(shared, tmp_path):
+    records = [{"id": i, "name": f"user {i}", "tags": ["a"] * i, "score": i / 2} for i in range(5)]
+    assert shared.publish({"users": records}) == 1
+    view = shared.view()
+    assert view.generation == 1 and list(view.records("users")) == records
+
+    def rename(current):
+        current[0] = dict(current[0], name="renamed")
+        return current, "ok"
+    assert shared.update("users", rename) == "ok"
+    assert shared.generation == 2
+    assert shared.view().records("users")[0]["name"] == "renamed"
+    # Старое отображение остаётся действительным, файл старого поколения удалён
+    assert view.records("users")[0]["name"] == "user 0"
+    assert sorted(os.listdir(tmp_path)) == ["test.2", "test.ctl"]
+
+    # Без новых записей поколение не меняется
+    assert shared.update("users", lambda current: (None, len(current))) == 5
+    assert shared.generation == 2
+
+
+def test_server_picks_up_generation_written_elsewhere(local_module, shared):
+    server = local_module.DemoMCPServer()
+    other = local_module.DemoMCPServer()
+    server.use_shared_data(shared)
+    user_id = server.users_data[0]["id"]
+
+    # Второй сервер пишет в тот же сегмент, как другой процесс с --processes
+    other.use_shared_data(shared)
+    other.update_record("users", user_id, {"name": "Изменённое Имя"})
+    assert other.add_record("users", dict(other.users_data[0], id="USER-900"))
+
+    version = server.data_version
+    result = server.call_tool("show_users_table", {"filter": {"id": user_id}})
+    assert "Изменённое Имя" in result["content"][0]["resource"]["text"]
+    assert server.data_version > version
+    assert server._store("users").get("USER-900") is not None
+    assert server.delete_record("users", "USER-900")
+    assert other._store("users").get("USER-900") is None
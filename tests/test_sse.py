@@ -0,0 +1,140 @@
+"""SSE сессии: буфер событий и возобновление по Last-Event-ID"""
+
+import json
+import socket
+
+import pytest
+
+
+def read_events(sock: socket.socket):
+    """События SSE, уже записанные в сокет: [(id, event, data)]"""
+    sock.settimeout(0.2)
+    data = b""
+    try:
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    except socket.timeout:
+        pass
+    events = []
+    for block in data.decode("utf-8").split("\n\n"):
+        if not block.strip():
+            continue
+        fields = {}
+        for line in block.split("\n"):
+            name, _, value = line.partition(": ")
+            fields[name] = value
+        events.append((fields.get("id"), fields.get("event"), json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def hub(local_module):
+    hub = local_module.SSESessionHub(replay_size=3)
+    yield hub
+    hub.stop()
+
+
+def connect(hub, last_event_id=None):
+    session, last_seq = hub.acquire(last_event_id)
+    server_side, client_side = socket.socketpair()
+    hub.connect(session, server_side, last_seq)
+    return session, client_side
+
+
+def test_resume_replays_missed_events(hub):
+    session, client = connect(hub)
+    first = hub.publish(session.session_id, {"n": 1}, event="tool_result")
+    hub.publish(session.session_id, {"n": 2}, event="tool_result")
+    events = read_events(client)
+    assert events[0][1] == "session" and events[0][2]["resumed"] is False
+    assert [data["n"] for _, _, data in events[1:]] == [1, 2]
+    client.close()
+
+    # События, отправленные без клиента, остаются в буфере
+    hub.publish(session.session_id, {"n": 3}, event="tool_result")
+    hub.publish(session.session_id, {"n": 4}, event="tool_result")
+    assert not session.connected
+
+    resumed, client = connect(hub, first)
+    assert resumed is session
+    events = read_events(client)
+    assert events[0][2] == {"sessionId": session.session_id, "resumed": True, "missed": 0}
+    assert [data["n"] for _, _, data in events[1:]] == [2, 3, 4]
+    assert [event_id for event_id, _, _ in events[1:]] == [f"{session.session_id}:{n}" for n in (2, 3, 4)]
+    client.close()
+
+
+def test_resume_reports_events_lost_from_buffer(hub, local_module):
+    session, client = connect(hub)
+    client.close()
+    for n in range(1, 6):
+        hub.publish(session.session_id, {"n": n})
+    session.styles_sent.add("abc")
+
+    _, client = connect(hub, f"{session.session_id}:1")
+    events = read_events(client)
+    # В буфере 3 события: 2-е потеряно, 3-5 досланы
+    assert events[0][2]["missed"] == 1
+    assert [data["n"] for _, _, data in events[1:]] == [3, 4, 5]
+    # Среди потерянных событий могли быть стили: сессия отправит их снова
+    assert session.styles_sent == set() and session.styles_resets == 1
+    client.close()
+
+
+def test_unknown_session_starts_new_one(hub):
+    session, client = connect(hub, "missing:7")
+    assert session.session_id != "missing"
+    assert read_events(client)[0][2]["resumed"] is False
+    client.close()
+
+
+def test_push_result_reattaches_styles_after_reset(local_module):
+    server = local_module.DemoMCPServer(shared_styles=True)
+    session = local_module.SSESession("s")
+    known, resets = session.styles_snapshot()
+    sent = set(known)
+    result = server.call_tool("show_users_table", {}, sent)
+    assert session.send_with_styles({"result": result}, "tool_result", sent - known, resets)
+    assert session.styles_sent
+
+    # Стиль уже доставлен, поэтому следующий результат его не содержит
+    known, resets = session.styles_snapshot()
+    sent = set(known)
+    result = server.call_tool("show_users_table", {}, sent)
+    assert not [item for item in result["content"] if item["resource"]["mimeType"] == "text/css"]
+    # Переподключение с потерей событий сбрасывает стили во время вызова
+    server_side, client = socket.socketpair()
+    session.attach(server_side, -10)
+    assert not session.send_with_styles({"result": result}, "tool_result", sent - known, resets)
+    session.close()
+    client.close()
+
+
+def test_stalled_client_does_not_delay_heartbeats(local_module):
+    hub = local_module.SSESessionHub(heartbeat_interval=0.05, write_timeout=5.0)
+    # Первым в реестре - клиент, который никогда не читает сокет
+    stalled, stalled_client = connect(hub)
+    stalled.sock.setblocking(False)
+    try:
+        while True:
+            stalled.sock.send(b": " + b"x" * 65536 + b"\n\n")
+    except BlockingIOError:
+        pass
+    stalled.sock.settimeout(hub.write_timeout)
+    healthy, healthy_client = connect(hub)
+    healthy_client.settimeout(1.0)
+    healthy_client.recv(65536)
+    hub.start()
+    try:
+        data = b""
+        while data.count(b'"heartbeat"') < 3:
+            data += healthy_client.recv(65536)
+        assert healthy.connected and not stalled.connected
+        assert healthy.stalled_heartbeats == 0
+    finally:
+        hub.stop()
+        stalled_client.close()
+        healthy_client.close()
@@ -0,0 +1,167 @@
+"""Вызовы инструментов: кэш по версии данных, потоковая отдача, проверка аргументов, объединение вызовов"""
+
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from conftest import resource_text
+from mcp_server_common import RenderCache, SingleFlight, compile_arguments_validator
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "count": {"type": "integer", "minimum": 1, "maximum": 10},
+        "ratio": {"type": "number"},
+        "flag": {"type": "boolean"},
+        "order": {"type": "string", "enum": ["asc", "desc"]},
+        "filter": {"type": ["object", "string"]},
+    },
+    "required": ["name"]
+}
+
+
+def test_validator_required_enum_and_limits():
+    validate = compile_arguments_validator(SCHEMA)
+
+    assert validate({"name": "x", "count": "3", "ratio": "0.5", "flag": "yes", "order": "DESC",
+                     "extra": [1]}) == {"name": "x", "count": 3, "ratio": 0.5, "flag": True, "order": "desc",
+                                        "extra": [1]}
+    # maximum ограничивает значение, minimum - ошибка
+    assert validate({"name": "x", "count": 50})["count"] == 10
+    with pytest.raises(ValueError, match="count"):
+        validate({"name": "x", "count": 0})
+    with pytest.raises(ValueError, match="name"):
+        validate({})
+    with pytest.raises(ValueError, match="name"):
+        validate({"name": ""})
+    with pytest.raises(ValueError, match="order"):
+        validate({"name": "x", "order": "up"})
+    with pytest.raises(ValueError, match="count"):
+        validate({"name": "x", "count": "many"})
+    with pytest.raises(ValueError, match="flag"):
+        validate({"name": "x", "flag": "maybe"})
+    assert validate({"name": "x", "filter": "a=b"})["filter"] == "a=b"
+    with pytest.raises(ValueError, match="filter"):
+        validate({"name": "x", "filter": [1]})
+    # Пустые значения не проверяются и передаются как есть
+    assert validate({"name": "x", "count": None, "order": ""}) == {"name": "x", "count": None, "order": ""}
+
+
+def test_invalid_arguments_become_tool_errors(local_server, demo_server):
+    result = local_server.call_tool("show_users_table", {"pageSize": "lots"})
+    assert result["isError"] and "pageSize" in result["content"][0]["text"]
+
+    result = asyncio.run(demo_server.call_method("tools/call", {
+        "name": "show_statistics_chart", "arguments": {"column": "name"}
+    }))
+    assert "column" in result["content"][0]["text"]
+
+
+def test_cache_is_invalidated_by_data_version(local_server):
+    first = resource_text(local_server.call_tool("show_team_statistics"))
+    assert resource_text(local_server.call_tool("show_team_statistics")) == first
+    assert local_server.render_cache.hits == 1
+
+    user = local_server.users_data[0]
+    local_server.update_record("users", user["id"], {"tasksCompleted": user["tasksCompleted"] + 100000})
+    changed = resource_text(local_server.call_tool("show_team_statistics"))
+    assert changed != first
+    assert local_server.render_cache.hits == 1
+    key = RenderCache.make_key("show_team_statistics", {}, local_server.data_version)
+    assert key in local_server.render_cache
+
+
+def test_demo_cache_is_invalidated_by_data_version(demo_server):
+    def profile():
+        result = asyncio.run(demo_server.call_method("tools/call", {
+            "name": "show_user_profile", "arguments": {"userId": 1}
+        }))
+        return resource_text(result)
+
+    first = profile()
+    assert profile() == first
+    demo_server.update_record("users", 1, {"name": "Переименованный Пользователь"})
+    assert "Переименованный Пользователь" in profile()
+    assert demo_server.render_cache.hits == 1
+
+
+@pytest.mark.parametrize("tool, arguments", [
+    ("show_users_table", None),
+    ("show_users_table", {"page": 1, "pageSize": 3, "sortBy": "salary", "sortOrder": "desc"}),
+    ("show_tasks_board", {"filter": "status=todo"}),
+])
+def test_local_stream_matches_call(local_server, tool, arguments):
+    chunks = local_server.stream_tool_result(tool, arguments)
+    streamed = json.loads(b"".join(chunks))
+    assert resource_text(streamed) == resource_text(local_server.call_tool(tool, arguments))
+
+
+def test_stream_only_for_registered_stream_tools(local_server, demo_server):
+    assert local_server.stream_tool_result("show_project_dashboard", {}) is None
+    assert local_server.stream_tool_result("missing", {}) is None
+    assert local_server.stream_tool_result("show_users_table", {"pageSize": "x"}) is None
+    assert demo_server.stream_tool_result("show_user_profile", {}) is None
+    assert demo_server.stream_tool_result("show_users_table", {"sortBy": "nope"}) is None
+    chunks = demo_server.stream_tool_result("show_users_table", {"pageSize": 2})
+    assert json.loads(b"".join(chunks))["content"][0]["resource"]["uri"].startswith("ui://demo-table-")
+
+
+def test_single_flight_threads_share_one_render():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    renders = []
+
+    def render():
+        renders.append(1)
+        started.set()
+        release.wait(5)
+        return {"content": [{"type": "text", "text": "ok"}]}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", render)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", render))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flight.stats()["coalesced"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(renders) == 1
+    assert sorted(coalesced for _, coalesced in results) == [False, True, True, True]
+    # Каждый вызывающий получил свою копию
+    assert len({id(result["content"]) for result, _ in results}) == 4
+
+
+def test_single_flight_survives_leader_cancellation():
+    async def scenario():
+        flight = SingleFlight()
+        renders = []
+
+        async def render():
+            renders.append(1)
+            await asyncio.sleep(0.05)
+            return {"content": [{"type": "text", "text": str(len(renders))}]}
+
+        leader = asyncio.create_task(flight.do_async("key", render))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.create_task(flight.do_async("key", render)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return renders, results, flight.stats()
+
+    renders, results, stats = asyncio.run(scenario())
+    assert len(renders) == 2
+    assert [result["content"][0]["text"] for result, _ in results] == ["2", "2", "2"]
+    assert stats["coalesced"] == 2 and stats["inFlight"] == 0